@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+IMIS - Output Format Benchmark
+Compares output formats of workflow_review/resize_images.py (baseline JPEG,
+progressive JPEG, WebP and byte-budget modes), reporting encode time, output
+bytes and SSIM against the unencoded resized image
+"""
+
+import io
+import sys
+import json
+import glob
+import time
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "workflow_review"))
+
+from PIL import Image  # noqa: E402
+from resize_images import load_resized, encode_image, encode_to_target, MAX_WIDTH, MAX_HEIGHT  # noqa: E402
+
+SSIM_WINDOW = 8
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+def ssim(reference, candidate, window=SSIM_WINDOW):
+    """Mean SSIM over non-overlapping windows of the luma channel
+
+    A plain-Python implementation (no numpy in the deployment image); the
+    images here are at most MAX_WIDTH x MAX_HEIGHT, so it stays fast enough.
+    """
+    a = reference.convert("L")
+    b = candidate.convert("L")
+    width, height = a.size
+    pixels_a = a.tobytes()
+    pixels_b = b.tobytes()
+    n = window * window
+    total = 0.0
+    count = 0
+    for top in range(0, height - window + 1, window):
+        for left in range(0, width - window + 1, window):
+            sum_a = sum_b = sum_aa = sum_bb = sum_ab = 0
+            for y in range(top, top + window):
+                row = y * width
+                for i in range(row + left, row + left + window):
+                    pa = pixels_a[i]
+                    pb = pixels_b[i]
+                    sum_a += pa
+                    sum_b += pb
+                    sum_aa += pa * pa
+                    sum_bb += pb * pb
+                    sum_ab += pa * pb
+            mean_a = sum_a / n
+            mean_b = sum_b / n
+            var_a = sum_aa / n - mean_a * mean_a
+            var_b = sum_bb / n - mean_b * mean_b
+            cov = sum_ab / n - mean_a * mean_b
+            total += ((2 * mean_a * mean_b + SSIM_C1) * (2 * cov + SSIM_C2)) / (
+                (mean_a * mean_a + mean_b * mean_b + SSIM_C1) * (var_a + var_b + SSIM_C2))
+            count += 1
+    return total / count if count else 1.0
+
+
+def build_variants(quality, target_bytes):
+    """Encoders to compare: name -> function(img) returning (bytes, quality)"""
+    variants = {
+        f"jpeg_q{quality}": lambda img: (encode_image(img, "jpeg", quality), quality),
+        f"jpeg_progressive_q{quality}": lambda img: (encode_image(img, "jpeg", quality, progressive=True), quality),
+        f"webp_q{quality}": lambda img: (encode_image(img, "webp", quality), quality)
+    }
+    if target_bytes:
+        kb = target_bytes // 1024
+        variants[f"jpeg_{kb}kb"] = lambda img: encode_to_target(img, target_bytes, "jpeg", progressive=True)
+        variants[f"webp_{kb}kb"] = lambda img: encode_to_target(img, target_bytes, "webp")
+    return variants
+
+
+def measure(encoder, img, repeat):
+    """Encode one image with one variant and score the result"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data, quality = encoder(img)
+        timings.append(time.perf_counter() - start)
+    with Image.open(io.BytesIO(data)) as decoded:
+        score = ssim(img, decoded)
+    return {
+        "encode_ms": round(min(timings) * 1000, 2),
+        "bytes": len(data),
+        "quality": quality,
+        "ssim": round(score, 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark output formats for resized product images")
+    parser.add_argument("images", nargs="*", help="Images to encode (defaults to workflow_review/images/*.png)")
+    parser.add_argument("--max-width", type=int, default=MAX_WIDTH, help="Maximum output width")
+    parser.add_argument("--max-height", type=int, default=MAX_HEIGHT, help="Maximum output height")
+    parser.add_argument("--quality", type=int, default=85, help="Quality for the fixed-quality variants")
+    parser.add_argument("--target-kb", type=int, default=40, help="Byte budget for the target-size variants (0 disables)")
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per image and variant (fastest is kept)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    images = args.images or sorted(glob.glob(str(REPO_ROOT / "workflow_review" / "images" / "*.png")))
+    if not images:
+        print("No images found")
+        return
+
+    variants = build_variants(args.quality, args.target_kb * 1024)
+    results = []
+    for image_path in images:
+        img = load_resized(image_path, args.max_width, args.max_height)
+        result = {"image": image_path, "dimensions": list(img.size), "variants": {}}
+        for name, encoder in variants.items():
+            result["variants"][name] = measure(encoder, img, args.repeat)
+        results.append(result)
+
+    # Per-variant summary across the image set
+    summary = {}
+    for name in variants:
+        runs = [r["variants"][name] for r in results]
+        summary[name] = {
+            "mean_encode_ms": round(sum(m["encode_ms"] for m in runs) / len(runs), 2),
+            "total_bytes": sum(m["bytes"] for m in runs),
+            "mean_ssim": round(sum(m["ssim"] for m in runs) / len(runs), 4),
+            "min_ssim": min(m["ssim"] for m in runs)
+        }
+
+    print(f"{len(results)} images, max {args.max_width}x{args.max_height}")
+    print(f"{'variant':26} {'encode ms':>10} {'total KB':>9} {'mean SSIM':>10} {'min SSIM':>9}")
+    for name, s in summary.items():
+        print(f"{name:26} {s['mean_encode_ms']:>10.1f} {s['total_bytes'] / 1024:>9.0f} "
+              f"{s['mean_ssim']:>10.4f} {s['min_ssim']:>9.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "images": results}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
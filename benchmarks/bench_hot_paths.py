@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+IMIS - Hot Path Micro-Benchmarks
+Times the functions that run once per document (hashing, validation,
+lifecycle logging, language / type guessing, rate limiting, pagination,
+cropping, base64 encoding and resizing) on synthetic inputs at several
+sizes, reporting per-call time and peak memory
+
+Each case runs in a fresh process, so RSS high-water marks belong to that
+case alone. Results can be saved as a JSON baseline and later runs
+compared against it (perf_gate.py does the same as a CI gate):
+
+    python benchmarks/bench_hot_paths.py --save-baseline baseline.json
+    python benchmarks/bench_hot_paths.py --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import resource
+import argparse
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WEBHOOK_DIR = REPO_ROOT / "v3_intent_driven_minimalism" / "scripts"
+IMAGE_UTILS_DIR = REPO_ROOT / "v1.5_enhanced_verification" / "scripts" / "utils"
+RESIZE_DIR = REPO_ROOT / "workflow_review"
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from generate_corpus import write_document  # noqa: E402
+from perf_gate import benchmarks_from, compare_runs, print_report  # noqa: E402
+
+# Default sizes per input kind; --quick keeps the first two of each
+SIZES = {
+    "file_mb": [1, 10, 100],
+    "lifecycle_events": [1000, 100000, 1000000],
+    "text_kb": [1, 100, 1000],
+    "tracked_ips": [100, 10000, 100000],
+    "pdf_pages": [1, 50, 500],
+    "page_dpi": [150, 300, 600],
+    "base64_pages": [1, 10, 50],
+    "resize_px": [1024, 4096, 8192]
+}
+
+WORDS = ("the material and of technical data for product line specifications in de het een "
+         "van der die das und mit thermal conductivity density fire rating").split()
+
+# Repeated runs of one case are kept under this many seconds where possible,
+# but every case gets at least MIN_SAMPLES so its noise can be estimated
+TIME_BUDGET = 0.5
+MIN_SAMPLES = 7
+
+
+# --- Synthetic inputs -------------------------------------------------------
+
+def write_random_file(path, size_mb):
+    """PDF header followed by incompressible bytes"""
+    rng = random.Random(size_mb)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        for _ in range(size_mb):
+            f.write(rng.randbytes(1024 * 1024))
+
+
+def write_lifecycle_log(path, events):
+    """A document_lifecycle_v3.json with the given number of events, written
+    in the handler's own format (json.dump, indent=2) without holding the
+    whole list in memory"""
+    states = ["RECEIVED", "PROCESSING", "COMPLETED", "FAILED"]
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(events):
+            entry = {
+                "document_id": f"doc-{i // 3:08d}",
+                "state_from": states[i % 3],
+                "state_to": states[i % 3 + 1],
+                "timestamp": f"2025-01-01T00:00:{i % 60:02d}.000000Z",
+                "agent": "webhook_handler",
+                "notes": f"Synthetic event {i}"
+            }
+            body = json.dumps(entry, indent=2).replace("\n", "\n  ")
+            f.write(("," if i else "") + "\n  " + body)
+        f.write("\n]" if events else "]")
+
+
+def synthetic_text(size_kb, seed=0):
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size_kb * 1024:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def write_page_image(path, size, seed=0):
+    """A page-like RGB image: light background with dark text-like stripes"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    page = Image.new("RGB", size, (250, 250, 246))
+    draw = ImageDraw.Draw(page)
+    margin = size[0] // 12
+    line_height = max(4, size[1] // 90)
+    for y in range(margin, size[1] - margin, line_height * 2):
+        width = rng.randint(size[0] // 3, size[0] - 2 * margin)
+        draw.rectangle((margin, y, margin + width, y + line_height), fill=(30, 30, 30))
+    page.save(path, "JPEG" if path.endswith(".jpg") else "PNG", quality=90)
+
+
+def page_size_at(dpi):
+    """A4 in pixels at the given DPI"""
+    return round(8.27 * dpi), round(11.69 * dpi)
+
+
+def build_fixtures(fixture_dir, sizes, selected):
+    """Write the inputs of the selected cases once; returns (case, label, args) tuples"""
+    cases = []
+
+    def wanted(*names):
+        return any(name in selected for name in names)
+
+    for size_mb in sizes["file_mb"] if wanted("calculate_file_hash", "validate_pdf_file") else []:
+        path = os.path.join(fixture_dir, f"file_{size_mb}mb.pdf")
+        write_random_file(path, size_mb)
+        cases.append(("calculate_file_hash", f"{size_mb}MB", {"path": path}))
+    cases.append(("validate_pdf_file", "header", {"path": os.path.join(fixture_dir, f"file_{sizes['file_mb'][0]}mb.pdf")}))
+
+    for events in sizes["lifecycle_events"] if wanted("save_document_lifecycle") else []:
+        log_dir = os.path.join(fixture_dir, f"lifecycle_{events}")
+        os.makedirs(log_dir, exist_ok=True)
+        write_lifecycle_log(os.path.join(log_dir, "document_lifecycle_v3.json"), events)
+        cases.append(("save_document_lifecycle", f"{events} events", {"log_dir": log_dir}))
+
+    for size_kb in sizes["text_kb"] if wanted("detect_language", "guess_document_type") else []:
+        path = os.path.join(fixture_dir, f"text_{size_kb}kb.txt")
+        with open(path, "w") as f:
+            f.write(synthetic_text(size_kb))
+        cases.append(("detect_language", f"{size_kb}KB", {"path": path}))
+        cases.append(("guess_document_type", f"{size_kb}KB", {"path": path}))
+
+    for count in sizes["tracked_ips"]:
+        cases.append(("apply_rate_limit", f"{count} IPs", {"count": count}))
+
+    for pages in sizes["pdf_pages"] if wanted("paginate_pdf") else []:
+        path = os.path.join(fixture_dir, f"document_{pages}p.pdf")
+        write_document(path, {"name": f"document_{pages}p", "pages": pages,
+                              "mix": {"text": 2, "table": 2, "image": 1, "multi": 1, "scanned": 1}})
+        cases.append(("paginate_pdf", f"{pages} pages", {"path": path, "dpi": 150}))
+
+    for dpi in sizes["page_dpi"] if wanted("crop_image") else []:
+        path = os.path.join(fixture_dir, f"page_{dpi}dpi.png")
+        size = page_size_at(dpi)
+        write_page_image(path, size)
+        bbox = (size[0] // 8, size[1] // 4, size[0] // 2, size[1] // 2)
+        cases.append(("crop_image", f"{dpi} DPI page", {"path": path, "bbox": bbox}))
+
+    page_paths = []
+    for i in range(max(sizes["base64_pages"]) if wanted("images_to_base64") else 0):
+        path = os.path.join(fixture_dir, f"b64_page_{i + 1}.jpg")
+        write_page_image(path, page_size_at(150), seed=i)
+        page_paths.append(path)
+    for count in sizes["base64_pages"]:
+        cases.append(("images_to_base64", f"{count} pages", {"paths": page_paths[:count]}))
+
+    for px in sizes["resize_px"] if wanted("resize_image") else []:
+        path = os.path.join(fixture_dir, f"photo_{px}.png")
+        write_page_image(path, (px, px * 3 // 4))
+        cases.append(("resize_image", f"{px}px", {"path": path}))
+    if wanted("resize_image"):
+        # An RGB JPEG already within the limits: decoded and re-encoded, never resized
+        path = os.path.join(fixture_dir, "photo_within_limits.jpg")
+        write_page_image(path, (640, 480))
+        cases.append(("resize_image", "640px no resize", {"path": path}))
+
+    return cases
+
+
+# --- Cases ------------------------------------------------------------------
+# Each setup runs inside the measuring process and returns the call to time.
+# Calls check their result, so a failing path is reported instead of timed
+
+def _checked(func, name, ok=bool):
+    """Wrap func so a result failing ok() raises instead of counting as a fast call"""
+    def run():
+        result = func()
+        if not ok(result):
+            raise RuntimeError(f"{name} failed (returned {result!r:.60})")
+        return result
+    return run
+
+
+def _import_webhook_handler(log_dir):
+    """Import the v3 handler with its folders redirected to log_dir"""
+    for name in ("LOG_PATH", "STORAGE_PATH", "ARCHIVE_PATH", "FEEDBACK_PATH"):
+        os.environ[name] = os.path.join(log_dir, "") if name == "LOG_PATH" else os.path.join(log_dir, name.lower())
+    sys.path.insert(0, str(WEBHOOK_DIR))
+    import logging
+    import webhook_handler
+    webhook_handler.logger.setLevel(logging.CRITICAL)
+    return webhook_handler
+
+
+def _import_image_processing():
+    sys.path.insert(0, str(IMAGE_UTILS_DIR))
+    import logging
+    import image_processing
+    logging.getLogger('imis_image_processor').setLevel(logging.WARNING)
+    return image_processing
+
+
+def setup_calculate_file_hash(args, work_dir):
+    handler = _import_webhook_handler(work_dir)
+    return _checked(lambda: handler.calculate_file_hash(args["path"]), "calculate_file_hash")
+
+
+def setup_validate_pdf_file(args, work_dir):
+    handler = _import_webhook_handler(work_dir)
+    return _checked(lambda: handler.validate_pdf_file(args["path"]), "validate_pdf_file")
+
+
+def setup_save_document_lifecycle(args, work_dir):
+    # Work on a copy so the fixture keeps its event count across cases
+    shutil.copy(os.path.join(args["log_dir"], "document_lifecycle_v3.json"), work_dir)
+    handler = _import_webhook_handler(work_dir)
+    return _checked(lambda: handler.save_document_lifecycle("doc-bench", "RECEIVED", "PROCESSING", "benchmark"),
+                    "save_document_lifecycle")
+
+
+def _read_text(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+def setup_detect_language(args, work_dir):
+    handler = _import_webhook_handler(work_dir)
+    text = _read_text(args["path"])
+    return _checked(lambda: handler.detect_language(text), "detect_language")
+
+
+def setup_guess_document_type(args, work_dir):
+    handler = _import_webhook_handler(work_dir)
+    text = _read_text(args["path"])
+    # A filename without type hints, so the text is scanned
+    return _checked(lambda: handler.guess_document_type("upload_2025_001.pdf", text), "guess_document_type")
+
+
+def setup_apply_rate_limit(args, work_dir):
+    handler = _import_webhook_handler(work_dir)
+    handler.RATE_LIMIT_ENABLED = True
+    now = time.time()
+    handler.rate_limit_data.update(
+        (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", [now]) for i in range(args["count"])
+    )
+    return _checked(lambda: handler.apply_rate_limit("192.168.0.1"), "apply_rate_limit")
+
+
+def setup_paginate_pdf(args, work_dir):
+    image_processing = _import_image_processing()
+    if not image_processing.validate_environment():
+        raise RuntimeError("poppler / pdf2image not available")
+    output_dir = os.path.join(work_dir, "pages")
+
+    def run():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        if not image_processing.paginate_pdf(args["path"], output_dir, dpi=args["dpi"], prefix="bench"):
+            raise RuntimeError("paginate_pdf returned no pages")
+    return run
+
+
+def setup_crop_image(args, work_dir):
+    os.environ["ENABLE_CROP_CACHE"] = "false"
+    image_processing = _import_image_processing()
+    output_dir = os.path.join(work_dir, "crops")
+    return _checked(lambda: image_processing.crop_image(args["path"], tuple(args["bbox"]), output_dir), "crop_image")
+
+
+def setup_images_to_base64(args, work_dir):
+    image_processing = _import_image_processing()
+    return _checked(lambda: image_processing.images_to_base64(args["paths"]), "images_to_base64",
+                    ok=lambda images: len(images) == len(args["paths"]))
+
+
+def setup_resize_image(args, work_dir):
+    sys.path.insert(0, str(RESIZE_DIR))
+    from resize_images import resize_image
+    output_path = os.path.join(work_dir, "resized.jpg")
+    return _checked(lambda: resize_image(args["path"], output_path), "resize_image")
+
+
+SETUPS = {
+    "calculate_file_hash": setup_calculate_file_hash,
+    "validate_pdf_file": setup_validate_pdf_file,
+    "save_document_lifecycle": setup_save_document_lifecycle,
+    "detect_language": setup_detect_language,
+    "guess_document_type": setup_guess_document_type,
+    "apply_rate_limit": setup_apply_rate_limit,
+    "paginate_pdf": setup_paginate_pdf,
+    "crop_image": setup_crop_image,
+    "images_to_base64": setup_images_to_base64,
+    "resize_image": setup_resize_image
+}
+
+
+# --- Measurement ------------------------------------------------------------
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(case, args, repeat):
+    """Time one case and record its memory; executed in a fresh process"""
+    work_dir = tempfile.mkdtemp(prefix="imis_bench_")
+    try:
+        try:
+            call = SETUPS[case](args, work_dir)
+        except Exception as e:
+            return {"skipped": str(e)}
+
+        # Fast calls are looped so each sample lasts long enough to time
+        baseline_rss = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            return {"failed": str(e)}
+        first = time.perf_counter() - start
+        loops = max(1, int(0.05 / first)) if first > 0 else 1000
+        repeat = max(min(repeat, MIN_SAMPLES), min(repeat, int(TIME_BUDGET / (first * loops))))
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                call()
+            samples.append((time.perf_counter() - start) / loops)
+        rss_growth = peak_rss_mb() - baseline_rss
+
+        # tracemalloc slows Python code down, so it gets a separate call
+        tracemalloc.start()
+        call()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ordered = sorted(samples)
+        return {
+            "ms": round(ordered[len(ordered) // 2] * 1000, 4),
+            "min_ms": round(ordered[0] * 1000, 4),
+            "samples": len(samples),
+            "samples_ms": [round(sample * 1000, 4) for sample in samples],
+            "loops": loops,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "rss_growth_mb": round(rss_growth, 1),
+            "python_peak_mb": round(traced_peak / (1024 * 1024), 2)
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the per-document hot paths")
+    parser.add_argument("--cases", default=",".join(SETUPS), help="Comma-separated functions to benchmark")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest size of every input")
+    parser.add_argument("--repeat", type=int, default=9, help="Timed samples per case (median is reported)")
+    parser.add_argument("--fixtures", help="Directory for the synthetic inputs (default: a temporary directory)")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a baseline JSON written by --save-baseline")
+    args = parser.parse_args()
+
+    selected = [c for c in args.cases.split(",") if c]
+    unknown = set(selected) - set(SETUPS)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+    sizes = {kind: values[:2] if args.quick else values for kind, values in SIZES.items()}
+
+    fixture_dir = args.fixtures or tempfile.mkdtemp(prefix="imis_bench_fixtures_")
+    os.makedirs(fixture_dir, exist_ok=True)
+    try:
+        # One process per case keeps ru_maxrss per case. Linux carries the
+        # parent's high-water mark into spawned children, so the (large)
+        # inputs are built in a worker of their own as well
+        context = multiprocessing.get_context("spawn")
+        results = []
+        with context.Pool(processes=1, maxtasksperchild=1) as pool:
+            print(f"Writing synthetic inputs to {fixture_dir}", file=sys.stderr)
+            cases = [c for c in pool.apply(build_fixtures, (fixture_dir, sizes, selected)) if c[0] in selected]
+
+            print(f"{'case':26} {'size':16} {'ms/call':>12} {'RSS +MB':>8} {'py peak MB':>11}")
+            for case, label, case_args in cases:
+                result = {"case": case, "size": label, **pool.apply(measure, (case, case_args, args.repeat))}
+                results.append(result)
+                if "skipped" in result:
+                    print(f"{case:26} {label:16} skipped: {result['skipped']}")
+                elif "failed" in result:
+                    print(f"{case:26} {label:16} FAILED: {result['failed']}")
+                else:
+                    print(f"{case:26} {label:16} {result['ms']:>12.4f} {result['rss_growth_mb']:>8.1f} "
+                          f"{result['python_peak_mb']:>11.2f}")
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        print()
+        print_report(compare_runs(benchmarks_from(baseline.get("results", [])), benchmarks_from(results)))
+
+    if args.save_baseline:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "quick": args.quick,
+            "results": results
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    main()
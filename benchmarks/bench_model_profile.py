@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+IMIS - Vision Payload Benchmark
+Measures bytes sent and encode time per page image with and without a
+model profile applied before base64 encoding
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "v1.5_enhanced_verification" / "scripts" / "utils"))
+
+from image_processing import images_to_base64, MODEL_PROFILES, Image  # noqa: E402
+
+logging.getLogger('imis_image_processor').setLevel(logging.WARNING)
+
+
+def synthetic_pages(output_dir, count=5, size=(2480, 3508)):
+    """A4 pages at 300 DPI: gradients with text-like stripes, saved as JPEG"""
+    from PIL import ImageDraw
+
+    paths = []
+    for i in range(count):
+        page = Image.linear_gradient("L").resize(size).convert("RGB")
+        draw = ImageDraw.Draw(page)
+        for y in range(200 + i * 10, size[1] - 200, 48):
+            draw.line((200, y, size[0] - 200, y), fill=(20, 20, 20), width=6)
+        path = os.path.join(output_dir, f"page_{i + 1}.jpg")
+        page.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def measure(paths, profile, repeat):
+    """Median encode time and total base64 bytes per page"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = images_to_base64(paths, profile)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total_bytes = sum(len(item["base64"]) for item in encoded)
+    return {
+        "ms_per_page": round(timings[len(timings) // 2] * 1000 / len(paths), 2),
+        "base64_bytes_per_page": total_bytes // len(paths)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model-profile downscaling before encoding")
+    parser.add_argument("images", nargs="*", help="Page images (defaults to synthetic 300 DPI A4 pages)")
+    parser.add_argument("--profiles", default=",".join(MODEL_PROFILES), help="Comma-separated profile names")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per profile (median is reported)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    scratch = None
+    paths = args.images
+    if not paths:
+        scratch = tempfile.mkdtemp(prefix="imis_bench_")
+        paths = synthetic_pages(scratch)
+
+    try:
+        results = {"pages": len(paths), "unmodified": measure(paths, False, args.repeat)}
+        for name in args.profiles.split(","):
+            results[name] = measure(paths, name, args.repeat)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    baseline = results["unmodified"]
+    print(f"{'profile':12} {'ms/page':>9} {'KB/page':>9} {'bytes saved':>12}")
+    for name, r in results.items():
+        if name == "pages":
+            continue
+        saved = 1 - r["base64_bytes_per_page"] / baseline["base64_bytes_per_page"]
+        print(f"{name:12} {r['ms_per_page']:>9.1f} {r['base64_bytes_per_page'] / 1024:>9.0f} {saved:>11.0%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+IMIS - Image Resize Benchmark
+Compares the legacy full-decode resize against the decode-time downscaling
+fast path in workflow_review/resize_images.py, reporting time and peak RSS
+per image
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import tempfile
+import resource
+import argparse
+import multiprocessing
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "workflow_review"))
+
+from PIL import Image  # noqa: E402
+from resize_images import resize_image, target_size, MAX_WIDTH, MAX_HEIGHT, QUALITY  # noqa: E402
+
+
+def legacy_resize_image(input_path, output_path, max_width=MAX_WIDTH, max_height=MAX_HEIGHT, quality=QUALITY):
+    """Reproduction of the pre-fix resize_image: full decode, full-size alpha
+    flattening, then a single LANCZOS resample"""
+    with Image.open(input_path) as img:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        new_size = target_size(img.width, img.height, max_width, max_height)
+        if new_size != img.size:
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        img.save(output_path, 'JPEG', quality=quality, optimize=True)
+        return {"size": os.path.getsize(output_path), "dimensions": list(img.size)}
+
+
+VARIANTS = {
+    "legacy": legacy_resize_image,
+    "fast_path": resize_image
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(variant, image_path, repeat):
+    """Run one variant on one image; executed in a fresh process so the
+    RSS high-water mark belongs to this image alone"""
+    func = VARIANTS[variant]
+    output_dir = tempfile.mkdtemp(prefix="imis_bench_")
+    try:
+        output_path = os.path.join(output_dir, "out.jpg")
+        baseline_rss = peak_rss_mb()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(image_path, output_path)
+            timings.append(time.perf_counter() - start)
+        return {
+            "ms": round(min(timings) * 1000, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "rss_growth_mb": round(peak_rss_mb() - baseline_rss, 1),
+            "output_bytes": os.path.getsize(output_path)
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs fast-path image resizing")
+    parser.add_argument("images", nargs="*", help="Images to resize (defaults to workflow_review/images/*.png)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image and variant (fastest is kept)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    images = args.images or sorted(glob.glob(str(REPO_ROOT / "workflow_review" / "images" / "*.png")))
+    if not images:
+        print("No images found")
+        return
+
+    # One process per measurement keeps ru_maxrss per image and variant
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        for image_path in images:
+            with Image.open(image_path) as img:
+                size, mode = img.size, img.mode
+            result = {"image": image_path, "source_size": list(size), "mode": mode}
+            for variant in VARIANTS:
+                result[variant] = pool.apply(measure, (variant, image_path, args.repeat))
+            results.append(result)
+
+    print(f"{'image':44} {'size':>10} {'ms legacy':>10} {'ms fast':>8} {'MB legacy':>10} {'MB fast':>8}")
+    for r in results:
+        print(f"{Path(r['image']).name[:44]:44} {r['source_size'][0]:>5}x{r['source_size'][1]:<4} "
+              f"{r['legacy']['ms']:>10.1f} {r['fast_path']['ms']:>8.1f} "
+              f"{r['legacy']['rss_growth_mb']:>10.1f} {r['fast_path']['rss_growth_mb']:>8.1f}")
+
+    total_legacy = sum(r["legacy"]["ms"] for r in results)
+    total_fast = sum(r["fast_path"]["ms"] for r in results)
+    print(f"Total: {total_legacy:.1f}ms legacy, {total_fast:.1f}ms fast path "
+          f"({total_legacy / total_fast:.2f}x)" if total_fast else "")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
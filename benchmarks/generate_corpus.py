@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+IMIS - Synthetic PDF Corpus Generator
+Writes deterministic material datasheets, brochures and catalogues for scale
+testing: configurable page counts, a mix of text, spec-table, image-heavy,
+multi-product and scanned-looking pages, duplicate pages and padded large
+files. Every <name>.pdf comes with a <name>_output.json holding the expected
+extraction in the materials_schema.json format, plus a corpus manifest.
+
+The same seed always produces the same files, so load tests and benchmarks
+can run offline and reproducibly, e.g. with the mock LLM server:
+
+    python benchmarks/generate_corpus.py corpus/
+    python benchmarks/mock_llm_server.py --responses "corpus/*_output.json"
+"""
+
+import io
+import os
+import sys
+import json
+import random
+import hashlib
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_PATH = REPO_ROOT / "v0_initial_flow_n8n" / "schema" / "materials_schema.json"
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+SCAN_DPI = 150
+
+PAGE_KINDS = ("text", "table", "image", "multi", "scanned")
+
+# Built-in corpus: one document per row, from a single page up to 500 pages
+STANDARD_CORPUS = [
+    {"name": "spec_sheet_1p", "pages": 1, "mix": {"table": 1}},
+    {"name": "datasheet_4p", "pages": 4, "mix": {"text": 2, "table": 1, "image": 1}},
+    {"name": "brochure_12p", "pages": 12, "mix": {"image": 2, "multi": 2, "text": 1}},
+    {"name": "scanned_datasheet_6p", "pages": 6, "mix": {"scanned": 1}},
+    {"name": "catalogue_50p", "pages": 50, "mix": {"multi": 3, "table": 2, "text": 2, "image": 1, "scanned": 1},
+     "duplicate_rate": 0.1},
+    {"name": "catalogue_500p", "pages": 500, "mix": {"multi": 3, "table": 2, "text": 2, "image": 1, "scanned": 1},
+     "duplicate_rate": 0.05},
+    {"name": "lookbook_large_25mb", "pages": 16, "mix": {"image": 3, "multi": 1}, "min_mb": 25}
+]
+
+# Vocabulary for product records; enum values come from materials_schema.json
+SUPPLIERS = ["Nordstone Surfaces", "Atelier Verre", "Kasai Textiles", "Oakline Timber", "Ferro Metals BV",
+             "Acoustica Panels", "TerraCeram", "Resilia Floors"]
+CLASSES = {
+    "STONES & CERAMICS": ("Porcelain tile", "Fully vitrified porcelain stoneware"),
+    "WOOD": ("Engineered oak", "Oak veneer on birch plywood core"),
+    "RESILIENT FLOORING": ("Linoleum", "Linseed oil, wood flour, jute backing"),
+    "CARPETS": ("Carpet tile", "Solution-dyed polyamide 6, bitumen-free backing"),
+    "ENGINEERED SURFACES": ("Quartz composite", "93% quartz, polyester resin"),
+    "METALS": ("Perforated aluminium", "Aluminium 5005, anodised"),
+    "GLASS & MIRRORS": ("Laminated glass", "Float glass with PVB interlayer"),
+    "TEXTILES": ("Upholstery fabric", "85% wool, 15% polyamide"),
+    "ACOUSTIC SOLUTIONS": ("Acoustic panel", "Recycled PET felt")
+}
+ADJECTIVES = ["Matte", "Brushed", "Honed", "Natural", "Riven", "Satin", "Textured", "Polished", "Linear", "Terra"]
+NOUNS = ["Basalt", "Dune", "Fjord", "Meridian", "Atlas", "Solstice", "Ember", "Cirrus", "Quarry", "Harbor"]
+FORMATS = ["Tile", "Plank", "Sheet", "Panel", "Roll", "Slab"]
+FLAMMABILITY = ["A1", "A2-s1,d0", "Bfl-s1", "Cfl-s1", "B-s1,d0"]
+PLACES = ["Italy", "Spain", "Netherlands", "Germany", "Portugal", "Belgium", "Denmark"]
+
+SPEC_LABELS = [
+    ("material_category", "Category"),
+    ("material_class", "Material"),
+    ("composition", "Composition"),
+    ("format", "Format"),
+    ("dimensions", "Dimensions"),
+    ("weight", "Weight"),
+    ("available_colors", "Colours"),
+    ("flammability", "Fire rating"),
+    ("slip_resistance_with_shoes", "Slip resistance"),
+    ("place_of_production", "Made in"),
+    ("embodied_carbon", "Embodied carbon (kgCO2e/m2)"),
+    ("labels_and_certifications", "Certifications")
+]
+TABLE_FIELDS = ["product_name", "sku_number", "dimensions", "weight", "flammability", "slip_resistance_with_shoes",
+                "material_category", "composition", "place_of_production"]
+
+
+def load_enums():
+    """Allowed values of the enum fields in materials_schema.json"""
+    with open(SCHEMA_PATH, "r") as f:
+        properties = json.load(f)["properties"]["products"]["items"]["properties"]
+    return {
+        field: spec["properties"]["value"]["items"]["enum"]
+        for field, spec in properties.items()
+        if "enum" in spec["properties"]["value"].get("items", {})
+    }
+
+
+def make_product(rng, supplier, index, enums):
+    """One product record with ground-truth values for every printed field"""
+    category = rng.choice(sorted(CLASSES))
+    material_class, composition = CLASSES[category]
+    width, length = rng.choice([(300, 600), (600, 600), (200, 1200), (1000, 2000), (1200, 2400)])
+    thickness = rng.choice([6, 9, 10, 12, 20])
+    return {
+        "product_name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {index + 1:03d}",
+        "supplier": supplier,
+        "sku_number": f"{supplier[:3].upper()}-{rng.randint(10000, 99999)}-{index + 1:03d}",
+        "material_category": [category],
+        "material_class": material_class,
+        "composition": composition,
+        "format": rng.choice(FORMATS),
+        "dimensions": f"{width} x {length} x {thickness} mm",
+        "weight": f"{rng.randint(4, 48)} kg/m2",
+        "available_colors": sorted(rng.sample(enums["available_colors"], rng.randint(1, 3))),
+        "flammability": rng.choice(FLAMMABILITY),
+        "slip_resistance_with_shoes": f"R{rng.randint(9, 13)}",
+        "place_of_production": rng.choice(PLACES),
+        "embodied_carbon": round(rng.uniform(2, 40), 1),
+        "labels_and_certifications": sorted(rng.sample(enums["labels_and_certifications"], rng.randint(0, 2))),
+        "_color": tuple(rng.randint(60, 220) for _ in range(3)),
+        "_shown": {"product_name", "supplier", "sku_number"}
+    }
+
+
+def spec_value(product, field):
+    value = product[field]
+    return ", ".join(value) if isinstance(value, list) else str(value)
+
+
+def expected_output(products, pages):
+    """Expected extraction for a document, in the materials_schema.json shape
+
+    Only fields printed somewhere in the document are expected.
+    """
+    return {
+        "products": [
+            {field: {"value": value, "confidence": 1.0}
+             for field, value in product.items() if field in product["_shown"] and value != []}
+            for product in products
+        ],
+        "processing_summary": f"Extracted {len(products)} products from {pages} pages",
+        "processing_exceptions": ""
+    }
+
+
+# --- PDF writing ------------------------------------------------------------
+
+def pdf_string(text):
+    """A PDF literal string (Helvetica uses WinAnsi, so Latin-1 is enough)"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + escaped.encode("latin-1", errors="replace").decode("latin-1") + ")"
+
+
+class PdfWriter:
+    """Minimal PDF 1.4 writer: numbered objects, pages sharing one font"""
+
+    def __init__(self):
+        self.objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+                        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+                        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"]
+        self.pages = []
+
+    def add(self, body):
+        self.objects.append(body)
+        return len(self.objects)
+
+    def add_stream(self, data, entries=b""):
+        return self.add(b"<< %s /Length %d >>\nstream\n%s\nendstream" % (entries, len(data), data))
+
+    def add_jpeg(self, image):
+        """Embed a PIL image as a DCT-encoded image XObject"""
+        data = jpeg_bytes(image)
+        colorspace = b"/DeviceGray" if image.mode == "L" else b"/DeviceRGB"
+        return self.add_stream(data, b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+                                     b"/BitsPerComponent 8 /Filter /DCTDecode" % (image.width, image.height, colorspace))
+
+    def add_page(self, content, images=()):
+        """Add a page; returns (contents, resources) object numbers for reuse by duplicate pages"""
+        contents = self.add_stream(content.encode("latin-1"))
+        xobjects = b" ".join(b"/Im%d %d 0 R" % (i, ref) for i, ref in enumerate(images))
+        resources = self.add(b"<< /Font << /F1 3 0 R /F2 4 0 R >> /XObject << %s >> >>" % xobjects)
+        self.add_page_refs(contents, resources)
+        return contents, resources
+
+    def add_page_refs(self, contents, resources):
+        self.pages.append(self.add(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources %d 0 R "
+                                   b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, resources, contents)))
+
+    def write(self, path):
+        kids = b" ".join(b"%d 0 R" % ref for ref in self.pages)
+        self.objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages))
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for number, body in enumerate(self.objects, start=1):
+                offsets.append(f.tell())
+                f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+            xref = f.tell()
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1))
+            for offset in offsets:
+                f.write(b"%010d 00000 n \n" % offset)
+            f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.objects) + 1, xref))
+
+
+class Canvas:
+    """Text, rules and images for one page, in points from the top left
+
+    Renders to a PDF content stream, or to a PIL image for scanned pages.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def text(self, x, y, text, size=10, bold=False):
+        self.items.append(("text", x, y, text, size, bold))
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self.items.append(("line", x1, y1, x2, y2, width))
+
+    def image(self, index, x, y, width, height):
+        self.items.append(("image", index, x, y, width, height))
+
+    def content(self):
+        ops = []
+        for kind, *args in self.items:
+            if kind == "text":
+                x, y, text, size, bold = args
+                font = "/F2" if bold else "/F1"
+                ops.append(f"BT {font} {size} Tf {x:.1f} {PAGE_HEIGHT - y:.1f} Td {pdf_string(text)} Tj ET")
+            elif kind == "line":
+                x1, y1, x2, y2, width = args
+                ops.append(f"{width} w {x1:.1f} {PAGE_HEIGHT - y1:.1f} m {x2:.1f} {PAGE_HEIGHT - y2:.1f} l S")
+            else:
+                index, x, y, width, height = args
+                ops.append(f"q {width:.1f} 0 0 {height:.1f} {x:.1f} {PAGE_HEIGHT - y - height:.1f} cm /Im{index} Do Q")
+        return "\n".join(ops)
+
+    def rasterize(self, rng, dpi=SCAN_DPI):
+        """Greyscale render of the text and rules (images are left out)"""
+        from PIL import Image, ImageDraw, ImageFont
+
+        scale = dpi / 72
+        page = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 242)
+        draw = ImageDraw.Draw(page)
+        fonts = {}
+        for kind, *args in self.items:
+            if kind == "text":
+                x, y, text, size, _ = args
+                if size not in fonts:
+                    try:
+                        fonts[size] = ImageFont.load_default(size=size * scale)
+                    except TypeError:  # Pillow < 10.1 has a single bitmap font
+                        fonts[size] = ImageFont.load_default()
+                draw.text((x * scale, (y - size) * scale), text, fill=rng.randint(10, 50), font=fonts[size])
+            elif kind == "line":
+                x1, y1, x2, y2, width = args
+                draw.line((x1 * scale, y1 * scale, x2 * scale, y2 * scale), fill=60, width=max(1, int(width * scale)))
+        return page
+
+
+def jpeg_bytes(image, quality=85):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def swatch(rng, color, size):
+    """A material-like texture: base colour, grain lines and speckle noise"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, color)
+    draw = ImageDraw.Draw(img)
+    for _ in range(size[1] // 3):
+        y = rng.randint(0, size[1])
+        shade = tuple(max(0, min(255, c + rng.randint(-40, 40))) for c in color)
+        draw.line((0, y, size[0], y + rng.randint(-size[1] // 8, size[1] // 8)), fill=shade, width=rng.randint(1, 3))
+    noise = Image.frombytes("L", size, rng.randbytes(size[0] * size[1]))
+    return Image.blend(img, Image.merge("RGB", (noise, noise, noise)), 0.12)
+
+
+def padded_swatch(rng, color, size, min_bytes):
+    """A swatch whose JPEG is about min_bytes, for large-file documents
+
+    Extra noise keeps the bytes per pixel roughly constant, so one
+    measurement at the base size gives the scale needed.
+    """
+    from PIL import Image
+
+    img = swatch(rng, color, size)
+    if not min_bytes:
+        return img
+
+    def noisy(base, size):
+        noise = Image.frombytes("L", size, rng.randbytes(size[0] * size[1]))
+        return Image.blend(base.resize(size), Image.merge("RGB", (noise, noise, noise)), 0.25)
+
+    img = noisy(img, size)
+    scale = (min_bytes / len(jpeg_bytes(img))) ** 0.5
+    if scale > 1:
+        img = noisy(img, (int(size[0] * scale), int(size[1] * scale)))
+    return img
+
+
+# --- Page layouts -----------------------------------------------------------
+# Each layout draws its products onto a Canvas, marks the fields it printed
+# as shown, and returns the PIL images it placed (Im0, Im1, ...)
+
+def header(canvas, supplier, title, page_number):
+    canvas.text(MARGIN, MARGIN, supplier.upper(), 9, bold=True)
+    canvas.text(PAGE_WIDTH - MARGIN - 40, MARGIN, f"Page {page_number}", 9)
+    canvas.line(MARGIN, MARGIN + 8, PAGE_WIDTH - MARGIN, MARGIN + 8)
+    canvas.text(MARGIN, MARGIN + 40, title, 20, bold=True)
+
+
+def spec_lines(canvas, product, x, y, size=10, fields=SPEC_LABELS):
+    for field, label in fields:
+        if product[field] == []:
+            continue
+        canvas.text(x, y, f"{label}:", size, bold=True)
+        canvas.text(x + 16 * size, y, spec_value(product, field), size)
+        product["_shown"].add(field)
+        y += size * 1.6
+    return y
+
+
+def layout_text(canvas, rng, products, ctx):
+    product = products[0]
+    header(canvas, ctx["supplier"], product["product_name"], ctx["page"])
+    canvas.text(MARGIN, MARGIN + 62, f"Article {product['sku_number']}", 11)
+    y = MARGIN + 96
+    for _ in range(rng.randint(2, 4)):
+        for _ in range(rng.randint(3, 6)):
+            canvas.text(MARGIN, y, " ".join(rng.choice(ctx["words"]) for _ in range(12)), 10)
+            y += 14
+        y += 10
+    spec_lines(canvas, product, MARGIN, y + 10)
+    return []
+
+
+def layout_table(canvas, rng, products, ctx):
+    header(canvas, ctx["supplier"], "Technical specifications", ctx["page"])
+    columns = [("product_name", "Product", 0), ("sku_number", "SKU", 120), ("dimensions", "Dimensions", 215),
+               ("weight", "Weight", 310), ("flammability", "Fire", 365), ("slip_resistance_with_shoes", "Slip", 420)]
+    y = MARGIN + 80
+    for _, label, x in columns:
+        canvas.text(MARGIN + x, y, label, 9, bold=True)
+    canvas.line(MARGIN, y + 6, PAGE_WIDTH - MARGIN, y + 6, 1)
+    for product in products:
+        y += 20
+        for field, _, x in columns:
+            canvas.text(MARGIN + x, y, spec_value(product, field), 8)
+        canvas.line(MARGIN, y + 6, PAGE_WIDTH - MARGIN, y + 6)
+    y += 40
+    for product in products:
+        canvas.text(MARGIN, y, f"{product['product_name']}: {spec_value(product, 'material_category')}, "
+                               f"{product['composition']}, made in {product['place_of_production']}", 8)
+        product["_shown"].update(TABLE_FIELDS)
+        y += 14
+    return []
+
+
+def layout_image(canvas, rng, products, ctx):
+    product = products[0]
+    header(canvas, ctx["supplier"], product["product_name"], ctx["page"])
+    photo = padded_swatch(rng, product["_color"], (960, 720), ctx["min_image_bytes"])
+    width = PAGE_WIDTH - 2 * MARGIN
+    canvas.image(0, MARGIN, MARGIN + 70, width, width * 0.75)
+    y = MARGIN + 90 + width * 0.75
+    canvas.text(MARGIN, y, f"{product['sku_number']}  |  {product['dimensions']}", 11)
+    spec_lines(canvas, product, MARGIN, y + 28, 9, SPEC_LABELS[:7])
+    return [photo]
+
+
+def layout_multi(canvas, rng, products, ctx):
+    header(canvas, ctx["supplier"], "Collection overview", ctx["page"])
+    images = []
+    cell_width = (PAGE_WIDTH - 2 * MARGIN - 20) / 2
+    for i, product in enumerate(products):
+        x = MARGIN + (i % 2) * (cell_width + 20)
+        y = MARGIN + 80 + (i // 2) * 340
+        images.append(padded_swatch(rng, product["_color"], (480, 320), ctx["min_image_bytes"] // 2))
+        canvas.image(i, x, y, cell_width, cell_width * 2 / 3)
+        y += cell_width * 2 / 3 + 18
+        canvas.text(x, y, product["product_name"], 11, bold=True)
+        canvas.text(x, y + 14, product["sku_number"], 9)
+        spec_lines(canvas, product, x, y + 32, 7, SPEC_LABELS[:8])
+    return images
+
+
+def layout_scanned(canvas, rng, products, ctx):
+    """A text or table page rasterised to grey, skewed and noisy, with no text layer"""
+    from PIL import Image, ImageFilter
+
+    source = Canvas()
+    (layout_table if len(products) > 1 else layout_text)(source, rng, products, ctx)
+    page = source.rasterize(rng)
+    page = page.rotate(rng.uniform(-1.2, 1.2), resample=Image.Resampling.BICUBIC, fillcolor=242)
+    noise = Image.frombytes("L", page.size, rng.randbytes(page.width * page.height))
+    page = Image.blend(page, noise, 0.08).filter(ImageFilter.GaussianBlur(0.6))
+    canvas.image(0, 0, 0, PAGE_WIDTH, PAGE_HEIGHT)
+    return [page]
+
+
+# Layout and the range of products per page
+LAYOUTS = {
+    "text": (layout_text, (1, 1)),
+    "table": (layout_table, (4, 12)),
+    "image": (layout_image, (1, 1)),
+    "multi": (layout_multi, (2, 4)),
+    "scanned": (layout_scanned, (1, 5))
+}
+
+
+def parse_mix(spec):
+    """'text=2,table=1' -> {"text": 2.0, "table": 1.0}"""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in PAGE_KINDS:
+            raise ValueError(f"Unknown page kind: {kind} (choose from {', '.join(PAGE_KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def image_budget(spec, kinds, weights):
+    """Bytes per product photo so that the images add up to min_mb
+
+    A multi-product page carries about three half-budget photos.
+    """
+    if not spec.get("min_mb"):
+        return 0
+    share = sum(w * {"image": 1, "multi": 1.5}.get(k, 0) for k, w in zip(kinds, weights)) / sum(weights)
+    photos = spec["pages"] * (1 - spec.get("duplicate_rate", 0)) * share
+    return int(spec["min_mb"] * 1024 * 1024 / photos) if photos else 0
+
+
+def write_document(path, spec, seed=0):
+    """Write one synthetic PDF and return (expected_output, page_kinds)
+
+    spec: name, pages, mix ({page kind: weight}), and optionally
+    duplicate_rate (share of pages repeating an earlier page) and min_mb
+    (photos are padded until the file reaches roughly this size).
+    """
+    rng = random.Random(f"{seed}:{spec['name']}")
+    enums = load_enums()
+    supplier = rng.choice(SUPPLIERS)
+    kinds, weights = zip(*sorted(spec.get("mix", {"text": 1}).items()))
+
+    writer = PdfWriter()
+    products = []
+    page_kinds = []
+    rendered = []  # (contents, resources) of every original page, for duplicates
+    ctx = {"supplier": supplier, "min_image_bytes": image_budget(spec, kinds, weights),
+           "words": [w.lower() for w in ADJECTIVES + NOUNS + FORMATS] + ["the", "and", "with", "for", "of"]}
+
+    for page_number in range(1, spec["pages"] + 1):
+        if rendered and rng.random() < spec.get("duplicate_rate", 0):
+            writer.add_page_refs(*rng.choice(rendered))
+            page_kinds.append("duplicate")
+            continue
+
+        kind = rng.choices(kinds, weights)[0]
+        layout, (low, high) = LAYOUTS[kind]
+        page_products = [make_product(rng, supplier, len(products) + i, enums) for i in range(rng.randint(low, high))]
+        products.extend(page_products)
+
+        canvas = Canvas()
+        ctx["page"] = page_number
+        images = layout(canvas, rng, page_products, ctx)
+        rendered.append(writer.add_page(canvas.content(), [writer.add_jpeg(img) for img in images]))
+        page_kinds.append(kind)
+
+    writer.write(path)
+    return expected_output(products, spec["pages"]), page_kinds
+
+
+def file_sha256(path):
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def generate(output_dir, specs, seed=0):
+    """Write every document in specs plus corpus_manifest.json; returns the manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    documents = []
+    for spec in specs:
+        pdf_path = os.path.join(output_dir, f"{spec['name']}.pdf")
+        expected, page_kinds = write_document(pdf_path, spec, seed)
+        expected_path = os.path.join(output_dir, f"{spec['name']}_output.json")
+        with open(expected_path, "w") as f:
+            json.dump(expected, f, indent=2)
+
+        document = {
+            "name": spec["name"],
+            "pdf": os.path.basename(pdf_path),
+            "expected_output": os.path.basename(expected_path),
+            "pages": spec["pages"],
+            "page_kinds": {kind: page_kinds.count(kind) for kind in sorted(set(page_kinds))},
+            "products": len(expected["products"]),
+            "bytes": os.path.getsize(pdf_path),
+            "sha256": file_sha256(pdf_path)
+        }
+        documents.append(document)
+        print(f"{document['pdf']:32} {document['pages']:>4} pages {document['products']:>5} products "
+              f"{document['bytes'] / (1024 * 1024):>7.2f} MB", file=sys.stderr)
+
+    manifest = {"seed": seed, "documents": documents}
+    with open(os.path.join(output_dir, "corpus_manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic PDF corpus with expected outputs")
+    parser.add_argument("output_dir", help="Directory for the PDFs, *_output.json files and corpus_manifest.json")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (same seed, same bytes)")
+    parser.add_argument("--pages", help="Instead of the standard corpus, one document per comma-separated page count")
+    parser.add_argument("--mix", default="text=2,table=2,image=1,multi=2,scanned=1",
+                        help="Page kind weights for --pages documents (kinds: " + ", ".join(PAGE_KINDS) + ")")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Share of pages repeating an earlier page")
+    parser.add_argument("--min-mb", type=float, default=0.0, help="Pad images until each document is about this size")
+    parser.add_argument("--copies", type=int, default=1, help="Documents per page count (each with its own content)")
+    args = parser.parse_args()
+
+    if args.pages:
+        mix = parse_mix(args.mix)
+        specs = [
+            {"name": f"synthetic_{pages}p_{copy + 1:03d}", "pages": int(pages), "mix": mix,
+             "duplicate_rate": args.duplicate_rate, "min_mb": args.min_mb}
+            for pages in args.pages.split(",") for copy in range(args.copies)
+        ]
+    else:
+        specs = STANDARD_CORPUS
+
+    manifest = generate(args.output_dir, specs, args.seed)
+    total = sum(d["bytes"] for d in manifest["documents"])
+    print(f"Wrote {len(manifest['documents'])} documents ({total / (1024 * 1024):.1f} MB) to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
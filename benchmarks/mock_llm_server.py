@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+IMIS - Mock LLM Server
+Local stand-in for the Gemini generateContent API (and an OpenAI-style chat
+completions API) with configurable latency, error / 429 injection and canned
+responses from samples/*_output.json, for offline throughput testing
+
+Point the pipeline at it, e.g.
+    GEMINI_API_URL=http://127.0.0.1:8089/v1beta/models/gemini-pro-vision:generateContent
+    LLM_VISION_API_ENDPOINT=http://127.0.0.1:8089/v1beta/models/gemini-pro-vision:generateContent
+"""
+
+import sys
+import json
+import time
+import glob
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_RESPONSES = str(REPO_ROOT / "samples" / "*_output.json")
+
+
+def parse_latency(spec):
+    """Parse a latency distribution into a sampler returning seconds
+
+    Formats: fixed:S, uniform:LOW,HIGH, normal:MEAN,SD, lognormal:MEDIAN,SIGMA,
+    exponential:MEAN (all in seconds; samples are clamped at 0)
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    samplers = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "normal": lambda rng: rng.gauss(values[0], values[1]),
+        "lognormal": lambda rng: values[0] * rng.lognormvariate(0, values[1]),
+        "exponential": lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    sampler = samplers[kind]
+    return lambda rng: max(0.0, sampler(rng))
+
+
+def load_responses(pattern):
+    """Canned response texts, one per matching JSON file"""
+    responses = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r") as f:
+            responses.append(json.dumps(json.load(f)))
+    return responses or [json.dumps({"text": "Mock extraction result"})]
+
+
+class MockState:
+    """Configuration and counters shared by all request handlers"""
+
+    def __init__(self, args):
+        self.latency = parse_latency(args.latency)
+        self.latency_per_mb = args.latency_per_mb
+        self.error_rate = args.error_rate
+        self.throttle_rate = args.throttle_rate
+        self.retry_after = args.retry_after
+        self.rpm_limit = args.rpm_limit
+        self.responses = load_responses(args.responses)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.window = []
+        self.inflight = 0
+        self.stats = {"requests": 0, "status": {}, "max_inflight": 0, "bytes_received": 0}
+
+    def decide(self, body_size):
+        """Pick (status, latency) for one request under the lock, so a seeded run is reproducible"""
+        with self.lock:
+            now = time.monotonic()
+            self.stats["requests"] += 1
+            self.stats["bytes_received"] += body_size
+            latency = self.latency(self.rng) + self.latency_per_mb * body_size / (1024 * 1024)
+
+            if self.rpm_limit:
+                self.window = [t for t in self.window if now - t < 60]
+                if len(self.window) >= self.rpm_limit:
+                    return 429, 0.0
+                self.window.append(now)
+
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                return 429, 0.0
+            if roll < self.throttle_rate + self.error_rate:
+                return self.rng.choice([500, 503]), latency
+            return 200, latency
+
+    def record(self, status):
+        with self.lock:
+            key = str(status)
+            self.stats["status"][key] = self.stats["status"].get(key, 0) + 1
+
+    def enter(self):
+        with self.lock:
+            self.inflight += 1
+            self.stats["max_inflight"] = max(self.stats["max_inflight"], self.inflight)
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def response_text(self, body):
+        # Same request body, same canned response
+        index = int(hashlib.sha1(body).hexdigest(), 16) % len(self.responses)
+        return self.responses[index]
+
+
+def gemini_response(model, text, prompt_tokens):
+    output_tokens = max(1, len(text) // 4)
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens
+        },
+        "modelVersion": model
+    }
+
+
+def openai_response(model, text, prompt_tokens):
+    output_tokens = max(1, len(text) // 4)
+    return {
+        "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens
+        }
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # MockState, set by main()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.state.record(status)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            with self.state.lock:
+                stats = json.loads(json.dumps(dict(self.state.stats, inflight=self.state.inflight)))
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path.endswith(":generateContent"):
+            model = path.rsplit("/", 1)[-1].split(":", 1)[0]
+            build = gemini_response
+        elif path.endswith("/chat/completions"):
+            model = None
+            build = openai_response
+        else:
+            self._read_body()
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown endpoint {path}"}})
+            return
+
+        body = self._read_body()
+        if model is None:
+            try:
+                model = json.loads(body).get("model", "mock-model")
+            except ValueError:
+                model = "mock-model"
+
+        self.state.enter()
+        try:
+            status, latency = self.state.decide(len(body))
+            time.sleep(latency)
+            if status == 429:
+                self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted",
+                                                "status": "RESOURCE_EXHAUSTED"}},
+                                {"Retry-After": str(self.state.retry_after)})
+            elif status != 200:
+                self._send_json(status, {"error": {"code": status, "message": "Mock server error",
+                                                   "status": "UNAVAILABLE" if status == 503 else "INTERNAL"}})
+            else:
+                text = self.state.response_text(body)
+                self._send_json(200, build(model, text, max(1, len(body) // 4)))
+        finally:
+            self.state.leave()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Gemini / OpenAI-style LLM server for offline load testing")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8089, help="Port")
+    parser.add_argument("--latency", default="lognormal:1.5,0.4",
+                        help="Latency distribution: fixed:S, uniform:LO,HI, normal:MEAN,SD, "
+                             "lognormal:MEDIAN,SIGMA, exponential:MEAN")
+    parser.add_argument("--latency-per-mb", type=float, default=0.0, help="Extra seconds per MB of request body")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES, help="Glob of JSON files used as canned responses")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency and error injection")
+    args = parser.parse_args()
+
+    MockHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    print(f"Mock LLM server on http://{args.host}:{args.port} "
+          f"({len(MockHandler.state.responses)} canned responses, latency {args.latency})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
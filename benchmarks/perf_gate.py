@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+IMIS - Performance Regression Gate
+Compares a benchmark run (bench_hot_paths.py --save-baseline output) with a
+baseline run, or with the rolling history of previous runs, and exits
+non-zero when a benchmark got slower by more than the threshold and by more
+than its measured noise
+
+Noise is the median absolute deviation (MAD) of the repeated samples, or of
+the per-run medians when comparing against history, so a case that jitters
+by 15% is not flagged for a 15% change while a steady case is.
+
+    python benchmarks/bench_hot_paths.py --save-baseline run.json
+    python benchmarks/perf_gate.py run.json --baseline baseline.json
+    python benchmarks/perf_gate.py run.json --history benchmarks/perf_history.jsonl --record
+
+--record only adds runs that pass the gate, so a regression cannot become
+part of its own rolling baseline; --accept records a failing run anyway,
+for a slowdown that is intended.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+DEFAULT_THRESHOLD = 0.15  # Relative slowdown that fails the gate; runs of unchanged code differ by ~10%
+DEFAULT_NOISE_K = 3.0  # A change must also exceed this many (scaled) MADs
+DEFAULT_MAX_NOISE = 0.5  # Cap on the noise allowance, so a jittery case cannot hide any slowdown
+DEFAULT_MEMORY_THRESHOLD = 0.20
+DEFAULT_WINDOW = 10  # History runs used as the rolling baseline
+DEFAULT_HISTORY_SIZE = 100
+MIN_MEMORY_MB = 1.0  # Memory changes below this are ignored
+
+# Scales the MAD to a standard deviation for normally distributed samples
+MAD_SCALE = 1.4826
+
+
+def mad(values):
+    """Median absolute deviation"""
+    if len(values) < 2:
+        return 0.0
+    center = median(values)
+    return median(abs(v - center) for v in values)
+
+
+def benchmark_key(result):
+    return f"{result['case']} [{result['size']}]"
+
+
+def benchmarks_from(results):
+    """Benchmarks of a result list, keyed by "case [size]" (skipped cases left out)"""
+    benchmarks = {}
+    for result in results:
+        if "failed" in result:
+            benchmarks[benchmark_key(result)] = {"failed": result["failed"]}
+        if "ms" not in result:
+            continue
+        benchmarks[benchmark_key(result)] = {
+            "samples_ms": result.get("samples_ms") or [result["ms"]],
+            "python_peak_mb": result.get("python_peak_mb"),
+            "rss_growth_mb": result.get("rss_growth_mb")
+        }
+    return benchmarks
+
+
+def load_run(path):
+    with open(path, "r") as f:
+        run = json.load(f)
+    return run, benchmarks_from(run.get("results", []))
+
+
+def load_history(path):
+    """Runs recorded by --record, oldest first"""
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue
+    return runs
+
+
+def history_baseline(runs, window):
+    """Rolling baseline: each benchmark's medians over the last window runs
+    become its samples, so the noise estimate covers run-to-run variation"""
+    benchmarks = {}
+    for run in runs[-window:]:
+        for key, entry in run["benchmarks"].items():
+            if "median_ms" not in entry:
+                continue
+            baseline = benchmarks.setdefault(key, {"samples_ms": [], "python_peak_mb": None, "rss_growth_mb": None})
+            baseline["samples_ms"].append(entry["median_ms"])
+            # Memory is close to deterministic, so the latest run's value is used
+            baseline["python_peak_mb"] = entry.get("python_peak_mb")
+            baseline["rss_growth_mb"] = entry.get("rss_growth_mb")
+    return benchmarks
+
+
+def compare_benchmark(base, current, threshold, noise_k, memory_threshold, max_noise=DEFAULT_MAX_NOISE):
+    """Status and figures for one benchmark present in both runs"""
+    base_median = median(base["samples_ms"])
+    current_median = median(current["samples_ms"])
+    change = current_median / base_median - 1 if base_median else 0.0
+
+    # Relative noise of the noisier side; a single sample has no noise estimate
+    noise = min(max_noise, noise_k * MAD_SCALE * max(
+        mad(base["samples_ms"]) / base_median if base_median else 0.0,
+        mad(current["samples_ms"]) / current_median if current_median else 0.0
+    ))
+
+    if change > threshold:
+        status = "regression" if change > noise else "noisy"
+    elif change < -threshold and -change > noise:
+        status = "improved"
+    else:
+        status = "ok"
+
+    memory = {}
+    for field in ("python_peak_mb", "rss_growth_mb"):
+        old, new = base.get(field), current.get(field)
+        if old is None or new is None:
+            continue
+        memory[field] = {"base": old, "current": new}
+        if new - old > MIN_MEMORY_MB and new > old * (1 + memory_threshold) and status != "regression":
+            status = "memory regression"
+
+    return {
+        "base_ms": round(base_median, 4),
+        "current_ms": round(current_median, 4),
+        "change": round(change, 4),
+        "noise": round(noise, 4),
+        "base_samples": len(base["samples_ms"]),
+        "current_samples": len(current["samples_ms"]),
+        "memory": memory,
+        "status": status
+    }
+
+
+def compare_runs(baseline, current, threshold=DEFAULT_THRESHOLD, noise_k=DEFAULT_NOISE_K,
+                 memory_threshold=DEFAULT_MEMORY_THRESHOLD, max_noise=DEFAULT_MAX_NOISE):
+    """Per-benchmark comparison of two {key: benchmark} maps"""
+    report = {}
+    for key in sorted(set(baseline) | set(current)):
+        if key in current and "failed" in current[key]:
+            report[key] = {"status": "failed", "error": current[key]["failed"]}
+        elif key not in baseline or "failed" in baseline[key]:
+            report[key] = {"status": "new"}
+        elif key not in current:
+            report[key] = {"status": "missing"}
+        else:
+            report[key] = compare_benchmark(baseline[key], current[key], threshold, noise_k, memory_threshold,
+                                            max_noise)
+    return report
+
+
+def print_report(report):
+    print(f"{'benchmark':44} {'base ms':>11} {'now ms':>11} {'change':>8} {'noise':>7}  status")
+    for key, entry in report.items():
+        if "change" not in entry:
+            error = f": {entry['error']}" if entry.get("error") else ""
+            print(f"{key[:44]:44} {'':>11} {'':>11} {'':>8} {'':>7}  {entry['status']}{error}")
+            continue
+        print(f"{key[:44]:44} {entry['base_ms']:>11.3f} {entry['current_ms']:>11.3f} "
+              f"{entry['change']:>+8.1%} {entry['noise']:>6.1%}  {entry['status']}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_run(path, run, benchmarks, history_size):
+    """Append the run's per-benchmark summary to the history, keeping the last history_size runs"""
+    runs = load_history(path)
+    runs.append({
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "created": run.get("created"),
+        "commit": git_commit(),
+        "machine": run.get("machine"),
+        "python": run.get("python"),
+        "benchmarks": {
+            key: {
+                "median_ms": round(median(entry["samples_ms"]), 4),
+                "mad_ms": round(mad(entry["samples_ms"]), 4),
+                "samples": len(entry["samples_ms"]),
+                "python_peak_mb": entry["python_peak_mb"],
+                "rss_growth_mb": entry["rss_growth_mb"]
+            }
+            for key, entry in benchmarks.items()
+            if "samples_ms" in entry
+        }
+    })
+    runs = runs[-history_size:]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for entry in runs:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when benchmarks regress beyond threshold and noise")
+    parser.add_argument("current", help="Result file of the run under test (bench_hot_paths.py --save-baseline)")
+    parser.add_argument("--baseline", help="Result file to compare against (default: rolling history)")
+    parser.add_argument("--history", help="Rolling history file (JSON lines)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="History runs used as the baseline")
+    parser.add_argument("--record", action="store_true", help="Append the current run to the history if it passes")
+    parser.add_argument("--accept", action="store_true",
+                        help="With --record, record the run even when it regresses (an intended slowdown)")
+    parser.add_argument("--history-size", type=int, default=DEFAULT_HISTORY_SIZE, help="Runs kept in the history")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression (0.15 = 15%%)")
+    parser.add_argument("--noise-k", type=float, default=DEFAULT_NOISE_K,
+                        help="Slowdowns must also exceed this many scaled MADs")
+    parser.add_argument("--max-noise", type=float, default=DEFAULT_MAX_NOISE,
+                        help="Cap on the noise allowance (0.5 = 50%%)")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="Relative memory growth that counts as a regression")
+    parser.add_argument("--json", help="Write the comparison to this JSON file")
+    args = parser.parse_args()
+
+    if not args.baseline and not args.history:
+        parser.error("Give --baseline or --history")
+
+    run, current = load_run(args.current)
+    if args.baseline:
+        baseline_run, baseline = load_run(args.baseline)
+        source = args.baseline
+    else:
+        runs = load_history(args.history)
+        baseline_run = runs[-1] if runs else {}
+        baseline = history_baseline(runs, args.window)
+        source = f"{args.history} (last {min(len(runs), args.window)} runs)"
+
+    for field in ("machine", "python"):
+        if baseline_run.get(field) and run.get(field) and baseline_run[field] != run[field]:
+            print(f"Warning: baseline {field} {baseline_run[field]} differs from {run[field]}", file=sys.stderr)
+
+    regressions = []
+    if baseline:
+        report = compare_runs(baseline, current, args.threshold, args.noise_k, args.memory_threshold, args.max_noise)
+        print(f"Baseline: {source}")
+        print_report(report)
+        regressions = [key for key, entry in report.items()
+                       if entry["status"] in ("regression", "memory regression", "failed")]
+    else:
+        report = {}
+        print(f"No baseline runs in {source}; nothing to compare")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"baseline": source, "current": args.current, "threshold": args.threshold,
+                       "noise_k": args.noise_k, "benchmarks": report, "regressions": regressions}, f, indent=2)
+
+    if args.record:
+        if not args.history:
+            parser.error("--record needs --history")
+        if regressions and not args.accept:
+            print(f"Not recording a failing run in {args.history} (use --accept to record it anyway)")
+        else:
+            record_run(args.history, run, current, args.history_size)
+            print(f"Recorded run in {args.history}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
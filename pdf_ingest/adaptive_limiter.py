@@ -0,0 +1,136 @@
+# adaptive_limiter.py
+
+import time
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Statuses that mean "the provider is overloaded": shrink the window
+CONGESTION_STATUS = {429, 503}
+
+
+def parse_retry_after(value):
+    """Retry-After header (delta-seconds or HTTP-date) in seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter for LLM calls
+
+    Up to int(window) requests run at once. Every success with latency
+    under latency_target grows the window by increase / window (about
+    +increase per round trip of successes); a 429 or 503 multiplies it by
+    decrease_factor, at most once per round trip, and a Retry-After pauses
+    new requests until it has passed. Optional requests-per-minute and
+    tokens-per-minute budgets are enforced over a sliding minute.
+
+    Use one limiter per model (see limiter_for), since quotas are per model:
+
+        permit = limiter.acquire(tokens=estimate)
+        ... send the request ...
+        limiter.release(permit, status, retry_after=response.headers.get("Retry-After"))
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=32, increase=1.0, decrease_factor=0.5,
+                 latency_target=None, requests_per_minute=None, tokens_per_minute=None):
+        self.window = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.counts = {"ok": 0, "throttled": 0, "errors": 0}
+        self._budget = deque()  # (time, tokens) of requests started in the last minute
+        self._condition = threading.Condition()
+
+    def _budget_wait(self, now, tokens):
+        """Seconds until the per-minute budgets admit another request"""
+        while self._budget and now - self._budget[0][0] >= 60:
+            self._budget.popleft()
+        wait = 0.0
+        if self.requests_per_minute and len(self._budget) >= self.requests_per_minute:
+            wait = max(wait, 60 - (now - self._budget[0][0]))
+        if self.tokens_per_minute:
+            used = sum(t for _, t in self._budget)
+            # A single request larger than the budget still goes out once the minute is clear
+            for started, spent in self._budget:
+                if used + tokens <= self.tokens_per_minute:
+                    break
+                wait = max(wait, 60 - (now - started))
+                used -= spent
+        return wait
+
+    def acquire(self, tokens=0):
+        """Block until a request may start; returns a permit for release()"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = max(self.paused_until - now, self._budget_wait(now, tokens))
+                if wait <= 0 and self.inflight < int(self.window):
+                    break
+                self._condition.wait(timeout=wait if wait > 0 else None)
+            self.inflight += 1
+            self._budget.append((now, tokens))
+            return now
+
+    def release(self, permit, status, retry_after=None):
+        """Record a finished request (HTTP status, or None for a network error)"""
+        with self._condition:
+            now = time.monotonic()
+            self.inflight -= 1
+            latency = now - permit
+
+            if status in CONGESTION_STATUS:
+                self.counts["throttled"] += 1
+                # Requests that started before the last cut saw the old window; don't cut twice
+                if permit >= self.last_decrease:
+                    self.window = max(self.min_limit, self.window * self.decrease_factor)
+                    self.last_decrease = now
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    self.paused_until = max(self.paused_until, now + delay)
+            elif status is not None and status < 400:
+                self.counts["ok"] += 1
+                if self.latency_target is None or latency <= self.latency_target:
+                    self.window = min(self.max_limit, self.window + self.increase / self.window)
+            else:
+                self.counts["errors"] += 1
+
+            self._condition.notify_all()
+
+    def metrics(self):
+        """Current window and counters, for logs and dashboards"""
+        with self._condition:
+            return {
+                "window": round(self.window, 2),
+                "inflight": self.inflight,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+                **self.counts
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(model, **kwargs):
+    """Shared limiter for one model, created with kwargs on first use"""
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = AdaptiveLimiter(**kwargs)
+        return _limiters[model]
@@ -1,11 +1,27 @@
 # process_pdf.py
 
+import os
+import sys
+import json
+import time
 import base64
+import re
+import math
+import random
+import hashlib
+import argparse
+import tempfile
+import subprocess
 import requests
-import sys
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from adaptive_limiter import AdaptiveLimiter, limiter_for, parse_retry_after
+from text_layer import extract_text_layer, usable_text, format_layout
+from response_cache import ResponseCache, file_sha256, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_MB, DEFAULT_TTL_DAYS
 
-API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent"
-API_KEY = "YOUR_GEMINI_API_KEY"
+API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent")
+API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY")
 
 HEADERS = {
     "Content-Type": "application/json"
@@ -25,13 +41,67 @@ PROMPT = {
     ]
 }
 
+# Request timeouts in seconds: (connect, read)
+TIMEOUT = (10, 300)
+
+# Retries on 429 / 5xx / network errors, with full-jitter exponential backoff
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+MANIFEST_NAME = "results_manifest.json"
+
+# Adaptive concurrency: the window starts at --concurrency and moves between
+# 1 and --max-concurrency. Gemini bills each PDF page as about 258 tokens,
+# which is what the optional tokens-per-minute budget counts.
+MAX_CONCURRENCY = 32
+TOKENS_PER_PAGE = 258
+
+# Raw bytes per base64 chunk when streaming a request body (multiple of 3)
+BASE64_CHUNK_SIZE = 3 * 64 * 1024
+DATA_PLACEHOLDER = "__PDF_BASE64_DATA__"
+
+# Large PDFs are split into page-range chunks (poppler's pdfseparate/pdfunite).
+# Inline data is capped at 20MB per request and base64 adds a third, so chunks
+# stay well under 15MB of PDF.
+MAX_CHUNK_PAGES = 20
+MAX_CHUNK_BYTES = 14 * 1024 * 1024
+CHUNK_RETRY_ROUNDS = 1  # Extra passes over chunks that exhausted their retries
+
+# Without poppler, pages are counted from their /Type /Page objects (not
+# /Pages), and a PDF that cannot be counted at all is billed by its size
+PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+ESTIMATED_BYTES_PER_PAGE = 100 * 1024
+
+
+class GeminiAPIError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"Gemini API error: {status_code} {text}")
+        self.status_code = status_code
+
+
+def make_session(pool_size=10):
+    """Session whose connection pool can hold one connection per worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def backoff_delay(attempt):
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
 def encode_pdf_to_base64(pdf_path):
     with open(pdf_path, "rb") as f:
         return base64.b64encode(f.read()).decode("utf-8")
 
-def call_gemini_vision_api(pdf_path):
-    encoded = encode_pdf_to_base64(pdf_path)
-    body = {
+
+def build_request_body(encoded):
+    return {
         "contents": [
             {
                 "role": "user",
@@ -48,18 +118,488 @@ def call_gemini_vision_api(pdf_path):
         ]
     }
 
-    response = requests.post(f"{API_URL}?key={API_KEY}", headers=HEADERS, json=body)
-    if response.status_code == 200:
-        candidates = response.json().get("candidates", [])
-        return candidates[0]["content"]["parts"][0]["text"] if candidates else ""
-    else:
-        raise Exception(f"Gemini API error: {response.status_code} {response.text}")
+
+class StreamingRequestBody:
+    """JSON request body whose base64 PDF data is encoded while it is sent
+
+    The body is the JSON prefix, the file's base64 encoded BASE64_CHUNK_SIZE
+    bytes at a time, then the JSON suffix. Its length is known up front, so
+    requests sends a Content-Length instead of chunked encoding, and memory
+    per request stays at one chunk whatever the PDF's size. A body is
+    consumed by one send; build a new one for every attempt.
+    """
+
+    def __init__(self, pdf_path, chunk_size=BASE64_CHUNK_SIZE):
+        prefix, suffix = json.dumps(build_request_body(DATA_PLACEHOLDER)).split(DATA_PLACEHOLDER)
+        self.prefix = prefix.encode("utf-8")
+        self.suffix = suffix.encode("utf-8")
+        self.pdf_path = pdf_path
+        self.chunk_size = chunk_size
+        encoded_size = 4 * ((os.path.getsize(pdf_path) + 2) // 3)
+        self.length = len(self.prefix) + encoded_size + len(self.suffix)
+        self._chunks = self._generate()
+        self._buffer = b""
+
+    def __len__(self):
+        return self.length
+
+    def _generate(self):
+        yield self.prefix
+        with open(self.pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                yield base64.b64encode(block)
+        yield self.suffix
+
+    def __iter__(self):
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b""
+        yield from self._chunks
+
+    def read(self, size=-1):
+        # http.client reads file-like bodies in fixed-size blocks
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def call_gemini_vision_api(pdf_path, session=None, timeout=TIMEOUT, max_retries=MAX_RETRIES, stats=None,
+                           limiter=None, tokens=0):
+    # Without a session, fall back to a one-off connection
+    session = session or requests
+    attempt = 0
+    while True:
+        if stats is not None:
+            stats["attempts"] = attempt + 1
+        try:
+            # The body is streamed from the file, so each attempt needs a fresh one
+            body = StreamingRequestBody(pdf_path)
+            # The limiter bounds in-flight requests across documents and chunks
+            permit = limiter.acquire(tokens) if limiter is not None else None
+            try:
+                response = session.post(f"{API_URL}?key={API_KEY}", headers=HEADERS, data=body, timeout=timeout)
+            except BaseException:
+                if permit is not None:
+                    limiter.release(permit, None)
+                raise
+            if permit is not None:
+                limiter.release(permit, response.status_code, response.headers.get("Retry-After"))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= max_retries:
+                raise
+            error = e
+            retry_after = None
+        else:
+            if response.status_code == 200:
+                candidates = response.json().get("candidates", [])
+                return candidates[0]["content"]["parts"][0]["text"] if candidates else ""
+            if response.status_code not in RETRY_STATUS or attempt >= max_retries:
+                raise GeminiAPIError(response.status_code, response.text)
+            error = GeminiAPIError(response.status_code, response.text[:200])
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+        # Never retry sooner than the server asked
+        delay = max(backoff_delay(attempt), retry_after or 0)
+        print(f"Retrying {os.path.basename(pdf_path)} in {delay:.1f}s ({error})", file=sys.stderr)
+        time.sleep(delay)
+        attempt += 1
+
+
+def pdf_page_count(pdf_path):
+    """Page count from poppler's pdfinfo, or from the PDF's page objects without poppler
+
+    Returns None when neither can count the pages (no poppler, and page
+    objects packed into compressed object streams).
+    """
+    try:
+        output = subprocess.run(["pdfinfo", pdf_path], capture_output=True, text=True, check=True).stdout
+    except FileNotFoundError:
+        return scan_page_count(pdf_path)
+    for line in output.splitlines():
+        if line.startswith("Pages:"):
+            return int(line.split(":", 1)[1])
+    raise ValueError(f"No page count in pdfinfo output for {pdf_path}")
+
+
+def scan_page_count(pdf_path):
+    """Count the /Type /Page objects in the raw PDF bytes; None when there are none to see"""
+    with open(pdf_path, "rb") as f:
+        count = len(PAGE_OBJECT.findall(f.read()))
+    return count or None
+
+
+def estimated_tokens(pdf_path):
+    """Token estimate for a PDF whose pages could not be counted, from its size"""
+    return max(1, math.ceil(os.path.getsize(pdf_path) / ESTIMATED_BYTES_PER_PAGE)) * TOKENS_PER_PAGE
+
+
+def page_runs(pages, max_pages):
+    """Group sorted page numbers into (first, last) runs of consecutive pages, at most max_pages long"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1 and page - runs[-1][0] < max_pages:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def split_pdf(pdf_path, work_dir, page_count, max_pages=MAX_CHUNK_PAGES, max_bytes=MAX_CHUNK_BYTES, pages=None):
+    """Split a PDF into page-range chunks within the page and byte budgets
+
+    pages optionally restricts the chunks to a subset of the pages.
+    Returns a list of (first_page, last_page, chunk_path) in page order.
+    Ranges that come out over max_bytes are halved until they fit (a single
+    oversized page is sent on its own).
+    """
+    pattern = os.path.join(work_dir, "page-%d.pdf")
+    subprocess.run(["pdfseparate", pdf_path, pattern], capture_output=True, check=True)
+
+    def build(first, last):
+        if first == last:
+            return pattern % first
+        chunk_path = os.path.join(work_dir, f"chunk-{first}-{last}.pdf")
+        pages = [pattern % n for n in range(first, last + 1)]
+        subprocess.run(["pdfunite", *pages, chunk_path], capture_output=True, check=True)
+        return chunk_path
+
+    chunks = []
+    ranges = page_runs(pages or range(1, page_count + 1), max_pages)
+    while ranges:
+        first, last = ranges.pop(0)
+        chunk_path = build(first, last)
+        if first < last and os.path.getsize(chunk_path) > max_bytes:
+            middle = (first + last) // 2
+            ranges[:0] = [(first, middle), (middle + 1, last)]
+            continue
+        chunks.append((first, last, chunk_path))
+    return chunks
+
+
+def extract_pdf(pdf_path, session=None, max_pages=MAX_CHUNK_PAGES, max_bytes=MAX_CHUNK_BYTES,
+                limiter=None, stats=None, cache=None, refresh=False, text_layer="auto"):
+    """Extract a PDF, serving unchanged documents from the response cache
+
+    The cache key covers the PDF bytes, the prompt text and the model
+    endpoint, so editing either the prompt or the model invalidates it.
+    refresh=True skips the lookup but still stores the new result.
+
+    text_layer selects how embedded text is used: "auto" takes pages with a
+    usable text layer locally and sends only the rest to the vision model,
+    "off" sends every page, "only" never calls the model.
+    """
+    stats = stats if stats is not None else {}
+    key = None
+    if cache is not None:
+        key = ResponseCache.make_key(file_sha256(pdf_path), PROMPT["parts"][0]["text"], f"{API_URL}|text_layer={text_layer}")
+        if not refresh:
+            text = cache.get(key)
+            if text is not None:
+                stats["cache"] = "hit"
+                stats.setdefault("attempts", 0)
+                return text
+        stats["cache"] = "miss"
+
+    text = _extract_uncached(pdf_path, session, max_pages, max_bytes, limiter, stats, text_layer)
+    if key is not None:
+        cache.put(key, text, {"pdf": os.path.basename(pdf_path), "model": API_URL})
+    return text
+
+
+def read_text_layer(pdf_path, page_count, text_layer, stats):
+    """Formatted text of the pages whose text layer is usable, by page number
+
+    Returns (texts, page_count). A page_count of None is taken from the text
+    layer (pdftotext emits every page), and stays None when there is none.
+    With text_layer "only" an unreadable text layer is an error, since there
+    is no vision fallback.
+    """
+    if text_layer == "off":
+        return {}, page_count
+    try:
+        layer = extract_text_layer(pdf_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        if text_layer == "only":
+            raise Exception(f"No text layer for {os.path.basename(pdf_path)}: {str(e)}")
+        print(f"No text layer for {os.path.basename(pdf_path)}, using vision: {str(e)}", file=sys.stderr)
+        return {}, page_count
+
+    if page_count is None:
+        page_count = len(layer)
+    texts = {}
+    for page, text in enumerate(layer[:page_count], 1):
+        if text_layer == "only" or usable_text(text):
+            texts[page] = format_layout(text)
+    stats["text_pages"] = len(texts)
+    stats["vision_pages"] = 0 if text_layer == "only" else page_count - len(texts)
+    return texts, page_count
+
+
+def _extract_uncached(pdf_path, session, max_pages, max_bytes, limiter, stats, text_layer="auto"):
+    """Extract a PDF from its text layer, the vision model, or both
+
+    Pages with a usable text layer are read locally. The remaining pages go
+    to the vision model: a PDF within both budgets as one request, anything
+    else as concurrent page-range chunks of just those pages. Texts are
+    merged in page order. Each chunk retries on its own; chunks that still
+    fail get CHUNK_RETRY_ROUNDS more passes before the document is reported
+    failed.
+
+    The page count comes from pdfinfo, or from scanning the PDF without
+    poppler. A PDF whose pages cannot be counted at all is sent as a single
+    request, billed by its size; text_layer "only" reads the text layer and
+    never calls the model.
+    """
+    stats.setdefault("attempts", 0)
+    # "only" takes its page count from the text layer itself
+    page_count = None if text_layer == "only" else pdf_page_count(pdf_path)
+    texts, page_count = read_text_layer(pdf_path, page_count, text_layer, stats)
+    if text_layer == "only":
+        return "\n\n".join(texts[page] for page in sorted(texts))
+    if page_count is None:
+        print(f"Cannot count the pages of {os.path.basename(pdf_path)}, sending it unsplit "
+              f"(install poppler-utils)", file=sys.stderr)
+        return call_gemini_vision_api(pdf_path, session=session, stats=stats, limiter=limiter,
+                                      tokens=estimated_tokens(pdf_path))
+
+    vision_pages = [page for page in range(1, page_count + 1) if page not in texts]
+    if not vision_pages:
+        return "\n\n".join(texts[page] for page in sorted(texts))
+
+    within_bytes = os.path.getsize(pdf_path) <= max_bytes
+    if not texts and within_bytes and page_count <= max_pages:
+        return call_gemini_vision_api(pdf_path, session=session, stats=stats, limiter=limiter,
+                                      tokens=page_count * TOKENS_PER_PAGE)
+
+    with tempfile.TemporaryDirectory(prefix="pdf_chunks_") as work_dir:
+        try:
+            chunks = split_pdf(pdf_path, work_dir, page_count, max_pages, max_bytes, vision_pages)
+        except FileNotFoundError:
+            if texts:
+                raise
+            # Counted without poppler, so there is nothing to split with
+            print(f"pdfseparate not found, sending {os.path.basename(pdf_path)} unsplit (install poppler-utils)",
+                  file=sys.stderr)
+            return call_gemini_vision_api(pdf_path, session=session, stats=stats, limiter=limiter,
+                                          tokens=page_count * TOKENS_PER_PAGE)
+        stats["chunks"] = len(chunks)
+        errors = {}
+        remaining = chunks
+        for _ in range(CHUNK_RETRY_ROUNDS + 1):
+            with ThreadPoolExecutor(max_workers=len(remaining)) as executor:
+                futures = {}
+                for chunk in remaining:
+                    chunk_stats = {"attempts": 0}
+                    future = executor.submit(
+                        call_gemini_vision_api, chunk[2], session=session, stats=chunk_stats,
+                        limiter=limiter, tokens=(chunk[1] - chunk[0] + 1) * TOKENS_PER_PAGE
+                    )
+                    futures[future] = (chunk, chunk_stats)
+                failed = []
+                for future, (chunk, chunk_stats) in futures.items():
+                    try:
+                        texts[chunk[0]] = future.result()
+                        errors.pop(chunk[0], None)
+                    except Exception as e:
+                        errors[chunk[0]] = f"pages {chunk[0]}-{chunk[1]}: {str(e)}"
+                        failed.append(chunk)
+                    stats["attempts"] += chunk_stats["attempts"]
+            remaining = failed
+            if not remaining:
+                break
+
+        if errors:
+            stats["failed_chunks"] = [errors[first] for first in sorted(errors)]
+            raise Exception(f"{len(errors)} of {len(chunks)} chunks failed: " + "; ".join(stats["failed_chunks"]))
+
+    return "\n\n".join(texts[first] for first in sorted(texts))
+
+
+def collect_pdfs(inputs, list_file=None):
+    """Expand files, directories (searched recursively) and a list file into PDF paths"""
+    paths = list(inputs)
+    if list_file:
+        with open(list_file, "r") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pdfs.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+        else:
+            pdfs.append(path)
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(os.path.abspath(p) for p in pdfs))
+
+
+def output_names(pdf_paths):
+    """Map each PDF to a .txt name, disambiguating equal stems with a path hash"""
+    stems = {}
+    for path in pdf_paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        stems.setdefault(stem, []).append(path)
+    names = {}
+    for stem, paths in stems.items():
+        for path in paths:
+            suffix = "" if len(paths) == 1 else "_" + hashlib.sha1(path.encode()).hexdigest()[:8]
+            names[path] = f"{stem}{suffix}.txt"
+    return names
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def process_one(pdf_path, output_path, session, max_pages=MAX_CHUNK_PAGES, max_bytes=MAX_CHUNK_BYTES,
+                limiter=None, cache=None, refresh=False, text_layer="auto"):
+    """Extract one PDF into output_path and describe the outcome for the manifest"""
+    stats = {"attempts": 0}
+    start = time.perf_counter()
+    try:
+        text = extract_pdf(pdf_path, session, max_pages, max_bytes, limiter, stats, cache, refresh, text_layer)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        entry = {"status": "ok", "output": os.path.basename(output_path), "chars": len(text)}
+    except Exception as e:
+        entry = {"status": "error", "error": str(e)}
+    entry["attempts"] = stats["attempts"]
+    for field in ("chunks", "cache", "text_pages", "vision_pages"):
+        if field in stats:
+            entry[field] = stats[field]
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return pdf_path, entry
+
+
+def process_batch(pdf_paths, output_dir, concurrency=4, resume=False,
+                  max_pages=MAX_CHUNK_PAGES, max_bytes=MAX_CHUNK_BYTES, cache=None, refresh=False, limiter=None,
+                  text_layer="auto"):
+    """Extract many PDFs concurrently over one pooled session
+
+    Results are written to output_dir/<stem>.txt and summarised in
+    results_manifest.json, which is saved after every completed document
+    so an interrupted backfill can continue with resume=True. Chunks of
+    split documents share the same limiter as whole documents; without an
+    AdaptiveLimiter, concurrency stays fixed at `concurrency`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir) if resume else {}
+    names = output_names(pdf_paths)
+
+    if limiter is None:
+        limiter = AdaptiveLimiter(initial=concurrency, min_limit=concurrency, max_limit=concurrency)
+
+    pending = [p for p in pdf_paths if not (resume and manifest.get(p, {}).get("status") == "ok")]
+    print(f"{len(pdf_paths)} PDFs, {len(pdf_paths) - len(pending)} already done, "
+          f"{int(limiter.window)} concurrent requests (up to {limiter.max_limit})", file=sys.stderr)
+
+    session = make_session(limiter.max_limit)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=limiter.max_limit) as executor:
+        futures = [
+            executor.submit(process_one, path, os.path.join(output_dir, names[path]), session,
+                            max_pages, max_bytes, limiter, cache, refresh, text_layer)
+            for path in pending
+        ]
+        for future in as_completed(futures):
+            pdf_path, entry = future.result()
+            manifest[pdf_path] = entry
+            save_manifest(output_dir, manifest)
+            print(f"{entry['status']:5} {pdf_path} ({entry['seconds']}s, {entry['attempts']} attempts, "
+                  f"window {limiter.metrics()['window']})", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for p in pending if manifest[p]["status"] == "ok")
+    print(f"Processed {ok}/{len(pending)} PDFs in {elapsed:.1f}s", file=sys.stderr)
+    print(f"Limiter: {json.dumps(limiter.metrics())}", file=sys.stderr)
+    if cache is not None:
+        print_cache_stats(cache)
+    return manifest
+
+
+def print_cache_stats(cache):
+    stats = cache.stats()
+    print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['expired']} expired), hit rate {stats['hit_rate']:.0%}", file=sys.stderr)
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python process_pdf.py <path_to_pdf>")
+    parser = argparse.ArgumentParser(description="Extract structured text from PDFs with Gemini")
+    parser.add_argument("inputs", nargs="*", help="PDF files or directories of PDFs")
+    parser.add_argument("--list", help="File with one PDF path per line")
+    parser.add_argument("--output", help="Output directory for text files and the results manifest")
+    parser.add_argument("--concurrency", type=int, default=4, help="Initial concurrent API requests")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY,
+                        help="Upper bound for the adaptive concurrency window")
+    parser.add_argument("--static-concurrency", action="store_true",
+                        help="Keep concurrency fixed at --concurrency instead of adapting it")
+    parser.add_argument("--latency-target", type=float, default=None,
+                        help="Seconds; slower responses stop the window from growing")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute budget for the model")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute budget for the model")
+    parser.add_argument("--max-chunk-pages", type=int, default=MAX_CHUNK_PAGES,
+                        help="Split PDFs with more pages into chunks of at most this many pages")
+    parser.add_argument("--max-chunk-mb", type=float, default=MAX_CHUNK_BYTES / (1024 * 1024),
+                        help="Split PDFs larger than this into chunks under this size")
+    parser.add_argument("--text-layer", choices=["auto", "off", "only"], default="auto",
+                        help="auto: read pages with a usable text layer locally and send the rest to the vision "
+                             "model; off: send every page; only: never call the model")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached responses but store the new ones")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_PATH, help="Response cache directory")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_MB, help="Response cache size bound")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS, help="Age after which cached responses expire")
+    parser.add_argument("--resume", action="store_true", help="Skip PDFs the manifest records as done")
+    args = parser.parse_args()
+    max_chunk_bytes = int(args.max_chunk_mb * 1024 * 1024)
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024, args.cache_ttl_days * 86400)
+
+    max_concurrency = args.concurrency if args.static_concurrency else max(args.concurrency, args.max_concurrency)
+    limiter = limiter_for(
+        API_URL.rsplit("/", 1)[-1].split(":", 1)[0],
+        initial=args.concurrency,
+        min_limit=args.concurrency if args.static_concurrency else 1,
+        max_limit=max_concurrency,
+        latency_target=args.latency_target,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm
+    )
+
+    pdf_paths = collect_pdfs(args.inputs, args.list)
+    if not pdf_paths:
+        print("Usage: python process_pdf.py <path_to_pdf | directory>... [--output DIR]")
         sys.exit(1)
 
-    pdf_path = sys.argv[1]
-    extracted_text = call_gemini_vision_api(pdf_path)
-    print(extracted_text)
\ No newline at end of file
+    # A single PDF without --output keeps the original behaviour: text to stdout
+    if len(args.inputs) == 1 and os.path.isfile(args.inputs[0]) and not (args.list or args.output):
+        extracted_text = extract_pdf(pdf_paths[0], max_pages=args.max_chunk_pages, max_bytes=max_chunk_bytes,
+                                     limiter=limiter, cache=cache, refresh=args.refresh, text_layer=args.text_layer)
+        print(extracted_text)
+        if cache is not None:
+            print_cache_stats(cache)
+    else:
+        manifest = process_batch(pdf_paths, args.output or "./extracted", args.concurrency, args.resume,
+                                 args.max_chunk_pages, max_chunk_bytes, cache, args.refresh, limiter, args.text_layer)
+        if any(entry["status"] != "ok" for entry in manifest.values()):
+            sys.exit(1)
@@ -0,0 +1,178 @@
+# response_cache.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+DEFAULT_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./cache/gemini_responses")
+DEFAULT_CACHE_MAX_MB = 512
+DEFAULT_TTL_DAYS = 30
+# Eviction trims to this fraction of max_bytes, so a full cache is not
+# rescanned on every store
+EVICT_TARGET = 0.9
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of extraction results
+
+    Entries are keyed by (SHA-256 of the PDF bytes, SHA-256 of the prompt,
+    model endpoint) and stored as one JSON file each. Entries older than
+    ttl_seconds are treated as misses and removed; once the cache grows past
+    max_bytes, the least recently used entries (by mtime, refreshed on every
+    hit) are evicted.
+
+    The cache size is counted once and then kept as a running total of what
+    this process stores; other processes sharing the cache are picked up
+    when the total crosses max_bytes and evict() recounts.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_seconds=DEFAULT_TTL_DAYS * 86400):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._size_lock = threading.Lock()
+        self._size = None
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_sha256, prompt_text, model):
+        return hashlib.sha256(f"{pdf_sha256}:{text_sha256(prompt_text)}:{model}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _scan(self):
+        """(mtime, size, path) of every entry, and their total size"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def _add_size(self, delta):
+        with self._size_lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += delta
+
+    def get(self, key):
+        """Return the cached text for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._count("hits")
+        return entry["text"]
+
+    def put(self, key, text, metadata=None):
+        """Store text under key (atomically), then evict down to max_bytes"""
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        entry = {"created": time.time(), "text": text, **(metadata or {})}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            size = os.path.getsize(tmp_path)
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write response cache entry: {str(e)}", file=sys.stderr)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        self._add_size(size)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes
+
+        Only walks the cache when the running total says it is over the limit,
+        then trims to EVICT_TARGET of it.
+        """
+        with self._size_lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return 0
+
+            entries, total = self._scan()
+            self._size = total
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes * EVICT_TARGET:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._size = total
+            return removed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,76 @@
+# text_layer.py
+
+import re
+import subprocess
+
+# A page's text layer is used when it has enough text and that text looks
+# like language rather than font-encoding debris
+MIN_PAGE_CHARS = 40
+MIN_ALNUM_RATIO = 0.6
+MAX_JUNK_RATIO = 0.02
+MIN_WORD_RATIO = 0.5
+
+# Two or more spaces between tokens separate columns in pdftotext -layout
+COLUMN_GAP = re.compile(r"\s{2,}")
+WORD = re.compile(r"[^\W\d_]{2,}")
+
+
+def extract_text_layer(pdf_path):
+    """Return the embedded text of each page, in reading order
+
+    Uses poppler's pdftotext in -layout mode, which keeps columns and table
+    rows on their lines. Pages are separated by form feeds.
+    """
+    output = subprocess.run(
+        ["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"],
+        capture_output=True, check=True
+    ).stdout.decode("utf-8", errors="replace")
+    pages = output.split("\f")
+    # pdftotext ends the last page with a form feed too
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+def usable_text(text):
+    """Whether a page's text layer can stand in for the vision model
+
+    Rejects pages with (almost) no text, such as scans, and pages whose text
+    is garbled: undecodable glyphs, (cid:NN) placeholders, private-use
+    characters, or too few letters and recognisable words.
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < MIN_PAGE_CHARS:
+        return False
+
+    junk = text.count("\ufffd") + text.count("(cid:") + sum(
+        1 for c in chars if "\ue000" <= c <= "\uf8ff" or (ord(c) < 32)
+    )
+    if junk / len(chars) > MAX_JUNK_RATIO:
+        return False
+
+    if sum(1 for c in chars if c.isalnum()) / len(chars) < MIN_ALNUM_RATIO:
+        return False
+
+    tokens = text.split()
+    words = sum(1 for token in tokens if WORD.search(token))
+    return bool(tokens) and words / len(tokens) >= MIN_WORD_RATIO
+
+
+def format_layout(text):
+    """Tidy a -layout page: table rows become ' | '-separated cells
+
+    A line with two or more wide gaps is treated as a table row; other lines
+    keep their text with the indentation removed. Runs of blank lines
+    collapse to one.
+    """
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        cells = COLUMN_GAP.split(stripped)
+        lines.append(" | ".join(cells) if len(cells) >= 3 else " ".join(cells))
+    return "\n".join(lines).strip()
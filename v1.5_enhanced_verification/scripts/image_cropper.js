@@ -6,6 +6,67 @@ const fs = require('fs');
 const path = require('path');
 const util = require('util');
 const execPromise = util.promisify(exec);
+const { callImageWorker, isWorkerUnavailable, imageWorkerSocket, traceExecOptions } = require('./image_worker_client');
+
+/**
+ * Crops all regions of one page by running the Python cropper as a one-off process
+ * @param {string} imagePath - Page image to crop
+ * @param {Array} bboxes - Bounding boxes [[x1, y1, x2, y2], ...]
+ * @param {string} cropsDir - Directory for the crops
+ * @param {Object} trace - Optional trace context from the webhook payload
+ * @returns {Array} - One crop result per bbox, in order
+ */
+const cropBatchWithProcess = async function(imagePath, bboxes, cropsDir, trace) {
+  const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
+  const command = `python "${pythonScript}" crop-batch "${imagePath}" '${JSON.stringify(bboxes)}' --output "${cropsDir}" --padding 20`;
+  
+  const { stdout, stderr } = await execPromise(command, traceExecOptions(trace));
+  
+  if (stderr && !stderr.includes('INFO')) {
+    throw new Error(stderr);
+  }
+  
+  // The batch result is the last line of output
+  const resultLine = stdout.trim().split('\n').pop();
+  return JSON.parse(resultLine).crops;
+};
+
+/**
+ * Renders all regions of one page straight from the PDF at a higher DPI, in one request
+ * @param {string|null} workerSocket - Image worker socket, or null to spawn a process
+ * @param {string} pdfPath - Source PDF
+ * @param {number} page - Page number
+ * @param {string} imagePath - Page image the bboxes refer to (used to derive its DPI)
+ * @param {Array} bboxes - Bounding boxes [[x1, y1, x2, y2], ...] in page-image pixels
+ * @param {string} cropsDir - Directory for the region images
+ * @param {Object} trace - Optional trace context from the webhook payload
+ * @returns {Array} - One region result per bbox, in order (null where rendering failed)
+ */
+const renderRegions = async function(workerSocket, pdfPath, page, imagePath, bboxes, cropsDir, trace) {
+  const renderDpi = parseInt(process.env.CROP_RENDER_DPI || '600', 10);
+  
+  if (workerSocket) {
+    const result = await callImageWorker(workerSocket, 'render_regions', {
+      pdf_path: pdfPath,
+      page: parseInt(page, 10),
+      bboxes,
+      output_dir: cropsDir,
+      source_image: imagePath,
+      render_dpi: renderDpi,
+      padding: 20,
+      trace
+    });
+    return result.regions;
+  }
+  
+  const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
+  const command = `python "${pythonScript}" render-regions "${pdfPath}" ${page} '${JSON.stringify(bboxes)}' --source-image "${imagePath}" --dpi ${renderDpi} --output "${cropsDir}" --padding 20`;
+  const { stdout } = await execPromise(command, traceExecOptions(trace));
+  
+  // The batch result is the last line of output
+  const resultLine = stdout.trim().split('\n').pop();
+  return JSON.parse(resultLine).regions;
+};
 
 /**
  * Crops regions from page images based on field coordinates
@@ -53,8 +114,14 @@ const imageCropper = async function(items, runIndex) {
     
     // Process each field with location data
     const fieldCrops = {};
-    const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
+    let workerSocket = imageWorkerSocket();
     
+    // CROP_SOURCE=pdf renders each field's region from the PDF instead of cropping the page image
+    const pdfPath = item.json.file_path;
+    const renderFromPdf = (process.env.CROP_SOURCE || 'page') === 'pdf' && Boolean(pdfPath);
+    
+    // Group fields by page so each page image is decoded once
+    const fieldsByPage = {};
     for (const [fieldName, fieldData] of Object.entries(extractedFields)) {
       // Skip fields without location data
       if (!fieldData.location || !fieldData.location.page || !fieldData.location.bbox) {
@@ -62,41 +129,86 @@ const imageCropper = async function(items, runIndex) {
       }
       
       const page = fieldData.location.page;
-      const bbox = fieldData.location.bbox;
       
       // Find the image for this page
-      const imagePath = pageImageMap[page];
-      if (!imagePath) {
+      if (!pageImageMap[page]) {
         console.warn(`No image found for page ${page} of field ${fieldName}`);
         continue;
       }
       
-      // Convert bbox array to string
-      const bboxString = bbox.join(',');
-      
-      // Execute the cropping
-      const command = `python "${pythonScript}" crop "${imagePath}" ${bboxString} --output "${cropsDir}" --padding 20`;
-      
-      const { stdout, stderr } = await execPromise(command);
+      (fieldsByPage[page] = fieldsByPage[page] || []).push({ fieldName, fieldData });
+    }
+    
+    for (const [page, fields] of Object.entries(fieldsByPage)) {
+      const imagePath = pageImageMap[page];
+      const bboxes = fields.map(field => field.fieldData.location.bbox);
       
-      if (stderr && !stderr.includes('INFO')) {
-        console.error(`Cropper error for ${fieldName}: ${stderr}`);
+      // Prefer the long-lived image worker; fall back to a one-off process
+      let crops = null;
+      try {
+        if (renderFromPdf) {
+          try {
+            crops = await renderRegions(workerSocket, pdfPath, page, imagePath, bboxes, cropsDir, item.json.trace);
+          } catch (error) {
+            if (isWorkerUnavailable(error)) {
+              workerSocket = null;
+            }
+            console.warn(`Region rendering failed for page ${page}, cropping page image: ${error.message}`);
+          }
+        }
+        
+        // Crop the page image for every region not rendered from the PDF, in one batch
+        const missing = bboxes.map((bbox, index) => index).filter(index => !(crops && crops[index] && crops[index].path));
+        if (missing.length > 0) {
+          const missingBboxes = missing.map(index => bboxes[index]);
+          let pageCrops = null;
+          if (workerSocket) {
+            try {
+              const result = await callImageWorker(workerSocket, 'crop_batch', {
+                image_path: imagePath,
+                bboxes: missingBboxes,
+                output_dir: cropsDir,
+                padding: 20,
+                trace: item.json.trace
+              });
+              pageCrops = result.crops;
+            } catch (error) {
+              // A failed request only fails this page; stop using the worker when it is not running
+              if (!isWorkerUnavailable(error)) {
+                throw error;
+              }
+              console.warn(`Image worker unavailable, spawning cropper processes: ${error.message}`);
+              workerSocket = null;
+            }
+          }
+          if (!pageCrops) {
+            pageCrops = await cropBatchWithProcess(imagePath, missingBboxes, cropsDir, item.json.trace);
+          }
+          
+          crops = crops || new Array(bboxes.length).fill(null);
+          missing.forEach((index, position) => {
+            crops[index] = pageCrops[position];
+          });
+        }
+      } catch (error) {
+        console.error(`Cropper error for page ${page}: ${error.message}`);
         continue;
       }
       
-      // Parse the output to get cropped image path
-      const cropPathLine = stdout.split('\n').find(line => line.includes('Cropped image:'));
-      if (cropPathLine) {
-        const cropPath = cropPathLine.split('Cropped image:')[1].trim();
+      fields.forEach(({ fieldName, fieldData }, index) => {
+        const crop = crops[index];
+        if (!crop || !crop.path) {
+          return;
+        }
         
         // Store the crop information
         fieldCrops[fieldName] = {
           original_field: fieldData,
-          crop_path: cropPath,
-          source_page: page,
-          source_bbox: bbox
+          crop_path: crop.path,
+          source_page: fieldData.location.page,
+          source_bbox: fieldData.location.bbox
         };
-      }
+      });
     }
     
     // Create lifecycle log entry
@@ -0,0 +1,100 @@
+// Image Worker Client for IMIS V1.5
+// Sends JSON-lines requests to a long-lived `image_processing.py serve` worker
+
+const net = require('net');
+
+let nextRequestId = 1;
+
+// Socket errors meaning no worker is listening, as opposed to a request that failed
+const UNAVAILABLE_CODES = new Set(['ENOENT', 'ECONNREFUSED', 'EACCES', 'ENOTSOCK']);
+
+/**
+ * Error returned by the worker for one request; the worker itself is healthy
+ */
+class ImageWorkerError extends Error {}
+
+/**
+ * Calls a method on the image worker listening on a Unix socket
+ * @param {string} socketPath - Path of the worker's Unix socket
+ * @param {string} method - Worker method (health, paginate, crop)
+ * @param {Object} params - Method parameters
+ * @param {number} timeoutMs - Maximum time to wait for the response
+ * @returns {Promise<Object>} - The method's result; rejects with an ImageWorkerError when the
+ *   worker answers with an error, or a socket error (see isWorkerUnavailable) when it cannot be reached
+ */
+const callImageWorker = function(socketPath, method, params = {}, timeoutMs = 300000) {
+  return new Promise((resolve, reject) => {
+    const requestId = nextRequestId++;
+    const socket = net.createConnection(socketPath);
+    let buffer = '';
+
+    socket.setTimeout(timeoutMs, () => {
+      socket.destroy(new Error(`Image worker timed out after ${timeoutMs}ms`));
+    });
+
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({ id: requestId, method, params }) + '\n');
+    });
+
+    socket.on('data', (chunk) => {
+      buffer += chunk.toString('utf8');
+      const newline = buffer.indexOf('\n');
+      if (newline === -1) {
+        return;
+      }
+
+      socket.end();
+      try {
+        const response = JSON.parse(buffer.slice(0, newline));
+        if (response.error) {
+          reject(new ImageWorkerError(`Image worker ${method} failed: ${response.error}`));
+        } else {
+          resolve(response.result);
+        }
+      } catch (error) {
+        reject(new ImageWorkerError(`Invalid image worker response: ${error.message}`));
+      }
+    });
+
+    socket.on('error', reject);
+  });
+};
+
+/**
+ * Whether an error from callImageWorker means the worker is not running, so callers should
+ * stop using it and spawn processes instead. Error responses and timeouts are not: the
+ * worker is up, and only that request failed (or is still running).
+ * @param {Error} error - Rejection from callImageWorker
+ * @returns {boolean}
+ */
+const isWorkerUnavailable = function(error) {
+  return UNAVAILABLE_CODES.has(error.code);
+};
+
+/**
+ * Returns the configured worker socket, or null when the worker is not in use
+ * @returns {string|null}
+ */
+const imageWorkerSocket = function() {
+  return process.env.IMAGE_WORKER_SOCKET || null;
+};
+
+/**
+ * Options for exec() that pass a trace context to a one-off image_processing.py process
+ * @param {Object|undefined} trace - Trace context from the webhook payload ({trace_id, parent_span_id, request_id})
+ * @returns {Object} - exec options (empty when the request is not traced)
+ */
+const traceExecOptions = function(trace) {
+  if (!trace || !trace.trace_id) {
+    return {};
+  }
+  return { env: { ...process.env, IMIS_TRACE_CONTEXT: JSON.stringify(trace) } };
+};
+
+module.exports = {
+  ImageWorkerError,
+  callImageWorker,
+  isWorkerUnavailable,
+  imageWorkerSocket,
+  traceExecOptions
+};
@@ -1,11 +1,122 @@
 // PDF Paginator Node Implementation for IMIS V1.5
 // Converts PDFs to sequences of page images for multimodal LLM processing
 
-const { exec } = require('child_process');
+const { exec, execFile } = require('child_process');
 const fs = require('fs');
 const path = require('path');
 const util = require('util');
 const execPromise = util.promisify(exec);
+const { callImageWorker, isWorkerUnavailable, imageWorkerSocket, traceExecOptions } = require('./image_worker_client');
+
+/**
+ * Runs the Python paginator as a one-off process and parses its output
+ * @param {string} pdfPath - PDF to paginate
+ * @param {string} pagesDir - Directory for the page images
+ * @param {Object} options - dpi, adaptive, target_long_edge, dense_dpi
+ * @param {Object} trace - Optional trace context from the webhook payload
+ * @returns {Array} - Page images as {page, path}
+ */
+const paginateWithProcess = async function(pdfPath, pagesDir, options, trace) {
+  const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
+  let command = `python "${pythonScript}" paginate "${pdfPath}" --output "${pagesDir}" --dpi ${options.dpi}`;
+  if (options.adaptive) {
+    command += ` --adaptive --target-long-edge ${options.target_long_edge} --dense-dpi ${options.dense_dpi}`;
+  }
+  
+  const { stdout, stderr } = await execPromise(command, traceExecOptions(trace));
+  
+  if (stderr && !stderr.includes('INFO')) {
+    console.error(`Paginator error: ${stderr}`);
+    throw new Error(`PDF pagination failed: ${stderr}`);
+  }
+  
+  // Parse the output to get image paths
+  const pageImages = [];
+  const lines = stdout.split('\n');
+  
+  for (const line of lines) {
+    if (line.includes('Page') && line.includes(':')) {
+      const pagePart = line.split('Page ')[1];
+      if (pagePart) {
+        const [pageNum, imagePath] = pagePart.split(':').map(s => s.trim());
+        if (pageNum && imagePath) {
+          pageImages.push({
+            page: parseInt(pageNum, 10),
+            path: imagePath
+          });
+        }
+      }
+    }
+  }
+  
+  return pageImages;
+};
+
+/**
+ * Runs a command without a shell, writing input to its stdin
+ * @param {string} file - Executable
+ * @param {Array} args - Arguments
+ * @param {string} input - Text written to stdin
+ * @param {Object} options - execFile options
+ * @returns {Object} - {stdout, stderr}
+ */
+const execFileWithInput = function(file, args, input, options) {
+  return new Promise((resolve, reject) => {
+    const child = execFile(file, args, options, (error, stdout, stderr) => {
+      if (error) {
+        reject(error);
+        return;
+      }
+      resolve({ stdout, stderr });
+    });
+    child.stdin.end(input);
+  });
+};
+
+/**
+ * Drops blank pages and pages already seen in this document or its group
+ * @param {string|null} workerSocket - Image worker socket, or null to spawn a process
+ * @param {Array} pageImages - Page images as {page, path}
+ * @param {string} documentId - Document ID recorded in the group index
+ * @param {string|null} groupIndexPath - Fingerprint index shared by the document group
+ * @param {Object} trace - Optional trace context from the webhook payload
+ * @returns {Object} - {kept, skipped}
+ */
+const filterPages = async function(workerSocket, pageImages, documentId, groupIndexPath, trace) {
+  if (workerSocket) {
+    try {
+      return await callImageWorker(workerSocket, 'filter_pages', {
+        pages: pageImages,
+        document_id: documentId,
+        group_index_path: groupIndexPath,
+        trace
+      });
+    } catch (error) {
+      if (!isWorkerUnavailable(error)) {
+        throw error;
+      }
+      console.warn(`Image worker unavailable, spawning page filter process: ${error.message}`);
+    }
+  }
+  
+  // The page list goes over stdin: paths may contain quotes, and a long
+  // document's list can exceed the per-argument size limit
+  const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
+  const args = [pythonScript, 'filter-pages', '-', '--document-id', documentId];
+  if (groupIndexPath) {
+    args.push('--group-index', groupIndexPath);
+  }
+  
+  const { stdout, stderr } = await execFileWithInput('python', args, JSON.stringify(pageImages), traceExecOptions(trace));
+  
+  if (stderr && !stderr.includes('INFO')) {
+    throw new Error(stderr);
+  }
+  
+  // The filter result is the last line of output
+  const resultLine = stdout.trim().split('\n').pop();
+  return JSON.parse(resultLine);
+};
 
 /**
  * Converts a PDF file to a sequence of page images
@@ -48,39 +159,61 @@ const pdfPaginator = async function(items, runIndex) {
       fs.mkdirSync(pagesDir, { recursive: true });
     }
     
-    // Run the Python paginator script
-    const pythonScript = path.join(__dirname, 'utils', 'image_processing.py');
-    const command = `python "${pythonScript}" paginate "${pdfPath}" --output "${pagesDir}" --dpi 300`;
-    
-    const { stdout, stderr } = await execPromise(command);
+    const dpi = parseInt(process.env.PDF_DPI || '300', 10);
+    const options = { dpi, adaptive: (process.env.PDF_DPI_MODE || 'fixed') === 'adaptive' };
     
-    if (stderr && !stderr.includes('INFO')) {
-      console.error(`Paginator error: ${stderr}`);
-      throw new Error(`PDF pagination failed: ${stderr}`);
+    // Adaptive mode picks a DPI per page from a low-DPI preview
+    if (options.adaptive) {
+      options.target_long_edge = parseInt(process.env.PDF_TARGET_LONG_EDGE || '2048', 10);
+      options.dense_dpi = parseInt(process.env.PDF_DENSE_DPI || String(dpi), 10);
     }
     
-    // Parse the output to get image paths
-    const pageImages = [];
-    const lines = stdout.split('\n');
-    
-    for (const line of lines) {
-      if (line.includes('Page') && line.includes(':')) {
-        const pagePart = line.split('Page ')[1];
-        if (pagePart) {
-          const [pageNum, imagePath] = pagePart.split(':').map(s => s.trim());
-          if (pageNum && imagePath) {
-            pageImages.push({
-              page: parseInt(pageNum, 10),
-              path: imagePath
-            });
-          }
+    // Prefer the long-lived image worker; fall back to a one-off process only when it is
+    // not running (a failed or timed-out request would just be repeated)
+    let pageImages = null;
+    const workerSocket = imageWorkerSocket();
+    if (workerSocket) {
+      try {
+        const result = await callImageWorker(workerSocket, 'paginate', {
+          ...options,
+          pdf_path: pdfPath,
+          output_dir: pagesDir,
+          trace: item.json.trace
+        });
+        pageImages = result.pages.map(img => ({ page: img.page, path: img.path }));
+      } catch (error) {
+        if (!isWorkerUnavailable(error)) {
+          throw error;
         }
+        console.warn(`Image worker unavailable, spawning paginator process: ${error.message}`);
       }
     }
     
+    if (!pageImages) {
+      pageImages = await paginateWithProcess(pdfPath, pagesDir, options, item.json.trace);
+    }
+    
     // Sort images by page number
     pageImages.sort((a, b) => a.page - b.page);
     
+    // Optionally skip blank pages and pages repeated within the document group
+    let skippedPages = [];
+    if (process.env.SKIP_DUPLICATE_PAGES === 'true' && pageImages.length > 0) {
+      const groupIndexPath = item.json.group_id
+        ? path.join(storageRoot, 'groups', String(item.json.group_id), 'page_fingerprints.json')
+        : null;
+      if (groupIndexPath) {
+        fs.mkdirSync(path.dirname(groupIndexPath), { recursive: true });
+      }
+      try {
+        const filtered = await filterPages(workerSocket, pageImages, documentId, groupIndexPath, item.json.trace);
+        pageImages = filtered.kept.map(img => ({ page: img.page, path: img.path }));
+        skippedPages = filtered.skipped;
+      } catch (error) {
+        console.warn(`Page filtering failed, keeping all pages: ${error.message}`);
+      }
+    }
+    
     // Create lifecycle log entry
     const logEntry = {
       document_id: documentId,
@@ -88,7 +221,10 @@ const pdfPaginator = async function(items, runIndex) {
       to_state: "PAGINATED",
       timestamp: new Date().toISOString(),
       agent: "pdf_paginator_v1.5",
-      notes: `PDF converted to ${pageImages.length} page images`
+      notes: `PDF converted to ${pageImages.length} page images` +
+        (skippedPages.length > 0
+          ? ` (skipped ${skippedPages.map(p => `page ${p.page}: ${p.reason}`).join(', ')})`
+          : '')
     };
     
     // Return the processed data
@@ -96,6 +232,7 @@ const pdfPaginator = async function(items, runIndex) {
       json: {
         ...item.json,
         page_images: pageImages,
+        skipped_pages: skippedPages,
         pages_directory: pagesDir,
         document_id: documentId,
         _lifecycle_log: [...(item.json._lifecycle_log || []), logEntry]
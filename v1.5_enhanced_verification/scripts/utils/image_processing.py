@@ -5,10 +5,22 @@ Provides PDF pagination and image cropping functionality
 """
 
 import os
+import re
+import sys
+import json
+import io
+import base64
+import mimetypes
+import time
 import logging
+import threading
+import subprocess
 import uuid
+import fcntl
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Iterator, BinaryIO, TYPE_CHECKING
 
 # Configure logging
 logging.basicConfig(
@@ -19,17 +31,65 @@ logger = logging.getLogger('imis_image_processor')
 
 try:
     # Attempt to import pdf2image (requires poppler)
-    from pdf2image import convert_from_path
-    from PIL import Image
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    from PIL import Image, ImageFilter, ImageStat
     DEPS_INSTALLED = True
 except ImportError:
     logger.warning("Required dependencies not installed. Please install with: pip install pdf2image pillow")
     DEPS_INSTALLED = False
 
+from page_cache import PageCache, file_sha256, page_entry_name, crop_entry_name, region_entry_name
+
+if TYPE_CHECKING:
+    # raster_scheduler imports this module, so it is imported lazily at runtime
+    from raster_scheduler import RasterScheduler
+
 # Define types for type hinting
 BoundingBox = Tuple[int, int, int, int]  # [x1, y1, x2, y2]
 ImageInfo = Dict[str, Any]  # Will contain path, dimensions, etc.
 
+# Adaptive rendering: vision models downsample anything larger than a few
+# thousand pixels, so the long edge is budgeted rather than the DPI
+DEFAULT_TARGET_LONG_EDGE = 2048
+PREVIEW_DPI = 36
+PREVIEW_GRID = 8
+PREVIEW_EDGE_THRESHOLD = 64
+DENSE_CELL_THRESHOLD = 0.2
+DENSE_PAGE_THRESHOLD = 0.15
+
+# Base64 streaming: source bytes encoded per chunk (a multiple of 3)
+BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+# Vision model input profiles. Providers downsample larger images internally,
+# so pixels beyond max_long_edge only cost upload and encode time. With a
+# tile_size, a long edge just past a tile boundary is snapped down to it.
+MODEL_PROFILES = {
+    "default": {"max_long_edge": 2048, "tile_size": 0, "format": "JPEG", "quality": 85},
+    "gemini": {"max_long_edge": 3072, "tile_size": 768, "format": "JPEG", "quality": 85},
+    "claude": {"max_long_edge": 1568, "tile_size": 0, "format": "JPEG", "quality": 85},
+    "openai": {"max_long_edge": 2048, "tile_size": 512, "format": "JPEG", "quality": 85}
+}
+TILE_SNAP_FRACTION = 0.25
+
+# Page fingerprints: a difference hash on a HASH_SIZE x HASH_SIZE thumbnail.
+# A page is blank when its thumbnail barely varies and has no dark marks (so
+# a lone page number still counts as content); pages whose hashes differ by
+# at most DUPLICATE_MAX_DISTANCE bits are treated as the same page.
+FINGERPRINT_HASH_SIZE = 16
+FINGERPRINT_THUMBNAIL = 128
+BLANK_STDDEV_THRESHOLD = 1.5
+BLANK_RANGE_THRESHOLD = 32
+DUPLICATE_MAX_DISTANCE = 2
+
+# Region rendering: clips are rendered from the PDF at this DPI by default
+DEFAULT_REGION_DPI = 600
+
+# Request tracing: requests carrying a trace context (params["trace"], or
+# IMIS_TRACE_CONTEXT for the CLI) append a span to this JSON-lines file, in
+# the format of v3_intent_driven_minimalism/scripts/tracing.py
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+_trace_lock = threading.Lock()
+
 
 def validate_environment() -> bool:
     """Ensure all required dependencies are available"""
@@ -57,11 +117,152 @@ def validate_environment() -> bool:
         return False
 
 
+def _page_image_info(img_path: str, page_num: int, dpi: int) -> ImageInfo:
+    """Describe a page image on disk (only the header is read)"""
+    with Image.open(img_path) as img:
+        width, height = img.size
+    return {
+        "page": page_num,
+        "path": img_path,
+        "width": width,
+        "height": height,
+        "dpi": dpi,
+        "format": "jpg",
+        "bytes": os.path.getsize(img_path)
+    }
+
+
+def _render_pages(
+    pdf_path: str,
+    output_dir: str,
+    doc_id: str,
+    dpi: int,
+    first_page: Optional[int] = None,
+    last_page: Optional[int] = None,
+    thread_count: int = 4
+) -> List[ImageInfo]:
+    """
+    Render a page range straight to JPEG files named {doc_id}_page_{n}.jpg
+    
+    Raises on poppler errors; callers decide how to report them.
+    """
+    # Poppler names its output "<stem><thread>-<page>.jpg"; render under a
+    # per-call stem so stale files from earlier runs are never picked up
+    render_stem = f".{doc_id}_{uuid.uuid4().hex[:8]}_"
+    
+    try:
+        # Poppler encodes and writes each page once
+        rendered_paths = convert_from_path(
+            pdf_path=pdf_path,
+            dpi=dpi,
+            output_folder=output_dir,
+            first_page=first_page,
+            last_page=last_page,
+            fmt="jpg",
+            output_file=render_stem,
+            thread_count=thread_count,
+            use_pdftocairo=True,
+            paths_only=True
+        )
+        
+        image_info_list = []
+        for rendered_path in rendered_paths:
+            # Recover poppler's page number from the file name
+            page_num = int(Path(rendered_path).stem.rsplit("-", 1)[-1])
+            
+            # Move into the canonical name (a rename, not a re-encode)
+            img_path = os.path.join(output_dir, f"{doc_id}_page_{page_num}.jpg")
+            os.replace(rendered_path, img_path)
+            
+            image_info_list.append(_page_image_info(img_path, page_num, dpi))
+            logger.info(f"Processed page {page_num}: {img_path}")
+        
+        return image_info_list
+    
+    except Exception:
+        # Don't leave half-rendered pages behind
+        for leftover in Path(output_dir).glob(f"{render_stem}*"):
+            leftover.unlink(missing_ok=True)
+        raise
+
+
+def _render_page_runs(
+    pdf_path: str,
+    output_dir: str,
+    doc_id: str,
+    page_dpis: Dict[int, int],
+    scheduler: Optional["RasterScheduler"] = None
+) -> List[ImageInfo]:
+    """Render pages in one poppler call per run of consecutive pages sharing a DPI,
+    or as page ranges on the shared scheduler's process pool"""
+    if scheduler is not None:
+        return scheduler.render(pdf_path, output_dir, doc_id, page_dpis)
+    
+    pages = sorted(page_dpis)
+    image_info_list = []
+    run_start = 0
+    while run_start < len(pages):
+        run_end = run_start
+        while (run_end + 1 < len(pages)
+               and pages[run_end + 1] == pages[run_end] + 1
+               and page_dpis[pages[run_end + 1]] == page_dpis[pages[run_start]]):
+            run_end += 1
+        
+        image_info_list.extend(_render_pages(
+            pdf_path, output_dir, doc_id, page_dpis[pages[run_start]], pages[run_start], pages[run_end]
+        ))
+        run_start = run_end + 1
+    
+    return image_info_list
+
+
+def _render_with_cache(
+    pdf_path: str,
+    output_dir: str,
+    doc_id: str,
+    page_dpis: Dict[int, int],
+    cache: PageCache,
+    file_hash: str,
+    scheduler: Optional["RasterScheduler"] = None
+) -> List[ImageInfo]:
+    """Serve pages from the page cache, rendering and publishing only the misses"""
+    image_info_list = []
+    misses = {}
+    for page_num, dpi in page_dpis.items():
+        img_path = os.path.join(output_dir, f"{doc_id}_page_{page_num}.jpg")
+        cached_path = cache.get(file_hash, page_entry_name(page_num, dpi))
+        if cached_path and cache.materialize(cached_path, img_path):
+            image_info_list.append(_page_image_info(img_path, page_num, dpi))
+        else:
+            misses[page_num] = dpi
+    
+    if misses:
+        rendered = _render_page_runs(pdf_path, output_dir, doc_id, misses, scheduler)
+        for info in rendered:
+            cache.put(file_hash, page_entry_name(info["page"], info["dpi"]), info["path"], evict=False)
+        image_info_list.extend(rendered)
+        cache.evict()
+    
+    logger.info(f"Page cache: {len(page_dpis) - len(misses)} hits, {len(misses)} rendered")
+    return image_info_list
+
+
+def _cached_page_count(pdf_path: str, cache: PageCache, file_hash: str) -> int:
+    """Page count from the cache, falling back to pdfinfo"""
+    info = cache.get_json(file_hash, "pdfinfo.json")
+    if info is None:
+        info = {"pages": int(pdfinfo_from_path(pdf_path)["Pages"])}
+        cache.put_json(file_hash, "pdfinfo.json", info)
+    return info["pages"]
+
+
 def paginate_pdf(
     pdf_path: str, 
     output_dir: str, 
     dpi: int = 300,
-    prefix: Optional[str] = None
+    prefix: Optional[str] = None,
+    cache: Optional[PageCache] = None,
+    scheduler: Optional["RasterScheduler"] = None
 ) -> List[ImageInfo]:
     """
     Convert a PDF to a sequence of page images
@@ -71,6 +272,8 @@ def paginate_pdf(
         output_dir: Directory to save page images
         dpi: Resolution for image conversion
         prefix: Optional filename prefix
+        cache: Optional page cache; when all pages are cached poppler is not run
+        scheduler: Optional shared RasterScheduler to render on
     
     Returns:
         List of image info dictionaries with paths and metadata
@@ -86,40 +289,184 @@ def paginate_pdf(
     doc_id = prefix or uuid.uuid4().hex[:8]
     
     try:
-        # Convert PDF to images
         logger.info(f"Converting PDF: {pdf_path}")
-        images = convert_from_path(
-            pdf_path=pdf_path,
-            dpi=dpi,
-            output_folder=output_dir,
-            fmt="jpg",
-            output_file=f"{doc_id}_page",
-            thread_count=4,
-            use_pdftocairo=True,
-            paths_only=False
-        )
+        if cache is not None:
+            file_hash = file_sha256(pdf_path)
+            page_count = _cached_page_count(pdf_path, cache, file_hash)
+            page_dpis = {page_num: dpi for page_num in range(1, page_count + 1)}
+            image_info_list = _render_with_cache(pdf_path, output_dir, doc_id, page_dpis, cache, file_hash, scheduler)
+        elif scheduler is not None:
+            page_count = int(pdfinfo_from_path(pdf_path)["Pages"])
+            page_dpis = {page_num: dpi for page_num in range(1, page_count + 1)}
+            image_info_list = scheduler.render(pdf_path, output_dir, doc_id, page_dpis)
+        else:
+            image_info_list = _render_pages(pdf_path, output_dir, doc_id, dpi)
+        image_info_list.sort(key=lambda info: info["page"])
+        return image_info_list
+    
+    except Exception as e:
+        logger.error(f"Error paginating PDF: {str(e)}")
+        return []
+
+
+def analyze_page_preview(preview: "Image.Image") -> Dict[str, float]:
+    """
+    Estimate how much fine detail a page carries from a low-DPI preview
+    
+    Text shows up as dense edges; photos are mostly smooth gradients. The
+    page is split into a grid and each cell's edge density measured, so a
+    small spec table on an otherwise photographic page is still noticed.
+    
+    Args:
+        preview: Low-resolution render of the page
+    
+    Returns:
+        Dictionary with overall text_density and small_text_fraction (0-1)
+    """
+    gray = preview.convert("L")
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    edge_mask = edges.point(lambda v: 255 if v >= PREVIEW_EDGE_THRESHOLD else 0)
+    text_density = ImageStat.Stat(edge_mask).mean[0] / 255
+    
+    width, height = edge_mask.size
+    dense_cells = 0
+    total_cells = 0
+    for row in range(PREVIEW_GRID):
+        for col in range(PREVIEW_GRID):
+            box = (
+                col * width // PREVIEW_GRID,
+                row * height // PREVIEW_GRID,
+                (col + 1) * width // PREVIEW_GRID,
+                (row + 1) * height // PREVIEW_GRID
+            )
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            total_cells += 1
+            cell_density = ImageStat.Stat(edge_mask.crop(box)).mean[0] / 255
+            if cell_density >= DENSE_CELL_THRESHOLD:
+                dense_cells += 1
+    
+    return {
+        "text_density": round(text_density, 4),
+        "small_text_fraction": round(dense_cells / total_cells, 4) if total_cells else 0.0
+    }
+
+
+def choose_page_dpi(
+    page_size_inches: Tuple[float, float],
+    analysis: Dict[str, float],
+    target_long_edge: int = DEFAULT_TARGET_LONG_EDGE,
+    min_dpi: int = 72,
+    max_dpi: int = 300,
+    dense_dpi: Optional[int] = 300,
+    dense_threshold: float = DENSE_PAGE_THRESHOLD
+) -> int:
+    """
+    Pick the lowest DPI that gives the page target_long_edge pixels
+    
+    Pages whose preview shows a large share of small-text cells (spec
+    tables, fine print) are raised to dense_dpi when it is set.
+    
+    Args:
+        page_size_inches: Page (width, height) in inches
+        analysis: Output of analyze_page_preview
+        target_long_edge: Pixel budget for the long edge of the page
+        min_dpi: Lower bound for any page
+        max_dpi: Upper bound for any page
+        dense_dpi: DPI for dense pages, or None to disable the upgrade
+        dense_threshold: small_text_fraction at which a page counts as dense
+    
+    Returns:
+        DPI to render the page at
+    """
+    long_edge_inches = max(page_size_inches) or 1.0
+    dpi = target_long_edge / long_edge_inches
+    
+    if dense_dpi and analysis.get("small_text_fraction", 0.0) >= dense_threshold:
+        dpi = max(dpi, dense_dpi)
+    
+    return int(round(min(max(dpi, min_dpi), max_dpi)))
+
+
+def paginate_pdf_adaptive(
+    pdf_path: str,
+    output_dir: str,
+    target_long_edge: int = DEFAULT_TARGET_LONG_EDGE,
+    min_dpi: int = 72,
+    max_dpi: int = 300,
+    dense_dpi: Optional[int] = 300,
+    prefix: Optional[str] = None,
+    cache: Optional[PageCache] = None,
+    scheduler: Optional["RasterScheduler"] = None
+) -> List[ImageInfo]:
+    """
+    Convert a PDF to page images, choosing a DPI per page
+    
+    A cheap in-memory preview pass measures each page's size and detail,
+    then runs of consecutive pages sharing a DPI are rendered together.
+    With a cache, both the per-page plan and the renders are reused.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        output_dir: Directory to save page images
+        target_long_edge: Pixel budget for the long edge of each page
+        min_dpi: Lower bound for any page
+        max_dpi: Upper bound for any page
+        dense_dpi: DPI for dense spec-table pages, or None to disable
+        prefix: Optional filename prefix
+        cache: Optional page cache
+        scheduler: Optional shared RasterScheduler to render on
+    
+    Returns:
+        List of image info dictionaries with paths, metadata and the
+        preview analysis that drove each page's DPI
+    """
+    if not os.path.exists(pdf_path):
+        logger.error(f"PDF file not found: {pdf_path}")
+        return []
+    
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    
+    doc_id = prefix or uuid.uuid4().hex[:8]
+    
+    try:
+        file_hash = file_sha256(pdf_path) if cache else None
+        plan_name = f"plan_{target_long_edge}_{min_dpi}_{max_dpi}_{dense_dpi or 0}.json"
+        page_plans = cache.get_json(file_hash, plan_name) if cache else None
         
-        # Create image info for each page
-        image_info_list = []
-        for i, img in enumerate(images):
-            # Save image if not already saved
-            img_path = os.path.join(output_dir, f"{doc_id}_page_{i+1}.jpg")
-            if not os.path.exists(img_path):
-                img.save(img_path, "JPEG")
+        if page_plans is None:
+            logger.info(f"Previewing PDF at {PREVIEW_DPI} DPI: {pdf_path}")
+            previews = convert_from_path(
+                pdf_path=pdf_path,
+                dpi=PREVIEW_DPI,
+                grayscale=True,
+                thread_count=4,
+                use_pdftocairo=True
+            )
             
-            # Store image metadata
-            width, height = img.size
-            image_info_list.append({
-                "page": i + 1,
-                "path": img_path,
-                "width": width,
-                "height": height,
-                "dpi": dpi,
-                "format": "jpg"
-            })
+            page_plans = []
+            for page_num, preview in enumerate(previews, start=1):
+                analysis = analyze_page_preview(preview)
+                size_inches = (preview.width / PREVIEW_DPI, preview.height / PREVIEW_DPI)
+                dpi = choose_page_dpi(size_inches, analysis, target_long_edge, min_dpi, max_dpi, dense_dpi)
+                page_plans.append((page_num, dpi, analysis))
             
-            logger.info(f"Processed page {i+1}: {img_path}")
+            if cache:
+                cache.put_json(file_hash, plan_name, page_plans)
         
+        # Render runs of consecutive pages that share a DPI in one poppler call
+        page_dpis = {page_num: dpi for page_num, dpi, _ in page_plans}
+        if cache:
+            image_info_list = _render_with_cache(pdf_path, output_dir, doc_id, page_dpis, cache, file_hash, scheduler)
+        else:
+            image_info_list = _render_page_runs(pdf_path, output_dir, doc_id, page_dpis, scheduler)
+        
+        analyses = {page_num: analysis for page_num, _, analysis in page_plans}
+        for info in image_info_list:
+            info.update(analyses.get(info["page"], {}))
+        
+        image_info_list.sort(key=lambda info: info["page"])
         return image_info_list
     
     except Exception as e:
@@ -127,11 +474,127 @@ def paginate_pdf(
         return []
 
 
+def _crop_one_region(
+    img: "Image.Image",
+    bbox: BoundingBox,
+    padding: int,
+    in_memory: bool,
+    output_dir: Optional[str],
+    base_name: str,
+    cache: Optional[PageCache],
+    image_hash: Optional[str]
+) -> Dict[str, Any]:
+    """Crop one bbox from an open page image (see crop_regions)"""
+    x1, y1, x2, y2 = bbox
+    width, height = img.size
+    
+    # Add padding (ensuring within image bounds)
+    crop_box = (
+        max(0, x1 - padding),
+        max(0, y1 - padding),
+        min(width, x2 + padding),
+        min(height, y2 + padding)
+    )
+    region = {"bbox": list(bbox), "crop_box": list(crop_box)}
+    
+    if crop_box[2] <= crop_box[0] or crop_box[3] <= crop_box[1]:
+        region["error"] = "Empty crop region"
+        return region
+    
+    if in_memory:
+        region["image"] = img.crop(crop_box)
+        return region
+    
+    crop_name = f"{base_name}_crop_{crop_box[0]}_{crop_box[1]}_{crop_box[2]}_{crop_box[3]}.jpg"
+    crop_path = os.path.join(output_dir, crop_name)
+    
+    # A cache hit skips the crop and encode
+    if cache is not None:
+        entry_name = crop_entry_name(bbox, padding)
+        cached_path = cache.get(image_hash, entry_name)
+        if cached_path and cache.materialize(cached_path, crop_path):
+            region["path"] = crop_path
+            region["cached"] = True
+            return region
+    
+    img.crop(crop_box).save(crop_path, "JPEG")
+    region["path"] = crop_path
+    if cache is not None:
+        cache.put(image_hash, entry_name, crop_path, evict=False)
+        region["published"] = True
+    return region
+
+
+def crop_regions(
+    image_path: str,
+    bboxes: List[BoundingBox],
+    output_dir: Optional[str] = None,
+    padding: int = 10,
+    cache: Optional[PageCache] = None,
+    in_memory: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Crop many regions from one page image, decoding it at most once
+    
+    Args:
+        image_path: Path to the source image
+        bboxes: List of [x1, y1, x2, y2] coordinates
+        output_dir: Directory to save cropped images (unused when in_memory)
+        padding: Padding to add around each crop (pixels)
+        cache: Optional page cache, keyed by the source image's content hash
+        in_memory: Return PIL images instead of writing JPEG files
+    
+    Returns:
+        One entry per bbox, in order: a dictionary with the padded crop_box and
+        either "path" or "image" ("error" is set instead for an empty region),
+        or None when cropping that region failed
+    """
+    if not os.path.exists(image_path):
+        logger.error(f"Image file not found: {image_path}")
+        return []
+    
+    if not in_memory and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    
+    use_cache = cache is not None and not in_memory
+    image_hash = file_sha256(image_path) if use_cache else None
+    base_name = Path(image_path).stem
+    published = 0
+    
+    try:
+        # Opening only reads the header; the first crop decodes the page once
+        with Image.open(image_path) as img:
+            results = []
+            for bbox in bboxes:
+                # A bad region fails alone; the other crops of the page still get made
+                try:
+                    region = _crop_one_region(img, bbox, padding, in_memory, output_dir, base_name,
+                                              cache if use_cache else None, image_hash)
+                except Exception as e:
+                    logger.error(f"Error cropping region {list(bbox)} of {image_path}: {str(e)}")
+                    region = None
+                if region and region.pop("published", False):
+                    published += 1
+                results.append(region)
+        
+        if published:
+            cache.evict()
+        
+        cropped = sum(1 for region in results if region and "error" not in region)
+        logger.info(f"Cropped {cropped} of {len(results)} regions from {image_path}")
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error cropping image: {str(e)}")
+        return []
+
+
 def crop_image(
     image_path: str,
     bbox: BoundingBox,
     output_dir: str,
-    padding: int = 10
+    padding: int = 10,
+    cache: Optional[PageCache] = None
 ) -> Optional[str]:
     """
     Crop a region from an image based on bounding box coordinates
@@ -141,80 +604,834 @@ def crop_image(
         bbox: Tuple of coordinates [x1, y1, x2, y2]
         output_dir: Directory to save cropped image
         padding: Padding to add around the crop (pixels)
+        cache: Optional page cache, keyed by the source image's content hash
     
     Returns:
         Path to the cropped image, or None if failed
     """
-    if not os.path.exists(image_path):
-        logger.error(f"Image file not found: {image_path}")
+    regions = crop_regions(image_path, [bbox], output_dir, padding, cache)
+    if not regions or not regions[0] or "path" not in regions[0]:
+        return None
+    
+    crop_path = regions[0]["path"]
+    logger.info(f"Cropped image saved to: {crop_path}")
+    return crop_path
+
+
+@lru_cache(maxsize=256)
+def pdf_page_size_points(pdf_path: str, page: int) -> Tuple[float, float]:
+    """
+    Return a page's displayed (width, height) in PDF points
+    
+    Rotation is applied, so the size matches the orientation poppler renders.
+    """
+    info = pdfinfo_from_path(pdf_path, first_page=page, last_page=page)
+    size_key = next(key for key in info if re.match(rf"Page\s+{page} size$", key))
+    width, height = (float(v) for v in re.findall(r"[\d.]+", info[size_key])[:2])
+    
+    rot_key = next((key for key in info if re.match(rf"Page\s+{page} rot$", key)), None)
+    if rot_key and int(float(info[rot_key])) % 180 == 90:
+        width, height = height, width
+    return width, height
+
+
+def page_bbox_to_pdf(bbox: BoundingBox, source_dpi: float) -> Tuple[float, float, float, float]:
+    """Map a bbox in page-image pixels (rendered at source_dpi) to PDF points"""
+    scale = 72.0 / source_dpi
+    x1, y1, x2, y2 = bbox
+    return (x1 * scale, y1 * scale, x2 * scale, y2 * scale)
+
+
+def render_region(
+    pdf_path: str,
+    page: int,
+    bbox: BoundingBox,
+    output_dir: str,
+    source_dpi: Optional[float] = None,
+    source_image: Optional[str] = None,
+    render_dpi: int = DEFAULT_REGION_DPI,
+    padding: int = 10,
+    cache: Optional[PageCache] = None,
+    pdf_hash: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Rasterize only a bbox of a PDF page, at a higher DPI than the page image
+    
+    The bbox is given in page-image pixels, as returned by the extractor.
+    It is mapped back to PDF points and poppler renders just that clip, so a
+    small field can be inspected sharply without a high-DPI full-page render.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        page: 1-based page number
+        bbox: Coordinates [x1, y1, x2, y2] in page-image pixels
+        output_dir: Directory to save the region image
+        source_dpi: DPI the page image was rendered at
+        source_image: Page image to derive source_dpi from when it is unknown
+        render_dpi: Resolution for the region render
+        padding: Padding around the bbox, in page-image pixels
+        cache: Optional page cache, keyed by the PDF's content hash
+        pdf_hash: The PDF's content hash, when the caller already has it
+    
+    Returns:
+        Dictionary with the region path, its PDF-point box and dimensions,
+        or None if failed
+    """
+    if not os.path.exists(pdf_path):
+        logger.error(f"PDF file not found: {pdf_path}")
         return None
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
     
     try:
-        # Open the image
-        with Image.open(image_path) as img:
-            # Extract coordinates
-            x1, y1, x2, y2 = bbox
-            
-            # Add padding (ensuring within image bounds)
-            width, height = img.size
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(width, x2 + padding)
-            y2 = min(height, y2 + padding)
+        page_width_pt, page_height_pt = pdf_page_size_points(pdf_path, page)
+        
+        if source_dpi is None:
+            if not source_image:
+                raise ValueError("Either source_dpi or source_image is required")
+            with Image.open(source_image) as img:
+                source_dpi = img.width * 72.0 / page_width_pt
+        
+        # Pad and clamp in page-image space, then map to PDF points
+        x1, y1, x2, y2 = bbox
+        padded = (x1 - padding, y1 - padding, x2 + padding, y2 + padding)
+        left, top, right, bottom = page_bbox_to_pdf(padded, source_dpi)
+        left, top = max(0.0, left), max(0.0, top)
+        right, bottom = min(page_width_pt, right), min(page_height_pt, bottom)
+        if right <= left or bottom <= top:
+            raise ValueError(f"Empty region for bbox {list(bbox)}")
+        
+        # Crop area in pixels at the render resolution
+        scale = render_dpi / 72.0
+        box = (
+            int(left * scale),
+            int(top * scale),
+            max(1, int(round((right - left) * scale))),
+            max(1, int(round((bottom - top) * scale)))
+        )
+        
+        region_name = f"{Path(pdf_path).stem}_p{page}_region_{box[0]}_{box[1]}_{box[2]}_{box[3]}_{render_dpi}dpi"
+        region_path = os.path.join(output_dir, f"{region_name}.jpg")
+        region = {
+            "page": page,
+            "bbox": list(bbox),
+            "pdf_box": [round(v, 2) for v in (left, top, right, bottom)],
+            "path": region_path,
+            "width": box[2],
+            "height": box[3],
+            "dpi": render_dpi
+        }
+        
+        if cache:
+            pdf_hash = pdf_hash or file_sha256(pdf_path)
+            entry_name = region_entry_name(page, box, render_dpi)
+            cached_path = cache.get(pdf_hash, entry_name)
+            if cached_path and cache.materialize(cached_path, region_path):
+                logger.info(f"Region served from cache: {region_path}")
+                return region
+        
+        # pdftocairo clips drawing to the crop area, so only the region is rasterized
+        command = [
+            "pdftocairo", "-jpeg", "-singlefile",
+            "-r", str(render_dpi),
+            "-f", str(page), "-l", str(page),
+            "-x", str(box[0]), "-y", str(box[1]),
+            "-W", str(box[2]), "-H", str(box[3]),
+            pdf_path, os.path.join(output_dir, region_name)
+        ]
+        completed = subprocess.run(command, capture_output=True, timeout=120)
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.decode("utf-8", "ignore").strip())
+        
+        if cache:
+            cache.put(pdf_hash, entry_name, region_path)
+        
+        logger.info(f"Region rendered to: {region_path}")
+        return region
+    
+    except Exception as e:
+        logger.error(f"Error rendering region: {str(e)}")
+        return None
+
+
+def render_regions(
+    pdf_path: str,
+    page: int,
+    bboxes: List[BoundingBox],
+    output_dir: str,
+    source_dpi: Optional[float] = None,
+    source_image: Optional[str] = None,
+    render_dpi: int = DEFAULT_REGION_DPI,
+    padding: int = 10,
+    cache: Optional[PageCache] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Render all regions of one page, resolving the source DPI and PDF hash once
+    
+    Args as render_region, with a list of bboxes.
+    
+    Returns:
+        One render_region result per bbox, in order (None where it failed)
+    """
+    try:
+        if source_dpi is None and source_image:
+            page_width_pt, _ = pdf_page_size_points(pdf_path, page)
+            with Image.open(source_image) as img:
+                source_dpi = img.width * 72.0 / page_width_pt
+        pdf_hash = file_sha256(pdf_path) if cache and os.path.exists(pdf_path) else None
+    except Exception as e:
+        logger.error(f"Error preparing regions of page {page}: {str(e)}")
+        return [None] * len(bboxes)
+    
+    return [
+        render_region(pdf_path, page, tuple(bbox), output_dir, source_dpi=source_dpi, source_image=source_image,
+                      render_dpi=render_dpi, padding=padding, cache=cache, pdf_hash=pdf_hash)
+        for bbox in bboxes
+    ]
+
+
+def page_fingerprint(image_path: str) -> Dict[str, Any]:
+    """
+    Compute a perceptual fingerprint of a page image
+    
+    JPEG pages are decoded straight to a small size with draft(), so this
+    costs a fraction of a full decode.
+    
+    Returns:
+        Dictionary with dhash (hex), stddev of the thumbnail and blank flag
+    """
+    with Image.open(image_path) as img:
+        img.draft("L", (FINGERPRINT_THUMBNAIL, FINGERPRINT_THUMBNAIL))
+        thumb = img.convert("L")
+        thumb.thumbnail((FINGERPRINT_THUMBNAIL, FINGERPRINT_THUMBNAIL))
+    
+    stddev = ImageStat.Stat(thumb).stddev[0]
+    darkest, lightest = thumb.getextrema()
+    
+    # Difference hash: is each pixel brighter than its right-hand neighbour
+    small = thumb.resize((FINGERPRINT_HASH_SIZE + 1, FINGERPRINT_HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(FINGERPRINT_HASH_SIZE):
+        offset = row * (FINGERPRINT_HASH_SIZE + 1)
+        for col in range(FINGERPRINT_HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    
+    return {
+        "dhash": f"{bits:0{FINGERPRINT_HASH_SIZE * FINGERPRINT_HASH_SIZE // 4}x}",
+        "stddev": round(stddev, 2),
+        "blank": stddev < BLANK_STDDEV_THRESHOLD and lightest - darkest < BLANK_RANGE_THRESHOLD
+    }
+
+
+def _hash_distance(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+@contextmanager
+def _group_index_lock(group_index_path: Optional[str]) -> Iterator[None]:
+    """Hold an exclusive lock on a group index (a .lock file beside it) for a read-modify-write"""
+    if not group_index_path:
+        yield
+        return
+    os.makedirs(os.path.dirname(group_index_path) or ".", exist_ok=True)
+    with open(f"{group_index_path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def filter_pages(
+    pages: List[ImageInfo],
+    document_id: Optional[str] = None,
+    group_index_path: Optional[str] = None,
+    max_distance: int = DUPLICATE_MAX_DISTANCE
+) -> Tuple[List[ImageInfo], List[Dict[str, Any]]]:
+    """
+    Drop near-blank pages and repeated pages before they reach the LLM
+    
+    Duplicates are detected within the document and, when group_index_path
+    is given, against pages already kept by other documents of the same
+    group (e.g. all PDFs from one email). The index file is updated with
+    this document's kept pages, replacing any it recorded in an earlier run,
+    under an exclusive lock so documents of a group can be filtered at once.
+    
+    Args:
+        pages: Page image infos (page, path, ...) in page order
+        document_id: Identifier recorded in the group index
+        group_index_path: JSON file of fingerprints shared by a group
+        max_distance: Largest hash distance still treated as a duplicate
+    
+    Returns:
+        (kept pages, skipped pages with reason and duplicate_of)
+    """
+    # Fingerprint outside the index lock; only matching and the write hold it
+    fingerprints = {}
+    for info in pages:
+        try:
+            fingerprints[info["page"]] = page_fingerprint(info["path"])
+        except Exception as e:
+            logger.error(f"Error fingerprinting {info['path']}: {str(e)}")
+    
+    with _group_index_lock(group_index_path):
+        seen = []
+        if group_index_path and os.path.exists(group_index_path):
+            try:
+                with open(group_index_path, "r") as f:
+                    seen = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable group fingerprint index: {str(e)}")
+        
+        # A reprocessed document replaces its own entries rather than matching them
+        group_size = len(seen)
+        if document_id is not None:
+            seen = [entry for entry in seen if entry.get("document_id") != document_id]
+        changed = len(seen) != group_size
+        
+        kept, skipped = [], []
+        for info in pages:
+            fingerprint = fingerprints.get(info["page"])
+            if fingerprint is None:
+                kept.append(info)
+                continue
             
-            # Perform the crop
-            crop = img.crop((x1, y1, x2, y2))
+            info["dhash"] = fingerprint["dhash"]
+            if fingerprint["blank"]:
+                skipped.append({"page": info["page"], "path": info["path"], "reason": "blank"})
+                continue
             
-            # Save the cropped image
-            base_name = Path(image_path).stem
-            crop_name = f"{base_name}_crop_{x1}_{y1}_{x2}_{y2}.jpg"
-            crop_path = os.path.join(output_dir, crop_name)
-            crop.save(crop_path, "JPEG")
+            match = next((entry for entry in seen
+                          if _hash_distance(entry["dhash"], fingerprint["dhash"]) <= max_distance), None)
+            if match:
+                skipped.append({
+                    "page": info["page"],
+                    "path": info["path"],
+                    "reason": "duplicate",
+                    "duplicate_of": {"document_id": match["document_id"], "page": match["page"]}
+                })
+                continue
             
-            logger.info(f"Cropped image saved to: {crop_path}")
-            return crop_path
+            seen.append({"dhash": fingerprint["dhash"], "document_id": document_id, "page": info["page"]})
+            kept.append(info)
+            changed = True
+        
+        if group_index_path and changed:
+            tmp_path = f"{group_index_path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(seen, f)
+            os.replace(tmp_path, group_index_path)
     
-    except Exception as e:
-        logger.error(f"Error cropping image: {str(e)}")
+    logger.info(f"Kept {len(kept)} pages, skipped {len(skipped)} blank or duplicate pages")
+    return kept, skipped
+
+
+def record_span(
+    trace: Optional[Dict[str, Any]],
+    name: str,
+    start: float,
+    attributes: Optional[Dict[str, Any]] = None,
+    error: Optional[BaseException] = None
+) -> None:
+    """
+    Append a finished span (started at epoch time start) to TRACE_EXPORT_PATH
+    
+    Does nothing unless the request carried a trace context and an export
+    path is configured.
+    """
+    if not trace or not trace.get("trace_id") or not TRACE_EXPORT_PATH:
+        return
+    span = {
+        "trace_id": trace["trace_id"],
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_span_id": trace.get("parent_span_id"),
+        "request_id": trace.get("request_id"),
+        "name": name,
+        "service": "image_worker",
+        "start": start,
+        "duration_ms": round((time.time() - start) * 1000, 3),
+        "status": "error" if error else "ok",
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        "attributes": {"pid": os.getpid(), **(attributes or {})}
+    }
+    try:
+        with _trace_lock, open(TRACE_EXPORT_PATH, "a") as f:
+            f.write(json.dumps(span) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not export span {name}: {str(e)}")
+
+
+def _image_mime_type(path: str) -> str:
+    """MIME type from the file extension, defaulting to JPEG"""
+    mime_type, _ = mimetypes.guess_type(path)
+    return mime_type if mime_type and mime_type.startswith("image/") else "image/jpeg"
+
+
+def get_model_profile(profile: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Resolve a model profile
+    
+    Accepts a profile name, a dictionary of overrides on the default profile,
+    or None to use VISION_MODEL_PROFILE (falling back to "default").
+    """
+    if isinstance(profile, dict):
+        return {**MODEL_PROFILES["default"], **profile}
+    name = profile or os.getenv('VISION_MODEL_PROFILE', 'default')
+    if name not in MODEL_PROFILES:
+        logger.warning(f"Unknown model profile '{name}', using default")
+        name = "default"
+    return dict(MODEL_PROFILES[name])
+
+
+def _encoding_profile(profile: Optional[Any]) -> Optional[Dict[str, Any]]:
+    """Profile to downscale to before encoding: the given one, else VISION_MODEL_PROFILE when set
+
+    False sends files unchanged whatever VISION_MODEL_PROFILE says.
+    """
+    if profile is False:
         return None
+    if profile or os.getenv('VISION_MODEL_PROFILE'):
+        return get_model_profile(profile)
+    return None
+
+
+def model_target_size(size: Tuple[int, int], profile: Dict[str, Any]) -> Tuple[int, int]:
+    """Largest size within the profile's long-edge limit, keeping aspect ratio"""
+    width, height = size
+    long_edge = max(width, height)
+    target_long = min(long_edge, profile["max_long_edge"])
+    
+    tile_size = profile.get("tile_size") or 0
+    if tile_size and target_long > tile_size:
+        snapped = (target_long // tile_size) * tile_size
+        if target_long - snapped <= tile_size * TILE_SNAP_FRACTION:
+            target_long = snapped
+    
+    if target_long >= long_edge:
+        return width, height
+    scale = target_long / long_edge
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_image_for_model(path: str, profile: Dict[str, Any]) -> Optional[Tuple[bytes, str]]:
+    """
+    Downscale and re-encode an image to a model profile
+    
+    JPEG sources are scaled during decode with draft(), then reduced by an
+    integer factor before the final LANCZOS resample, so a 300 DPI page is
+    never fully decoded just to be shrunk.
+    
+    Returns:
+        (encoded bytes, mime type), or None when the file already fits the
+        profile and can be sent unchanged
+    """
+    out_format = profile["format"].upper().replace("JPG", "JPEG")
+    
+    with Image.open(path) as img:
+        target = model_target_size(img.size, profile)
+        if target == img.size and img.format == out_format:
+            return None
+        
+        if img.format == "JPEG":
+            img.draft("RGB", target)
+        
+        factor = min(img.width // target[0], img.height // target[1])
+        resized = img.reduce(factor) if factor >= 2 else img
+        if resized.size != target:
+            resized = resized.resize(target, Image.Resampling.LANCZOS)
+        if out_format == "JPEG" and resized.mode != "RGB":
+            if resized.mode in ("RGBA", "LA", "P"):
+                # Flatten transparency onto white rather than black
+                rgba = resized.convert("RGBA")
+                resized = Image.new("RGB", rgba.size, (255, 255, 255))
+                resized.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                resized = resized.convert("RGB")
+        
+        buffer = io.BytesIO()
+        resized.save(buffer, out_format, quality=profile.get("quality", 85))
+        return buffer.getvalue(), Image.MIME.get(out_format, "image/jpeg")
+
+
+def _iter_base64_stream(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    for block in iter(lambda: stream.read(chunk_size), b""):
+        yield base64.b64encode(block)
+
+
+def iter_base64_chunks(path: str, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the base64 encoding of a file in ASCII chunks
+    
+    chunk_size is rounded down to a multiple of 3 so the chunks concatenate
+    into the same text as encoding the whole file, without padding mid-stream.
+    """
+    with open(path, "rb") as f:
+        yield from _iter_base64_stream(f, chunk_size)
+
+
+def _open_model_source(path: str, profile: Optional[Dict[str, Any]]) -> Tuple[BinaryIO, int, str]:
+    """Open the bytes to send for an image: the file itself or its downscaled encoding"""
+    if profile:
+        prepared = prepare_image_for_model(path, profile)
+        if prepared:
+            data, mime_type = prepared
+            return io.BytesIO(data), len(data), mime_type
+    return open(path, "rb"), os.path.getsize(path), _image_mime_type(path)
+
+
+def iter_images_base64(image_paths: List[str], profile: Optional[Any] = None) -> Iterator[Dict[str, str]]:
+    """
+    Encode images one at a time
+    
+    Only one image's encoded string is alive at once, so memory stays flat
+    as the page count grows. Missing or unreadable files are skipped.
+    
+    Args:
+        image_paths: List of paths to images
+        profile: Optional model profile (name or dict) to downscale to first
+            (defaults to VISION_MODEL_PROFILE; unset or False sends files unchanged)
+        
+    Yields:
+        Dictionaries with path, base64 and mime_type
+    """
+    resolved = _encoding_profile(profile)
+    for path in image_paths:
+        if os.path.exists(path):
+            try:
+                source, size, mime_type = _open_model_source(path, resolved)
+                with source:
+                    # Encode into a buffer sized up front, chunk by chunk
+                    buffer = bytearray(4 * ((size + 2) // 3))
+                    offset = 0
+                    for chunk in _iter_base64_stream(source, BASE64_CHUNK_SIZE):
+                        buffer[offset:offset + len(chunk)] = chunk
+                        offset += len(chunk)
+                with memoryview(buffer) as view:
+                    encoded = str(view[:offset], "ascii")
+                del buffer
+                yield {
+                    "path": path,
+                    "base64": encoded,
+                    "mime_type": mime_type
+                }
+            except Exception as e:
+                logger.error(f"Error encoding image {path}: {str(e)}")
 
 
-def images_to_base64(image_paths: List[str]) -> List[Dict[str, str]]:
+def iter_images_json(
+    image_paths: List[str],
+    chunk_size: int = BASE64_CHUNK_SIZE,
+    profile: Optional[Any] = None
+) -> Iterator[bytes]:
+    """
+    Stream a JSON array of encoded images without building it in memory
+    
+    Produces the same objects as images_to_base64, with "base64" written last
+    so it can be streamed in chunk_size pieces. Suitable as a chunked HTTP
+    request body or for writing straight to a file.
+    
+    The output is always a well-formed array. Files that are missing or
+    cannot be opened are skipped, as in iter_images_base64. If reading fails
+    once an image's data has started, its string is closed and the object
+    gets an "error" field; consumers must drop objects carrying one.
+    
+    Args:
+        image_paths: List of paths to images
+        chunk_size: Bytes of source file encoded per chunk
+        profile: Optional model profile (name or dict) to downscale to first
+            (defaults to VISION_MODEL_PROFILE; unset or False sends files unchanged)
+        
+    Yields:
+        UTF-8 JSON fragments
+    """
+    resolved = _encoding_profile(profile)
+    yield b"["
+    first = True
+    for path in image_paths:
+        if not os.path.exists(path):
+            continue
+        # Open (and downscale) before writing anything for this image
+        try:
+            source, _, mime_type = _open_model_source(path, resolved)
+        except Exception as e:
+            logger.error(f"Error encoding image {path}: {str(e)}")
+            continue
+        with source:
+            header = json.dumps({"path": path, "mime_type": mime_type})[:-1]
+            yield (b"" if first else b",") + header.encode("utf-8") + b', "base64": "'
+            first = False
+            try:
+                for chunk in _iter_base64_stream(source, chunk_size):
+                    yield chunk
+            except OSError as e:
+                logger.error(f"Error encoding image {path}: {str(e)}")
+                yield b'", "error": ' + json.dumps(f"Read failed: {str(e)}").encode("utf-8") + b"}"
+                continue
+            yield b'"}'
+    yield b"]"
+
+
+def write_images_json(
+    image_paths: List[str],
+    fp: BinaryIO,
+    chunk_size: int = BASE64_CHUNK_SIZE,
+    profile: Optional[Any] = None
+) -> int:
+    """Write the streamed JSON array to a binary file object; returns bytes written"""
+    written = 0
+    for fragment in iter_images_json(image_paths, chunk_size, profile):
+        fp.write(fragment)
+        written += len(fragment)
+    return written
+
+
+def images_to_base64(image_paths: List[str], profile: Optional[Any] = None) -> List[Dict[str, str]]:
     """
     Convert images to base64 for API requests
     
+    Holds every encoded image at once; prefer iter_images_base64 or
+    iter_images_json for large documents.
+    
     Args:
         image_paths: List of paths to images
+        profile: Optional model profile (name or dict) to downscale to first
+            (defaults to VISION_MODEL_PROFILE; unset or False sends files unchanged)
         
     Returns:
         List of dictionaries with base64-encoded images
     """
-    import base64
+    return list(iter_images_base64(image_paths, profile))
+
+
+def _crop_cache(cache: Optional[PageCache]) -> Optional[PageCache]:
+    """Crops use the page cache unless ENABLE_CROP_CACHE=false"""
+    if os.getenv('ENABLE_CROP_CACHE', 'true').lower() != 'true':
+        return None
+    return cache
+
+
+class ImageWorker:
+    """
+    Long-lived request handler behind the serve command
     
-    encoded_images = []
-    for path in image_paths:
-        if os.path.exists(path):
+    Requests and responses are single-line JSON objects:
+        {"id": 1, "method": "paginate", "params": {...}}
+        {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+    
+    Methods: health, paginate (pdf_path, output_dir, dpi, adaptive,
+    target_long_edge, min_dpi, dense_dpi, prefix), crop (image_path, bbox,
+    output_dir, padding), crop_batch (image_path, bboxes, output_dir,
+    padding), render_region (pdf_path, page, bbox, output_dir,
+    source_dpi or source_image, render_dpi, padding), render_regions (the
+    same with bboxes) and filter_pages
+    (pages, document_id, group_index_path). At most max_concurrency
+    requests run at once, and all page renders share one RasterScheduler
+    pool. Params may carry a "trace" context (trace_id,
+    parent_span_id, request_id), in which case the request is recorded as a
+    span with record_span.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        cache: Optional[PageCache] = None,
+        scheduler: Optional["RasterScheduler"] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.scheduler = scheduler
+        self.started = time.time()
+        self.served = 0
+        self.inflight = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        
+        # Warm up lazily-loaded PIL plugins so the first request is not slower
+        if DEPS_INSTALLED:
+            Image.init()
+    
+    def health(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "ok" if DEPS_INSTALLED else "degraded",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "served": self.served,
+            "inflight": self.inflight,
+            "max_concurrency": self.max_concurrency,
+            "page_cache": self.cache is not None,
+            "raster_workers": self.scheduler.max_workers if self.scheduler else None
+        }
+    
+    def paginate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        dpi = int(params.get("dpi", 300))
+        if params.get("adaptive"):
+            dense_dpi = int(params.get("dense_dpi", dpi))
+            pages = paginate_pdf_adaptive(
+                params["pdf_path"],
+                params["output_dir"],
+                target_long_edge=int(params.get("target_long_edge", DEFAULT_TARGET_LONG_EDGE)),
+                min_dpi=int(params.get("min_dpi", 72)),
+                max_dpi=max(dpi, dense_dpi),
+                dense_dpi=dense_dpi or None,
+                prefix=params.get("prefix"),
+                cache=self.cache,
+                scheduler=self.scheduler
+            )
+        else:
+            pages = paginate_pdf(
+                params["pdf_path"], params["output_dir"], dpi,
+                prefix=params.get("prefix"), cache=self.cache, scheduler=self.scheduler
+            )
+        return {"pages": pages}
+    
+    def crop(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        bbox = tuple(int(v) for v in params["bbox"])
+        if len(bbox) != 4:
+            raise ValueError("Bounding box must have 4 values")
+        crop_path = crop_image(
+            params["image_path"], bbox, params["output_dir"],
+            int(params.get("padding", 10)), cache=_crop_cache(self.cache)
+        )
+        return {"crop_path": crop_path}
+    
+    def crop_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        bboxes = [tuple(int(v) for v in bbox) for bbox in params["bboxes"]]
+        crops = crop_regions(
+            params["image_path"], bboxes, params["output_dir"],
+            int(params.get("padding", 10)), cache=_crop_cache(self.cache)
+        )
+        return {"crops": crops}
+    
+    def render_region(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        region = render_region(
+            params["pdf_path"],
+            int(params["page"]),
+            tuple(int(v) for v in params["bbox"]),
+            params["output_dir"],
+            source_dpi=params.get("source_dpi"),
+            source_image=params.get("source_image"),
+            render_dpi=int(params.get("render_dpi", DEFAULT_REGION_DPI)),
+            padding=int(params.get("padding", 10)),
+            cache=_crop_cache(self.cache)
+        )
+        return {"region": region}
+    
+    def render_regions(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        regions = render_regions(
+            params["pdf_path"],
+            int(params["page"]),
+            [tuple(int(v) for v in bbox) for bbox in params["bboxes"]],
+            params["output_dir"],
+            source_dpi=params.get("source_dpi"),
+            source_image=params.get("source_image"),
+            render_dpi=int(params.get("render_dpi", DEFAULT_REGION_DPI)),
+            padding=int(params.get("padding", 10)),
+            cache=_crop_cache(self.cache)
+        )
+        return {"regions": regions}
+    
+    def filter_pages(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        kept, skipped = filter_pages(
+            params["pages"],
+            document_id=params.get("document_id"),
+            group_index_path=params.get("group_index_path")
+        )
+        return {"kept": kept, "skipped": skipped}
+    
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one request and wrap the result or error"""
+        request_id = request.get("id")
+        method = request.get("method")
+        if method not in ("health", "paginate", "crop", "crop_batch", "render_region", "render_regions",
+                          "filter_pages"):
+            return {"id": request_id, "error": f"Unknown method: {method}"}
+        
+        # Health checks bypass the concurrency limit so a busy worker still answers
+        if method == "health":
+            return {"id": request_id, "result": self.health({})}
+        
+        params = dict(request.get("params") or {})
+        trace = params.pop("trace", None)
+        queued = time.time()
+        with self._slots:
+            with self._lock:
+                self.inflight += 1
+            started = time.time()
+            span_attributes = {"queued_ms": round((started - queued) * 1000, 3)}
             try:
-                with open(path, "rb") as img_file:
-                    encoded = base64.b64encode(img_file.read()).decode("utf-8")
-                    
-                    encoded_images.append({
-                        "path": path,
-                        "base64": encoded,
-                        "mime_type": "image/jpeg"
-                    })
+                result = getattr(self, method)(params)
+                if "pages" in result:
+                    span_attributes["pages"] = len(result["pages"])
+                record_span(trace, f"image_worker.{method}", started, span_attributes)
+                return {"id": request_id, "result": result}
             except Exception as e:
-                logger.error(f"Error encoding image {path}: {str(e)}")
+                logger.error(f"Worker request {request_id} ({method}) failed: {str(e)}")
+                record_span(trace, f"image_worker.{method}", started, span_attributes, error=e)
+                return {"id": request_id, "error": str(e)}
+            finally:
+                with self._lock:
+                    self.inflight -= 1
+                    self.served += 1
+    
+    def handle_line(self, line: str) -> str:
+        """Handle one JSON line and return the JSON response line"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"id": None, "error": f"Invalid JSON: {str(e)}"})
+        return json.dumps(self.handle(request))
+
+
+def serve_stdio(worker: ImageWorker) -> None:
+    """Serve JSON lines on stdin/stdout; responses may arrive out of order"""
+    from concurrent.futures import ThreadPoolExecutor
+    
+    write_lock = threading.Lock()
+    
+    def respond(line: str) -> None:
+        response = worker.handle_line(line)
+        with write_lock:
+            sys.stdout.write(response + "\n")
+            sys.stdout.flush()
     
-    return encoded_images
+    with ThreadPoolExecutor(max_workers=worker.max_concurrency + 1) as executor:
+        for line in sys.stdin:
+            if line.strip():
+                executor.submit(respond, line)
+
+
+def serve_unix_socket(worker: ImageWorker, socket_path: str) -> None:
+    """Serve JSON lines on a Unix socket, one thread per connection"""
+    import socketserver
+    
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                line = raw_line.decode("utf-8").strip()
+                if not line:
+                    continue
+                self.wfile.write((worker.handle_line(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+    
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    with Server(socket_path, Handler) as server:
+        logger.info(f"Image worker listening on {socket_path} (max {worker.max_concurrency} concurrent requests)")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
 
 
 # Command line interface for testing
 if __name__ == "__main__":
-    import sys
     import argparse
     
     parser = argparse.ArgumentParser(description="PDF Image Processing Utilities")
@@ -225,6 +1442,12 @@ if __name__ == "__main__":
     paginate_parser.add_argument("pdf_path", help="Path to PDF file")
     paginate_parser.add_argument("--output", default="./output", help="Output directory")
     paginate_parser.add_argument("--dpi", type=int, default=300, help="Image resolution (DPI)")
+    paginate_parser.add_argument("--adaptive", action="store_true", help="Choose DPI per page from a low-DPI preview")
+    paginate_parser.add_argument("--target-long-edge", type=int, default=DEFAULT_TARGET_LONG_EDGE,
+                                 help="Adaptive mode: pixel budget for each page's long edge")
+    paginate_parser.add_argument("--min-dpi", type=int, default=72, help="Adaptive mode: lowest DPI for any page")
+    paginate_parser.add_argument("--dense-dpi", type=int, default=300,
+                                 help="Adaptive mode: DPI for dense spec-table pages (0 disables)")
     
     # Crop command
     crop_parser = subparsers.add_parser("crop", help="Crop region from image")
@@ -233,11 +1456,76 @@ if __name__ == "__main__":
     crop_parser.add_argument("--output", default="./output", help="Output directory")
     crop_parser.add_argument("--padding", type=int, default=10, help="Padding in pixels")
     
+    # Batch crop command
+    crop_batch_parser = subparsers.add_parser("crop-batch", help="Crop many regions from one image")
+    crop_batch_parser.add_argument("image_path", help="Path to image file")
+    crop_batch_parser.add_argument("bboxes", help='JSON list of bounding boxes, e.g. "[[x1,y1,x2,y2], ...]"')
+    crop_batch_parser.add_argument("--output", default="./output", help="Output directory")
+    crop_batch_parser.add_argument("--padding", type=int, default=10, help="Padding in pixels")
+    
+    # Region render command
+    region_parser = subparsers.add_parser("render-region", help="Render a bbox straight from the PDF")
+    region_parser.add_argument("pdf_path", help="Path to PDF file")
+    region_parser.add_argument("page", type=int, help="1-based page number")
+    region_parser.add_argument("bbox", help="Bounding box in page-image pixels (x1,y1,x2,y2)")
+    region_parser.add_argument("--source-dpi", type=float, default=None, help="DPI of the page image the bbox refers to")
+    region_parser.add_argument("--source-image", default=None, help="Page image to derive the source DPI from")
+    region_parser.add_argument("--dpi", type=int, default=DEFAULT_REGION_DPI, help="Region resolution (DPI)")
+    region_parser.add_argument("--output", default="./output", help="Output directory")
+    region_parser.add_argument("--padding", type=int, default=10, help="Padding in page-image pixels")
+    
+    # Batch region render command
+    regions_parser = subparsers.add_parser("render-regions", help="Render many bboxes of one page from the PDF")
+    regions_parser.add_argument("pdf_path", help="Path to PDF file")
+    regions_parser.add_argument("page", type=int, help="1-based page number")
+    regions_parser.add_argument("bboxes", help='JSON list of bounding boxes in page-image pixels')
+    regions_parser.add_argument("--source-dpi", type=float, default=None, help="DPI of the page image the bboxes refer to")
+    regions_parser.add_argument("--source-image", default=None, help="Page image to derive the source DPI from")
+    regions_parser.add_argument("--dpi", type=int, default=DEFAULT_REGION_DPI, help="Region resolution (DPI)")
+    regions_parser.add_argument("--output", default="./output", help="Output directory")
+    regions_parser.add_argument("--padding", type=int, default=10, help="Padding in page-image pixels")
+    
+    # Page filter command
+    filter_parser = subparsers.add_parser("filter-pages", help="Skip blank and duplicate page images")
+    filter_parser.add_argument("pages", help="JSON list of page images, each with page and path ('-' reads stdin)")
+    filter_parser.add_argument("--document-id", default=None, help="Document ID recorded in the group index")
+    filter_parser.add_argument("--group-index", default=None, help="Fingerprint index shared by a document group")
+    
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Run as a long-lived JSON-lines worker")
+    serve_parser.add_argument("--socket", default=os.getenv('IMAGE_WORKER_SOCKET'),
+                              help="Unix socket path (omit to serve on stdin/stdout)")
+    serve_parser.add_argument("--max-concurrency", type=int,
+                              default=int(os.getenv('IMAGE_WORKER_CONCURRENCY', '4')),
+                              help="Maximum requests processed at once")
+    
     # Parse arguments
     args = parser.parse_args()
     
+    # Shared page cache, enabled with ENABLE_PAGE_CACHE=true
+    page_cache = PageCache.from_env()
+    
+    # One-off processes started for a traced request record one span for the command
+    if args.command and args.command != "serve" and os.getenv('IMIS_TRACE_CONTEXT'):
+        import atexit
+        atexit.register(record_span, json.loads(os.environ['IMIS_TRACE_CONTEXT']),
+                        f"image_processing.{args.command}", time.time())
+    
     if args.command == "paginate":
-        result = paginate_pdf(args.pdf_path, args.output, args.dpi)
+        # A one-off process renders in-process: a scheduler pool per call would
+        # multiply poppler processes across concurrent calls (serve shares one)
+        if args.adaptive:
+            result = paginate_pdf_adaptive(
+                args.pdf_path,
+                args.output,
+                target_long_edge=args.target_long_edge,
+                min_dpi=args.min_dpi,
+                max_dpi=max(args.dpi, args.dense_dpi),
+                dense_dpi=args.dense_dpi or None,
+                cache=page_cache
+            )
+        else:
+            result = paginate_pdf(args.pdf_path, args.output, args.dpi, cache=page_cache)
         print(f"Generated {len(result)} page images:")
         for img in result:
             print(f"  Page {img['page']}: {img['path']}")
@@ -248,12 +1536,73 @@ if __name__ == "__main__":
             if len(bbox) != 4:
                 raise ValueError("Bounding box must have 4 values")
             
-            result = crop_image(args.image_path, tuple(bbox), args.output, args.padding)
+            result = crop_image(args.image_path, tuple(bbox), args.output, args.padding, cache=_crop_cache(page_cache))
             print(f"Cropped image: {result}")
         
         except ValueError as e:
             print(f"Error: {str(e)}")
             sys.exit(1)
     
+    elif args.command == "crop-batch":
+        try:
+            bboxes = json.loads(args.bboxes)
+            if any(len(bbox) != 4 for bbox in bboxes):
+                raise ValueError("Each bounding box must have 4 values")
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+        
+        result = crop_regions(
+            args.image_path, [tuple(int(v) for v in bbox) for bbox in bboxes],
+            args.output, args.padding, cache=_crop_cache(page_cache)
+        )
+        print(json.dumps({"crops": result}))
+    
+    elif args.command == "render-region":
+        try:
+            bbox = [int(x) for x in args.bbox.split(",")]
+            if len(bbox) != 4:
+                raise ValueError("Bounding box must have 4 values")
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+        
+        result = render_region(
+            args.pdf_path, args.page, tuple(bbox), args.output,
+            source_dpi=args.source_dpi, source_image=args.source_image,
+            render_dpi=args.dpi, padding=args.padding, cache=_crop_cache(page_cache)
+        )
+        print(f"Region image: {result['path'] if result else None}")
+    
+    elif args.command == "render-regions":
+        try:
+            bboxes = json.loads(args.bboxes)
+            if any(len(bbox) != 4 for bbox in bboxes):
+                raise ValueError("Each bounding box must have 4 values")
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+        
+        result = render_regions(
+            args.pdf_path, args.page, [tuple(int(v) for v in bbox) for bbox in bboxes], args.output,
+            source_dpi=args.source_dpi, source_image=args.source_image,
+            render_dpi=args.dpi, padding=args.padding, cache=_crop_cache(page_cache)
+        )
+        print(json.dumps({"regions": result}))
+    
+    elif args.command == "filter-pages":
+        pages = json.load(sys.stdin) if args.pages == "-" else json.loads(args.pages)
+        kept, skipped = filter_pages(pages, args.document_id, args.group_index)
+        print(json.dumps({"kept": kept, "skipped": skipped}))
+    
+    elif args.command == "serve":
+        from raster_scheduler import RasterScheduler
+        with RasterScheduler.from_env() as scheduler:
+            worker = ImageWorker(args.max_concurrency, page_cache, scheduler)
+            if args.socket:
+                serve_unix_socket(worker, args.socket)
+            else:
+                serve_stdio(worker)
+    
     else:
         parser.print_help()
\ No newline at end of file
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+IMIS V1.5 - Rendered Page Cache
+Shared on-disk cache for page renders and crops, keyed by the source file's
+content hash and the render parameters, with size-bounded LRU eviction
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger('imis_page_cache')
+
+DEFAULT_CACHE_PATH = os.path.join(os.getenv('STORAGE_PATH', './storage'), 'page_cache')
+DEFAULT_CACHE_MAX_MB = 2048
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's contents"""
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def page_entry_name(page: int, dpi: int, fmt: str = "jpg") -> str:
+    """Cache entry name for a full page render"""
+    return f"page_{page}_{dpi}dpi.{fmt}"
+
+
+def crop_entry_name(bbox, padding: int, fmt: str = "jpg") -> str:
+    """Cache entry name for a crop of a page image"""
+    x1, y1, x2, y2 = bbox
+    return f"crop_{x1}_{y1}_{x2}_{y2}_pad{padding}.{fmt}"
+
+
+def region_entry_name(page: int, box, dpi: int, fmt: str = "jpg") -> str:
+    """Cache entry name for a clip rendered straight from the PDF"""
+    x, y, w, h = box
+    return f"region_{page}_{x}_{y}_{w}_{h}_{dpi}dpi.{fmt}"
+
+
+class PageCache:
+    """
+    Content-addressed store of rendered files
+
+    Entries live at <root>/<hash[:2]>/<hash>/<name>. Writers publish through
+    a temporary file and os.replace, so readers never see partial files.
+    Entries are private copies, never links to output files, so callers may
+    rewrite their outputs freely. Hits refresh the entry's mtime, and
+    eviction removes the least recently used entries once the cache grows
+    past max_bytes.
+
+    The cache size is counted once and then kept as a running total of what
+    this process publishes; other processes sharing the cache are picked up
+    when the total crosses max_bytes and evict() recounts.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    @classmethod
+    def from_env(cls) -> Optional["PageCache"]:
+        """Build the cache from ENABLE_PAGE_CACHE / PAGE_CACHE_PATH / PAGE_CACHE_MAX_MB"""
+        if os.getenv('ENABLE_PAGE_CACHE', 'false').lower() != 'true':
+            return None
+        root = os.getenv('PAGE_CACHE_PATH', DEFAULT_CACHE_PATH)
+        max_mb = int(os.getenv('PAGE_CACHE_MAX_MB', str(DEFAULT_CACHE_MAX_MB)))
+        return cls(root, max_mb * 1024 * 1024)
+
+    def _entry_path(self, file_hash: str, name: str) -> Path:
+        return self.root / file_hash[:2] / file_hash / name
+
+    def _scan(self):
+        """(mtime, size, path) of every entry, and their total size"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def _add_size(self, delta: int) -> None:
+        if self._size is None:
+            self._size = self._scan()[1]
+        else:
+            self._size += delta
+
+    def get(self, file_hash: str, name: str) -> Optional[str]:
+        """Return the path of a cached entry, or None on a miss"""
+        path = self._entry_path(file_hash, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return str(path)
+
+    def put(self, file_hash: str, name: str, source_path: str, evict: bool = True) -> Optional[str]:
+        """
+        Publish a copy of a file into the cache
+
+        Callers publishing a batch pass evict=False and call evict() once at
+        the end. Returns the cache path, or None on failure.
+        """
+        path = self._entry_path(file_hash, name)
+        tmp_path = path.with_name(f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source_path, tmp_path)
+            size = tmp_path.stat().st_size
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not publish {name} to page cache: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        self._add_size(size)
+        if evict:
+            self.evict()
+        return str(path)
+
+    def get_json(self, file_hash: str, name: str) -> Optional[Any]:
+        """Return a cached JSON document (page counts, render plans), or None"""
+        path = self.get(file_hash, name)
+        if not path:
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_json(self, file_hash: str, name: str, data: Any) -> None:
+        """Publish a small JSON document alongside the renders"""
+        path = self._entry_path(file_hash, name)
+        tmp_path = path.with_name(f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not publish {name} to page cache: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._add_size(size)
+
+    def materialize(self, cached_path: str, dest_path: str) -> bool:
+        """Copy a cached entry to dest_path"""
+        try:
+            # Unlink first: copying over a file still linked to an entry
+            # (written by an older version) would truncate the entry too
+            if os.path.exists(dest_path):
+                os.unlink(dest_path)
+            shutil.copyfile(cached_path, dest_path)
+            return True
+        except FileNotFoundError:
+            # Evicted by another process between lookup and use
+            return False
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes
+
+        Only walks the cache when the running total says it is over the limit.
+        """
+        if self._size is not None and self._size <= self.max_bytes:
+            return 0
+
+        entries, total = self._scan()
+        self._size = total
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+
+        logger.info(f"Page cache evicted {removed} entries")
+        return removed
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+IMIS V1.5 - Rasterization Scheduler
+Splits documents into page ranges and renders them on a shared process pool,
+so concurrent documents share the CPU fairly instead of each spawning its
+own fixed set of poppler threads
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+import functools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from image_processing import _render_pages, pdfinfo_from_path, ImageInfo
+
+logger = logging.getLogger('imis_raster_scheduler')
+
+DEFAULT_PAGES_PER_TASK = 4
+
+
+def _render_range(
+    pdf_path: str,
+    output_dir: str,
+    doc_id: str,
+    dpi: int,
+    first_page: int,
+    last_page: int
+) -> List[ImageInfo]:
+    """Worker entry point: one single-threaded poppler run per page range"""
+    return _render_pages(pdf_path, output_dir, doc_id, dpi, first_page, last_page, thread_count=1)
+
+
+class RasterScheduler:
+    """
+    Global process-pool scheduler for PDF rasterization
+
+    Each document is cut into ranges of at most pages_per_task consecutive
+    pages sharing a DPI. Ranges are handed out round-robin across the
+    documents being rendered, so a large catalogue cannot starve a one-page
+    datasheet. max_workers caps the renders in flight across all documents;
+    max_inflight_per_document optionally caps a single document's share of
+    the pool.
+
+    One scheduler is shared by every caller in a process: render() may be
+    called from many threads at once (the image worker's request threads)
+    and blocks until its document is done. The pool is started on first use
+    and stopped with shutdown().
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+        max_inflight_per_document: Optional[int] = None
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_inflight_per_document = max_inflight_per_document or self.max_workers
+        self._executor = None
+        # Reentrant: a future that is already done runs _finished inside _fill
+        self._lock = threading.RLock()
+        self._documents = deque()  # Documents with ranges left to submit, in round-robin order
+        self._inflight = 0
+
+    @classmethod
+    def from_env(cls) -> "RasterScheduler":
+        """Build the scheduler from RASTER_WORKERS / RASTER_PAGES_PER_TASK / RASTER_MAX_PER_DOCUMENT"""
+        return cls(
+            int(os.getenv('RASTER_WORKERS', '0')) or None,
+            int(os.getenv('RASTER_PAGES_PER_TASK', str(DEFAULT_PAGES_PER_TASK))),
+            int(os.getenv('RASTER_MAX_PER_DOCUMENT', '0')) or None
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _ranges(self, page_dpis: Dict[int, int]) -> deque:
+        """Split {page: dpi} into (first_page, last_page, dpi) tasks"""
+        ranges = deque()
+        pages = sorted(page_dpis)
+        run_start = 0
+        while run_start < len(pages):
+            run_end = run_start
+            while (run_end + 1 < len(pages)
+                   and run_end + 1 - run_start < self.pages_per_task
+                   and pages[run_end + 1] == pages[run_end] + 1
+                   and page_dpis[pages[run_end + 1]] == page_dpis[pages[run_start]]):
+                run_end += 1
+            ranges.append((pages[run_start], pages[run_end], page_dpis[pages[run_start]]))
+            run_start = run_end + 1
+        return ranges
+
+    def render(self, pdf_path: str, output_dir: str, doc_id: str, page_dpis: Dict[int, int]) -> List[ImageInfo]:
+        """
+        Render the given pages of one document on the shared pool
+
+        Args:
+            pdf_path: Path to the PDF file
+            output_dir: Directory for the page images
+            doc_id: File name prefix ({doc_id}_page_{n}.jpg)
+            page_dpis: DPI per 1-based page number
+
+        Returns:
+            Image info dictionaries of the rendered pages, in page order
+
+        Raises RuntimeError when any range failed.
+        """
+        state = {
+            "pdf_path": pdf_path,
+            "output_dir": output_dir,
+            "doc_id": doc_id,
+            "ranges": self._ranges(page_dpis),
+            "inflight": 0,
+            "pages": [],
+            "errors": [],
+            "done": threading.Event()
+        }
+        state["remaining"] = len(state["ranges"])
+        if not state["remaining"]:
+            return []
+
+        with self._lock:
+            self._documents.append(state)
+            self._fill()
+        state["done"].wait()
+
+        if state["errors"]:
+            raise RuntimeError(f"Rasterizing {pdf_path} failed: {'; '.join(state['errors'])}")
+        return sorted(state["pages"], key=lambda info: info["page"])
+
+    def _fill(self) -> None:
+        """Submit ranges round-robin across documents until the pool is full (lock held)"""
+        if self._executor is None:
+            # Spawned, not forked: callers are often multi-threaded servers
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        scanned = 0
+        while self._inflight < self.max_workers and self._documents and scanned < len(self._documents):
+            state = self._documents.popleft()
+            if state["inflight"] >= self.max_inflight_per_document:
+                self._documents.append(state)
+                scanned += 1
+                continue
+            scanned = 0
+            first_page, last_page, dpi = state["ranges"].popleft()
+            if state["ranges"]:
+                self._documents.append(state)
+            state["inflight"] += 1
+            self._inflight += 1
+            future = self._executor.submit(
+                _render_range, state["pdf_path"], state["output_dir"], state["doc_id"], dpi, first_page, last_page
+            )
+            future.add_done_callback(functools.partial(self._finished, state, first_page, last_page))
+
+    def _finished(self, state: Dict[str, Any], first_page: int, last_page: int, future) -> None:
+        try:
+            pages, error = future.result(), None
+        except Exception as e:
+            pages, error = [], str(e)
+            logger.error(f"Error rendering pages {first_page}-{last_page} of {state['pdf_path']}: {error}")
+
+        with self._lock:
+            state["pages"].extend(pages)
+            if error:
+                state["errors"].append(f"pages {first_page}-{last_page}: {error}")
+            state["inflight"] -= 1
+            state["remaining"] -= 1
+            self._inflight -= 1
+            if not state["remaining"]:
+                state["done"].set()
+            if self._executor is not None:
+                self._fill()
+
+    def run(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Rasterize a batch of documents
+
+        Args:
+            documents: Dictionaries with pdf_path, output_dir and optional
+                dpi (default 300) and prefix
+
+        Returns:
+            Dictionary with per-document page lists and errors, plus
+            throughput statistics (pages, seconds, pages_per_sec)
+        """
+        start_time = time.perf_counter()
+        results = []
+        for document in documents:
+            os.makedirs(document["output_dir"], exist_ok=True)
+            results.append({
+                "pdf_path": document["pdf_path"],
+                "doc_id": document.get("prefix") or uuid.uuid4().hex[:8],
+                "pages": [],
+                "errors": []
+            })
+
+        def render_document(document, result):
+            try:
+                page_count = int(pdfinfo_from_path(document["pdf_path"])["Pages"])
+                page_dpis = {page: document.get("dpi", 300) for page in range(1, page_count + 1)}
+                result["pages"] = self.render(document["pdf_path"], document["output_dir"], result["doc_id"], page_dpis)
+            except Exception as e:
+                logger.error(f"Could not rasterize {document['pdf_path']}: {str(e)}")
+                result["errors"].append(str(e))
+
+        # One waiting thread per document; the pool does the rendering
+        threads = [threading.Thread(target=render_document, args=pair) for pair in zip(documents, results)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start_time
+        total_pages = sum(len(result["pages"]) for result in results)
+        stats = {
+            "documents": len(results),
+            "pages": total_pages,
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(total_pages / elapsed, 2) if elapsed > 0 else 0.0,
+            "workers": self.max_workers,
+            "pages_per_task": self.pages_per_task
+        }
+        logger.info(f"Rasterized {total_pages} pages from {len(results)} documents "
+                    f"in {elapsed:.2f}s ({stats['pages_per_sec']} pages/sec)")
+        return {"documents": results, "stats": stats}
+
+
+# Command line interface for tuning on render hosts
+if __name__ == "__main__":
+    import json
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Rasterize many PDFs on a shared process pool")
+    parser.add_argument("pdf_paths", nargs="+", help="PDF files to paginate")
+    parser.add_argument("--output", default="./output", help="Output directory (one subdirectory per PDF)")
+    parser.add_argument("--dpi", type=int, default=300, help="Image resolution (DPI)")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (defaults to CPU count)")
+    parser.add_argument("--pages-per-task", type=int, default=DEFAULT_PAGES_PER_TASK, help="Pages per render task")
+    parser.add_argument("--max-per-document", type=int, default=None, help="Cap on one document's renders in flight")
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    args = parser.parse_args()
+
+    with RasterScheduler(args.workers, args.pages_per_task, args.max_per_document) as scheduler:
+        result = scheduler.run([
+            {
+                "pdf_path": pdf_path,
+                "output_dir": os.path.join(args.output, Path(pdf_path).stem),
+                "dpi": args.dpi
+            }
+            for pdf_path in args.pdf_paths
+        ])
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for document in result["documents"]:
+            print(f"{document['pdf_path']}: {len(document['pages'])} pages, {len(document['errors'])} errors")
+        stats = result["stats"]
+        print(f"Throughput: {stats['pages']} pages in {stats['seconds']}s "
+              f"({stats['pages_per_sec']} pages/sec, {stats['workers']} workers)")
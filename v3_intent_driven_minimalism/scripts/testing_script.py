@@ -7,6 +7,7 @@ Tests the entire V3 pipeline with various document types and feedback mechanisms
 import os
 import sys
 import json
+import math
 import time
 import requests
 import logging
@@ -15,6 +16,8 @@ import argparse
 import subprocess
 from pathlib import Path
 import hashlib
+import random
+import threading
 import concurrent.futures
 
 # Configure logging
@@ -292,6 +295,190 @@ def test_document(webhook_url, document_path, status_url, metadata_url, feedback
     return result
 
 
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(values):
+    """p50/p95/p99, mean and max of a list of latencies in seconds"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'mean': round(sum(values) / len(values), 3),
+        'max': round(max(values), 3)
+    }
+
+
+def load_request(webhook_url, status_url, document_path, api_key, timeout, poll_interval):
+    """One open-loop request: upload a document and poll it to a terminal state
+
+    Unlike test_document this logs nothing per request and times each phase:
+    upload_latency covers the upload POST, time_to_completed runs from the
+    start of the upload until the status endpoint reports a terminal state.
+    """
+    result = {'file': os.path.basename(document_path)}
+    start = time.perf_counter()
+    try:
+        with open(document_path, 'rb') as pdf_file:
+            files = {'file': (os.path.basename(document_path), pdf_file, 'application/pdf')}
+            data = {'sender': 'loadtest@example.com', 'subject': f"Load Test: {os.path.basename(document_path)}"}
+            headers = {'X-API-Key': api_key} if api_key else {}
+            response = requests.post(webhook_url, files=files, data=data, headers=headers, timeout=timeout)
+        result['upload_latency'] = time.perf_counter() - start
+        if response.status_code not in [200, 202]:
+            result['error'] = f"upload_http_{response.status_code}"
+            return result
+        request_id = response.json().get('request_id')
+    except Exception as e:
+        result['upload_latency'] = time.perf_counter() - start
+        result['error'] = f"upload_{type(e).__name__}"
+        return result
+
+    result['request_id'] = request_id
+    while time.perf_counter() - start < timeout:
+        time.sleep(poll_interval)
+        try:
+            response = requests.get(f"{status_url}/{request_id}", timeout=10)
+        except requests.exceptions.RequestException:
+            continue
+        if response.status_code != 200:
+            continue
+        state = response.json().get('current_state')
+        if state in ['COMPLETED', 'FLAGGED', 'FAILED']:
+            result['final_state'] = state
+            result['time_to_completed'] = time.perf_counter() - start
+            if state != 'COMPLETED':
+                result['error'] = f"state_{state}"
+            return result
+
+    result['error'] = 'processing_timeout'
+    return result
+
+
+def arrival_offsets(rate, duration, arrival, seed=None):
+    """Start times (seconds from t0) of an open-loop schedule
+
+    constant spaces arrivals exactly 1/rate apart; poisson draws exponential
+    inter-arrival gaps with mean 1/rate.
+    """
+    rng = random.Random(seed)
+    offsets = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+        if t > duration:
+            return offsets
+        offsets.append(t)
+
+
+def run_load_test(args, document_files):
+    """Drive uploads at a fixed arrival rate regardless of how fast they complete
+
+    Requests are started on schedule whether or not earlier ones finished
+    (open loop), so queueing in the pipeline shows up as latency instead of
+    silently lowering the offered load. Arrivals that would exceed
+    --max-inflight are counted as dropped rather than delayed.
+    """
+    offsets = arrival_offsets(args.rate, args.duration, args.arrival, args.seed)
+    logger.info(f"Open-loop load: {args.arrival} arrivals at {args.rate}/s for {args.duration}s "
+                f"({len(offsets)} requests over {len(document_files)} documents)")
+
+    results = []
+    dropped = 0
+    lateness = []
+    inflight = threading.BoundedSemaphore(args.max_inflight)
+    lock = threading.Lock()
+
+    def run(document_path):
+        try:
+            result = load_request(args.webhook, args.status, document_path, args.api_key,
+                                  args.timeout, args.poll_interval)
+        finally:
+            inflight.release()
+        with lock:
+            results.append(result)
+
+    # Keep the loggers of requests quiet under load
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+    t0 = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_inflight) as executor:
+        for i, offset in enumerate(offsets):
+            delay = t0 + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lateness.append(max(0.0, -delay))
+            if not inflight.acquire(blocking=False):
+                dropped += 1
+                continue
+            executor.submit(run, str(document_files[i % len(document_files)]))
+    elapsed = time.perf_counter() - t0
+
+    errors = {}
+    for result in results:
+        if 'error' in result:
+            errors[result['error']] = errors.get(result['error'], 0) + 1
+    if dropped:
+        errors['dropped_max_inflight'] = dropped
+
+    completed = [r for r in results if r.get('final_state') == 'COMPLETED']
+    report = {
+        'config': {
+            'rate': args.rate,
+            'duration': args.duration,
+            'arrival': args.arrival,
+            'max_inflight': args.max_inflight,
+            'documents': [str(d) for d in document_files]
+        },
+        'requests': {
+            'scheduled': len(offsets),
+            'sent': len(results),
+            'completed': len(completed),
+            'dropped': dropped,
+            'errors': sum(errors.values())
+        },
+        'throughput': {
+            'offered_per_sec': round(len(offsets) / args.duration, 3),
+            'completed_per_sec': round(len(completed) / elapsed, 3) if elapsed else 0.0,
+            'elapsed_seconds': round(elapsed, 3)
+        },
+        'upload_latency': latency_summary([r['upload_latency'] for r in results if 'upload_latency' in r]),
+        'time_to_completed': latency_summary([r['time_to_completed'] for r in completed]),
+        'scheduler_lateness': latency_summary(lateness),
+        'errors': errors,
+        'details': results
+    }
+
+    results_file = args.load_output or f"load_results_v3_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.json"
+    with open(results_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    upload, ttc = report['upload_latency'], report['time_to_completed']
+    print(f"\nOpen-loop load test: {args.arrival} {args.rate}/s for {args.duration}s")
+    print(f"  Requests:   {report['requests']['sent']} sent, {len(completed)} completed, "
+          f"{report['requests']['errors']} errors, {dropped} dropped")
+    print(f"  Throughput: {report['throughput']['offered_per_sec']}/s offered, "
+          f"{report['throughput']['completed_per_sec']}/s completed")
+    if upload['count']:
+        print(f"  Upload latency:    p50 {upload['p50']}s  p95 {upload['p95']}s  p99 {upload['p99']}s")
+    if ttc['count']:
+        print(f"  Time to COMPLETED: p50 {ttc['p50']}s  p95 {ttc['p95']}s  p99 {ttc['p99']}s")
+    for error, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"  {error}: {count}")
+    logger.info(f"Load test complete. Results saved to {results_file}")
+
+    return 0 if not errors else 1
+
+
 def main():
     parser = argparse.ArgumentParser(description='Test IMIS V3 Pipeline')
     parser.add_argument('--webhook', default=DEFAULT_WEBHOOK_URL, help='Webhook URL')
@@ -306,6 +493,13 @@ def main():
     parser.add_argument('--test-feedback', action='store_true', help='Test feedback submission')
     parser.add_argument('--parallel', type=int, default=1, help='Number of parallel tests to run')
     parser.add_argument('--extensions', default='.pdf,.txt', help='Comma-separated list of file extensions to process')
+    parser.add_argument('--rate', type=float, help='Open-loop mode: arrivals per second (uploads PDFs only)')
+    parser.add_argument('--duration', type=float, default=60, help='Open-loop mode: seconds to generate arrivals')
+    parser.add_argument('--arrival', choices=['poisson', 'constant'], default='poisson', help='Open-loop arrival process')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Open-loop mode: cap on requests in flight')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Open-loop mode: status poll interval')
+    parser.add_argument('--seed', type=int, help='Open-loop mode: random seed for Poisson arrivals')
+    parser.add_argument('--load-output', help='Open-loop mode: JSON report path')
     
     args = parser.parse_args()
     
@@ -347,6 +541,13 @@ def main():
     
     logger.info(f"Found {len(document_files)} documents for testing")
     
+    if args.rate:
+        pdf_files = sorted(doc for doc in document_files if doc.suffix.lower() == '.pdf')
+        if not pdf_files:
+            logger.error("Open-loop mode needs PDF documents. Exiting.")
+            return 1
+        return run_load_test(args, pdf_files)
+    
     # Test results
     results = {
         'total': len(document_files),
@@ -418,4 +619,11 @@ def main():
         json.dump(results, f, indent=2)
     
     logger.info(f"Testing complete. Results saved to {results_file}")
-    logger.info(f"Success: {results['success']}/{results['total']} ({results['success']/results['
+    logger.info(f"Success: {results['success']}/{results['total']} ({results['success']/results['total']*100:.1f}%)")
+    logger.info(f"Flagged: {results['flagged']}, Failed: {results['failed']}")
+    
+    return 0 if results['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+IMIS V3 - Request Tracing
+Lightweight spans for following one document through the webhook, the
+background worker, the n8n notification and the image-processing calls
+
+Each span is one JSON line:
+    {"trace_id", "span_id", "parent_span_id", "request_id", "name", "service",
+     "start" (epoch seconds), "duration_ms", "status" ("ok" | "error"),
+     "error", "attributes"}
+
+Spans are kept in an in-process collector and appended to a JSON-lines file
+that other processes (the image worker) write to as well. The trace context
+travels to n8n in the payload's "trace" field and a W3C traceparent header.
+
+Render a waterfall for a request:
+    python tracing.py waterfall req-<uuid> --file logs/traces_v3.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_COLLECTOR_SIZE = 10000
+
+# The span (or attached remote context) new spans become children of
+_current = contextvars.ContextVar('imis_trace_current', default=None)
+
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+
+def new_span_id():
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """One timed operation; attributes can be added while it runs"""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "request_id", "name", "service",
+                 "start", "duration_ms", "status", "error", "attributes", "_started")
+
+    def __init__(self, name, service, trace_id, parent_span_id=None, request_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id
+        self.request_id = request_id
+        self.name = name
+        self.service = service
+        self.start = time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.error = None
+        self.attributes = dict(attributes or {})
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_request_id(self, request_id):
+        self.request_id = request_id
+
+    def finish(self, error=None):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "request_id": self.request_id,
+            "name": self.name,
+            "service": self.service,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is disabled"""
+
+    def set(self, **attributes):
+        pass
+
+    def set_request_id(self, request_id):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _RemoteParent:
+    """A span context received from another thread or process"""
+
+    __slots__ = ("trace_id", "span_id", "request_id")
+
+    def __init__(self, trace_id, span_id, request_id=None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.request_id = request_id
+
+
+class MemoryCollector:
+    """Keeps the most recent finished spans in memory"""
+
+    def __init__(self, max_spans=DEFAULT_COLLECTOR_SIZE):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans_for(self, key):
+        """Spans whose request_id or trace_id is key"""
+        with self._lock:
+            return [s for s in self._spans if key in (s["request_id"], s["trace_id"])]
+
+
+class FileExporter:
+    """Appends finished spans to a JSON-lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class Tracer:
+    """Creates spans for one service and hands finished spans to its exporters"""
+
+    def __init__(self, service, enabled=True, export_path=None, collector_size=DEFAULT_COLLECTOR_SIZE):
+        self.service = service
+        self.enabled = enabled
+        self.collector = MemoryCollector(collector_size)
+        self.exporters = [self.collector]
+        if enabled and export_path:
+            self.exporters.append(FileExporter(export_path))
+
+    @contextmanager
+    def span(self, name, request_id=None, **attributes):
+        """Time the enclosed block as a child of the current span (or a new trace)"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current.get()
+        span = Span(
+            name, self.service,
+            trace_id=parent.trace_id if parent else new_trace_id(),
+            parent_span_id=parent.span_id if parent else None,
+            request_id=request_id or (parent.request_id if parent else None),
+            attributes=attributes
+        )
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+        finally:
+            _current.reset(token)
+            self._export(span)
+
+    def _export(self, span):
+        record = span.to_dict()
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception as e:
+                print(f"Could not export span {span.name}: {str(e)}", file=sys.stderr)
+
+    def traced(self, name=None):
+        """Decorator: run the function in a span
+
+        A Flask-style (body, status) return value records status_code.
+        """
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name) as span:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+                        span.set(status_code=result[1])
+                    return result
+            return wrapper
+        return decorator
+
+    def bind(self, func):
+        """Wrap func to run in the current trace context, e.g. as a Thread target"""
+        return functools.partial(contextvars.copy_context().run, func)
+
+    @contextmanager
+    def attach(self, context):
+        """Continue a trace received as a context() dict from elsewhere"""
+        if not context or not self.enabled:
+            yield
+            return
+        token = _current.set(_RemoteParent(context["trace_id"], context.get("parent_span_id"),
+                                           context.get("request_id")))
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def current_span(self):
+        current = _current.get()
+        return current if isinstance(current, Span) else _NOOP_SPAN
+
+    def context(self):
+        """The current span as a dict for payloads, or None when not tracing"""
+        current = _current.get()
+        if not self.enabled or current is None:
+            return None
+        return {"trace_id": current.trace_id, "parent_span_id": current.span_id, "request_id": current.request_id}
+
+    def headers(self):
+        """W3C traceparent header for outbound HTTP calls"""
+        current = _current.get()
+        if not self.enabled or current is None:
+            return {}
+        return {"traceparent": f"00-{current.trace_id}-{current.span_id}-01"}
+
+
+def load_spans(path, key):
+    """Spans for a request_id or trace_id from a JSON-lines export file"""
+    spans = []
+    if not os.path.exists(path):
+        return spans
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            if key in (span.get("request_id"), span.get("trace_id")):
+                spans.append(span)
+    return spans
+
+
+def render_waterfall(spans, width=50):
+    """Text waterfall: one row per span, indented under its parent, with a
+    bar placed at its offset from the start of the trace"""
+    if not spans:
+        return "No spans"
+
+    by_id = {s["span_id"]: s for s in spans}
+    children = {}
+    roots = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        parent = span.get("parent_span_id")
+        if parent in by_id:
+            children.setdefault(parent, []).append(span)
+        else:
+            roots.append(span)
+
+    trace_start = min(s["start"] for s in spans)
+    trace_end = max(s["start"] + (s["duration_ms"] or 0) / 1000 for s in spans)
+    total_ms = max((trace_end - trace_start) * 1000, 0.001)
+    request_ids = sorted({s["request_id"] for s in spans if s.get("request_id")})
+
+    lines = [f"Trace {spans[0]['trace_id']}  request {', '.join(request_ids) or '-'}  total {total_ms:.1f} ms"]
+
+    def add(span, depth):
+        offset_ms = (span["start"] - trace_start) * 1000
+        duration_ms = span["duration_ms"] or 0
+        begin = int(offset_ms / total_ms * width)
+        length = max(1, int(round(duration_ms / total_ms * width)))
+        bar = " " * begin + "#" * min(length, width - begin)
+        label = ("  " * depth + span["name"])[:40]
+        marker = " !" if span["status"] == "error" else ""
+        lines.append(f"{label:40} {span['service'][:14]:14} |{bar:{width}}| "
+                     f"{offset_ms:>9.1f} +{duration_ms:>9.1f} ms{marker}")
+        for child in children.get(span["span_id"], []):
+            add(child, depth + 1)
+
+    for root in roots:
+        add(root, 0)
+    errors = [s for s in spans if s["status"] == "error"]
+    for span in errors:
+        lines.append(f"! {span['name']}: {span['error']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect IMIS request traces")
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+    default_file = os.getenv('TRACE_EXPORT_PATH', os.path.join(os.getenv('LOG_PATH', './logs'), 'traces_v3.jsonl'))
+
+    waterfall_parser = subparsers.add_parser("waterfall", help="Render the spans of one request")
+    waterfall_parser.add_argument("key", help="request_id or trace_id")
+    waterfall_parser.add_argument("--file", default=default_file, help="Span export file")
+    waterfall_parser.add_argument("--width", type=int, default=50, help="Bar width in characters")
+
+    list_parser = subparsers.add_parser("list", help="List recent traced requests")
+    list_parser.add_argument("--file", default=default_file, help="Span export file")
+    list_parser.add_argument("--limit", type=int, default=20, help="Number of requests to show")
+
+    args = parser.parse_args()
+
+    if args.command == "waterfall":
+        print(render_waterfall(load_spans(args.file, args.key), args.width))
+
+    elif args.command == "list":
+        roots = []
+        if os.path.exists(args.file):
+            with open(args.file, "r") as f:
+                for line in f:
+                    try:
+                        span = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not span.get("parent_span_id"):
+                        roots.append(span)
+        for span in roots[-args.limit:]:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(span["start"]))
+            print(f"{started}  {span.get('request_id') or span['trace_id']:44} {span['name']:24} "
+                  f"{span['duration_ms']:>9.1f} ms  {span['status']}")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ from dotenv import load_dotenv
 import requests
 import threading
 import traceback
+from tracing import Tracer, render_waterfall, load_spans
 
 # Load environment variables
 load_dotenv()
@@ -79,6 +80,14 @@ if os.getenv('ENABLE_STRUCTURED_LOGS', 'false').lower() == 'true':
 logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
+# Request tracing: spans per request, exported to a JSON-lines file
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', os.path.join(log_path, 'traces_v3.jsonl'))
+tracer = Tracer(
+    "webhook_v3",
+    enabled=os.getenv('ENABLE_TRACING', 'false').lower() == 'true',
+    export_path=TRACE_EXPORT_PATH
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 
@@ -114,6 +123,7 @@ def add_security_headers(response):
     return response
 
 
+@tracer.traced("rate_limit")
 def apply_rate_limit(ip_address):
     """Apply rate limiting by IP address"""
     if not RATE_LIMIT_ENABLED:
@@ -152,6 +162,7 @@ def verify_api_key(api_key):
     return api_key in API_KEYS
 
 
+@tracer.traced("lifecycle.write")
 def save_document_lifecycle(request_id, state_from, state_to, agent, notes=None):
     """Save document lifecycle event to JSON log file"""
     log_entry = {
@@ -179,6 +190,8 @@ def save_document_lifecycle(request_id, state_from, state_to, agent, notes=None)
         # Write updated log
         with open(lifecycle_log_path, 'w') as f:
             json.dump(logs, f, indent=2)
+        
+        tracer.current_span().set(state_to=state_to, events=len(logs))
             
         return True
     except Exception as e:
@@ -186,6 +199,7 @@ def save_document_lifecycle(request_id, state_from, state_to, agent, notes=None)
         return False
 
 
+@tracer.traced("file.hash")
 def calculate_file_hash(file_path):
     """Calculate SHA-256 hash of a file"""
     try:
@@ -200,6 +214,7 @@ def calculate_file_hash(file_path):
         return None
 
 
+@tracer.traced("language.detect")
 def detect_language(text):
     """Simple language detection (simplified - in production use a proper NLP library)"""
     # Detect common English words
@@ -222,6 +237,7 @@ def detect_language(text):
         return "en"  # Default to English
 
 
+@tracer.traced("pdf.validate")
 def validate_pdf_file(file_path):
     """Validate that the file is a valid PDF"""
     try:
@@ -234,6 +250,7 @@ def validate_pdf_file(file_path):
         return False
 
 
+@tracer.traced("document_type.guess")
 def guess_document_type(filename, text=None):
     """Guess the document type based on filename and optionally content"""
     filename = filename.lower()
@@ -256,16 +273,25 @@ def guess_document_type(filename, text=None):
     return "Datasheet"  # Default
 
 
+@tracer.traced("n8n.notify")
 def notify_n8n_workflow(payload):
-    """Notify the n8n workflow about a new document"""
+    """Notify the n8n workflow about a new document
+    
+    The trace context goes along in the payload's "trace" field and a
+    traceparent header, so downstream nodes can continue the trace.
+    """
     n8n_webhook_url = os.getenv('N8N_WEBHOOK_URL')
     if not n8n_webhook_url:
         logger.warning("N8N_WEBHOOK_URL not configured, skipping notification")
         return False
     
     try:
-        headers = {'Content-Type': 'application/json'}
+        headers = {'Content-Type': 'application/json', **tracer.headers()}
+        trace_context = tracer.context()
+        if trace_context:
+            payload = {**payload, "trace": trace_context}
         response = requests.post(n8n_webhook_url, json=payload, headers=headers, timeout=10)
+        tracer.current_span().set(status_code=response.status_code)
         
         if response.status_code == 200:
             logger.info(f"Successfully notified n8n workflow: {response.status_code}")
@@ -278,6 +304,7 @@ def notify_n8n_workflow(payload):
         return False
 
 
+@tracer.traced("process_document_async")
 def process_document_async(file_path, request_data):
     """Process document in a background thread"""
     try:
@@ -330,11 +357,15 @@ def process_document_async(file_path, request_data):
 
 
 @app.route('/v3/webhook', methods=['POST'])
+@tracer.traced("webhook_v3")
 def webhook_v3():
     """V3 webhook handler endpoint"""
     start_time = time.time()
     client_ip = request.remote_addr
     request_id = f"req-{uuid.uuid4()}"
+    span = tracer.current_span()
+    span.set_request_id(request_id)
+    span.set(client_ip=client_ip, content_type=request.headers.get('Content-Type', ''))
     
     # Apply rate limiting
     if not apply_rate_limit(client_ip):
@@ -383,7 +414,9 @@ def webhook_v3():
                 filepath = os.path.join(upload_folder, safe_filename)
                 
                 # Save the file
-                file.save(filepath)
+                with tracer.span("upload.save") as upload_span:
+                    file.save(filepath)
+                    upload_span.set(bytes=os.path.getsize(filepath))
                 logger.info(f"File saved: {filepath}")
                 
                 # Validate PDF
@@ -405,7 +438,7 @@ def webhook_v3():
                 }
                 
                 # Process document asynchronously
-                threading.Thread(target=process_document_async, args=(filepath, request_data)).start()
+                threading.Thread(target=tracer.bind(process_document_async), args=(filepath, request_data)).start()
                 
                 logger.info(f"Webhook processed in {time.time() - start_time:.2f}s")
                 return jsonify({
@@ -422,3 +455,98 @@ def webhook_v3():
             if not data.get('text') and not data.get('url'):
                 logger.warning("Missing 'text' or 'url' field in JSON payload")
                 save_document_lifecycle(
+                    request_id,
+                    "RECEIVED",
+                    "FAILED",
+                    "webhook_handler_v3",
+                    "Missing 'text' or 'url' field"
+                )
+                return jsonify({"error": "Missing 'text' or 'url' field"}), 400
+            
+            request_data = {
+                "request_id": request_id,
+                "sender": data.get('sender', 'unknown'),
+                "source_file_name": data.get('source_file_name', data.get('url', 'ocr_text.txt')),
+                "source_channel": "webhook",
+                "timestamp": datetime.utcnow().isoformat() + "Z"
+            }
+            
+            if data.get('text'):
+                # Save the text so it is processed like an uploaded file
+                text_filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{request_id}.txt"
+                text_filepath = os.path.join(upload_folder, text_filename)
+                with open(text_filepath, 'w') as f:
+                    f.write(data['text'])
+                
+                logger.info(f"OCR text saved: {text_filepath}")
+                save_document_lifecycle(request_id, "RECEIVED", "STORED", "webhook_handler_v3", "OCR text saved")
+                threading.Thread(target=tracer.bind(process_document_async), args=(text_filepath, request_data)).start()
+            else:
+                # URLs are fetched by the n8n workflow
+                notify_n8n_workflow({
+                    **request_data,
+                    "source_url": data['url'],
+                    "document_type_guess": guess_document_type(data['url'])
+                })
+                save_document_lifecycle(request_id, "RECEIVED", "INTERPRETED", "webhook_handler_v3", f"URL: {data['url']}")
+            
+            logger.info(f"Webhook processed in {time.time() - start_time:.2f}s")
+            return jsonify({
+                "request_id": request_id,
+                "status": "processing",
+                "message": "Document received and processing initiated"
+            }), 202
+        
+        else:
+            logger.warning(f"Unsupported content type: {content_type}")
+            save_document_lifecycle(request_id, "RECEIVED", "FAILED", "webhook_handler_v3", f"Unsupported content type: {content_type}")
+            return jsonify({"error": "Unsupported content type"}), 415
+    
+    except Exception as e:
+        logger.exception(f"Error processing webhook: {str(e)}")
+        save_document_lifecycle(request_id, "RECEIVED", "FAILED", "webhook_handler_v3", f"Exception: {str(e)}")
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint for monitoring"""
+    return jsonify({
+        "status": "healthy",
+        "version": "v3",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "components": {
+            "webhook": "healthy",
+            "storage": os.path.exists(upload_folder) and os.access(upload_folder, os.W_OK),
+            "logging": os.path.exists(log_path) and os.access(log_path, os.W_OK)
+        }
+    }), 200
+
+
+@app.route('/v3/traces/<request_id>', methods=['GET'])
+def request_trace(request_id):
+    """Spans and a text waterfall for one request (ENABLE_TRACING=true)"""
+    if not tracer.enabled:
+        return jsonify({"error": "Tracing is disabled"}), 404
+    
+    # The export file also holds the image worker's spans; the in-memory
+    # collector covers recent requests if the file is unavailable
+    spans = load_spans(TRACE_EXPORT_PATH, request_id) or tracer.collector.spans_for(request_id)
+    if not spans:
+        return jsonify({"error": f"No trace for {request_id}"}), 404
+    
+    if request.args.get('format') == 'text':
+        return Response(render_waterfall(spans) + "\n", mimetype='text/plain')
+    return jsonify({"request_id": request_id, "spans": spans, "waterfall": render_waterfall(spans)}), 200
+
+
+if __name__ == '__main__':
+    port = int(os.getenv('PORT', 5000))
+    debug_mode = os.getenv('FLASK_ENV', 'production') == 'development'
+    
+    logger.info(f"Starting IMIS Webhook Handler V3 on port {port}")
+    logger.info(f"Debug mode: {debug_mode}")
+    logger.info(f"Upload folder: {upload_folder}")
+    logger.info(f"Log path: {log_path}")
+    
+    app.run(host='0.0.0.0', port=port, debug=debug_mode)
@@ -2,101 +2,327 @@
 """
 Resize images in the images/ folder to create smaller versions for PDF integration.
 Creates resized versions in images/small/ folder.
+
+Images are resized on a process pool, one image per task. A manifest in the
+output folder records each source's size, mtime and hash together with the
+resize parameters, so later runs only re-encode images that changed.
+
+Usage:
+    python resize_images.py [input_dir] [--output DIR] [--workers N] [--force]
+                            [--format jpeg|webp] [--progressive] [--target-kb KB]
 """
 
+import io
 import os
-from PIL import Image
 import glob
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
 
-# Create the small images directory
-input_dir = "/media/data/share/repos/materiatek/materials-library-extraction/workflow_review/images"
-output_dir = "/media/data/share/repos/materiatek/materials-library-extraction/workflow_review/images/small"
-
-# Create output directory if it doesn't exist
-os.makedirs(output_dir, exist_ok=True)
+# Default directories (relative to this script)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUT_DIR = os.path.join(SCRIPT_DIR, "images")
 
 # Target dimensions and quality
 MAX_WIDTH = 800
 MAX_HEIGHT = 600
 QUALITY = 85  # JPEG quality (1-100)
 
-def resize_image(input_path, output_path):
-    """Resize an image while maintaining aspect ratio"""
+# Output formats: name -> (Pillow format, file extension)
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp")
+}
+MIN_QUALITY = 30  # Lowest quality tried when fitting a byte budget
+
+MANIFEST_NAME = ".resize_manifest.json"
+
+
+def target_size(width, height, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
+    """Return the output dimensions that fit max_width x max_height, keeping the aspect ratio"""
+    if width <= max_width and height <= max_height:
+        return width, height
+
+    aspect_ratio = width / height
+    if aspect_ratio > 1:  # Landscape
+        new_width = min(max_width, width)
+        new_height = int(new_width / aspect_ratio)
+    else:  # Portrait
+        new_height = min(max_height, height)
+        new_width = int(new_height * aspect_ratio)
+
+    # Ensure we don't exceed max dimensions
+    if new_height > max_height:
+        new_height = max_height
+        new_width = int(new_height * aspect_ratio)
+    if new_width > max_width:
+        new_width = max_width
+        new_height = int(new_width / aspect_ratio)
+    return max(1, new_width), max(1, new_height)
+
+
+def encode_image(img, fmt="jpeg", quality=QUALITY, progressive=False):
+    """Encode an RGB image to bytes in one of OUTPUT_FORMATS"""
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        img.save(buffer, "WEBP", quality=quality)
+    else:
+        img.save(buffer, "JPEG", quality=quality, optimize=True, progressive=progressive)
+    return buffer.getvalue()
+
+
+def encode_to_target(img, target_bytes, fmt="jpeg", progressive=False, min_quality=MIN_QUALITY, max_quality=95):
+    """Binary-search the highest quality whose output fits target_bytes
+
+    Returns (data, quality). If even min_quality is too large, the
+    min_quality encoding is returned.
+    """
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode_image(img, fmt, quality, progressive)
+        if len(data) <= target_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    if best is None:
+        best = (encode_image(img, fmt, min_quality, progressive), min_quality)
+    return best
+
+
+def load_resized(input_path, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
+    """Decode an image straight to an RGB image that fits max_width x max_height
+
+    The target size is computed from the header before decoding, so large
+    sources are shrunk as early as possible: JPEGs decode straight at a
+    reduced scale, integer factors are taken with a cheap box reduce, and
+    only the final step uses LANCZOS. Transparency is flattened onto white
+    after the downscale, on the small image.
+    """
+    with Image.open(input_path) as img:
+        new_size = target_size(img.width, img.height, max_width, max_height)
+
+        # JPEG: let the decoder scale by 1/2, 1/4 or 1/8 (never below new_size)
+        if img.format == 'JPEG' and new_size != img.size:
+            img.draft('RGB', new_size)
+
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        elif img.mode not in ('RGB', 'RGBA', 'LA', 'L'):
+            img = img.convert('RGB')
+
+        if new_size != img.size:
+            # Box-reduce while at least twice the target remains, then LANCZOS
+            factor = min(img.width // new_size[0], img.height // new_size[1]) // 2
+            if factor >= 2:
+                img = img.reduce(factor)
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+        # Convert RGBA to RGB if necessary (for PNG with transparency)
+        if img.mode in ('RGBA', 'LA'):
+            # Create white background
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # An RGB source within the limits is still the lazily loaded original;
+        # read its pixels before the with block closes the file
+        img.load()
+        return img
+
+
+def resize_image(
+    input_path,
+    output_path,
+    max_width=MAX_WIDTH,
+    max_height=MAX_HEIGHT,
+    quality=QUALITY,
+    fmt="jpeg",
+    progressive=False,
+    target_bytes=None
+):
+    """Resize an image while maintaining aspect ratio
+
+    With target_bytes set, quality is searched so the output fits that
+    budget and the quality argument is ignored.
+
+    Returns a dict with the output size, dimensions and quality, or None on error.
+    """
     try:
-        with Image.open(input_path) as img:
-            # Convert RGBA to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            width, height = img.size
-            aspect_ratio = width / height
-            
-            if width > MAX_WIDTH or height > MAX_HEIGHT:
-                if aspect_ratio > 1:  # Landscape
-                    new_width = min(MAX_WIDTH, width)
-                    new_height = int(new_width / aspect_ratio)
-                else:  # Portrait
-                    new_height = min(MAX_HEIGHT, height)
-                    new_width = int(new_height * aspect_ratio)
-                
-                # Ensure we don't exceed max dimensions
-                if new_height > MAX_HEIGHT:
-                    new_height = MAX_HEIGHT
-                    new_width = int(new_height * aspect_ratio)
-                if new_width > MAX_WIDTH:
-                    new_width = MAX_WIDTH
-                    new_height = int(new_width / aspect_ratio)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save as JPEG with specified quality
-            img.save(output_path, 'JPEG', quality=QUALITY, optimize=True)
-            
-            # Get file size
-            file_size = os.path.getsize(output_path)
-            print(f"✓ {os.path.basename(input_path)} -> {os.path.basename(output_path)}")
-            print(f"  Size: {file_size // 1024}KB, Dimensions: {img.size[0]}x{img.size[1]}")
-            
-            return True
-            
+        img = load_resized(input_path, max_width, max_height)
+
+        # Encode with the specified quality, or the best quality within budget
+        if target_bytes:
+            data, quality = encode_to_target(img, target_bytes, fmt, progressive)
+        else:
+            data = encode_image(img, fmt, quality, progressive)
+        with open(output_path, "wb") as f:
+            f.write(data)
+
+        return {
+            "size": len(data),
+            "dimensions": list(img.size),
+            "quality": quality
+        }
+
     except Exception as e:
         print(f"✗ Error processing {input_path}: {str(e)}")
-        return False
+        return None
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def load_manifest(output_dir):
+    """Load the manifest of previously resized images (empty if missing)"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically so an interrupted run leaves the old one"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(entry, source_path, output_path, params):
+    """Check a manifest entry against the source file and resize parameters
+
+    Size and mtime are compared first; the content hash is only computed
+    when they differ (e.g. after a checkout touched the file).
+    Returns (up_to_date, source_stat_fields, sha256 or None).
+    """
+    stat = os.stat(source_path)
+    fields = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if not entry or entry.get("params") != params or not os.path.exists(output_path):
+        return False, fields, None
+    if entry.get("size") == fields["size"] and entry.get("mtime_ns") == fields["mtime_ns"]:
+        return True, fields, entry.get("sha256")
+    sha256 = file_sha256(source_path)
+    return sha256 == entry.get("sha256"), fields, sha256
+
+
+def _resize_task(task):
+    """Process pool entry point: resize one image and describe the result"""
+    source_path, output_path, params, sha256 = task
+    result = resize_image(
+        source_path, output_path, params["max_width"], params["max_height"], params["quality"],
+        params["format"], params["progressive"], params["target_bytes"]
+    )
+    if result is None:
+        return source_path, None
+    result["sha256"] = sha256 or file_sha256(source_path)
+    return source_path, result
+
 
 def main():
-    # Find all PNG files in the input directory
-    png_files = glob.glob(os.path.join(input_dir, "*.png"))
-    
-    if not png_files:
-        print("No PNG files found in the images directory")
+    parser = argparse.ArgumentParser(description="Resize images for PDF integration")
+    parser.add_argument("input_dir", nargs="?", default=DEFAULT_INPUT_DIR, help="Directory with the source images")
+    parser.add_argument("--output", default=None, help="Output directory (defaults to <input_dir>/small)")
+    parser.add_argument("--pattern", default="*.png", help="Glob pattern for source images")
+    parser.add_argument("--max-width", type=int, default=MAX_WIDTH, help="Maximum output width")
+    parser.add_argument("--max-height", type=int, default=MAX_HEIGHT, help="Maximum output height")
+    parser.add_argument("--quality", type=int, default=QUALITY, help="Output quality (1-100)")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="jpeg", help="Output format")
+    parser.add_argument("--progressive", action="store_true", help="Write progressive JPEGs")
+    parser.add_argument("--target-kb", type=int, default=None,
+                        help="Fit each image in this many KB by searching the quality (overrides --quality)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--force", action="store_true", help="Resize every image, ignoring the manifest")
+    args = parser.parse_args()
+
+    input_dir = args.input_dir
+    output_dir = args.output or os.path.join(input_dir, "small")
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Find all matching files in the input directory
+    source_files = sorted(glob.glob(os.path.join(input_dir, args.pattern)))
+
+    if not source_files:
+        print(f"No files matching {args.pattern} found in {input_dir}")
         return
-    
-    print(f"Found {len(png_files)} images to resize")
+
+    params = {
+        "max_width": args.max_width,
+        "max_height": args.max_height,
+        "quality": args.quality,
+        "format": args.format,
+        "progressive": args.progressive and args.format == "jpeg",
+        "target_bytes": args.target_kb * 1024 if args.target_kb else None
+    }
+    extension = OUTPUT_FORMATS[args.format][1]
+    manifest = {} if args.force else load_manifest(output_dir)
+
+    print(f"Found {len(source_files)} images to resize")
     print(f"Output directory: {output_dir}")
-    print(f"Target max dimensions: {MAX_WIDTH}x{MAX_HEIGHT}")
-    print(f"JPEG quality: {QUALITY}")
+    print(f"Target max dimensions: {args.max_width}x{args.max_height}")
+    print(f"Format: {args.format}{' (progressive)' if params['progressive'] else ''}, "
+          + (f"target size: {args.target_kb}KB" if args.target_kb else f"quality: {args.quality}"))
     print("-" * 50)
-    
+
+    tasks = []
+    stats = {}
+    output_files = {}
+    skipped = 0
+    for source_file in source_files:
+        # Create output filename (change extension to the output format's)
+        name = os.path.basename(source_file)
+        output_file = os.path.join(output_dir, f"{os.path.splitext(name)[0]}.{extension}")
+
+        up_to_date, fields, sha256 = is_up_to_date(manifest.get(name), source_file, output_file, params)
+        if up_to_date:
+            # Record the new mtime of touched-but-unchanged files to skip rehashing
+            manifest[name].update(fields)
+            skipped += 1
+            continue
+        stats[source_file] = fields
+        output_files[source_file] = output_file
+        tasks.append((source_file, output_file, params, sha256))
+
     successful = 0
-    for png_file in png_files:
-        # Create output filename (change extension to .jpg)
-        base_name = os.path.splitext(os.path.basename(png_file))[0]
-        output_file = os.path.join(output_dir, f"{base_name}.jpg")
-        
-        if resize_image(png_file, output_file):
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for source_file, result in executor.map(_resize_task, tasks):
+            if result is None:
+                continue
+            name = os.path.basename(source_file)
+            manifest[name] = {
+                **stats[source_file],
+                "sha256": result["sha256"],
+                "params": params,
+                "output": os.path.basename(output_files[source_file])
+            }
+            print(f"✓ {name} -> {manifest[name]['output']}")
+            print(f"  Size: {result['size'] // 1024}KB, Dimensions: {result['dimensions'][0]}x{result['dimensions'][1]}, "
+                  f"Quality: {result['quality']}")
             successful += 1
-        print()
-    
+
+    # Forget sources that no longer exist
+    current = {os.path.basename(f) for f in source_files}
+    manifest = {name: entry for name, entry in manifest.items() if name in current}
+    save_manifest(output_dir, manifest)
+
     print("-" * 50)
-    print(f"Successfully resized {successful}/{len(png_files)} images")
+    print(f"Successfully resized {successful}/{len(tasks)} images ({skipped} unchanged, skipped)")
     print(f"Resized images saved to: {output_dir}")
 
 if __name__ == "__main__":